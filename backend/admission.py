@@ -0,0 +1,110 @@
+import os
+import math
+import logging
+import lanes
+from metrics import ADMISSION_DECISIONS
+
+logger = logging.getLogger("explainbot.admission")
+
+# ── Admission control ────────────────────────────────────────────────────────
+#
+# The per-IP limiter and the daily LIMITS don't react to how busy the server
+# actually is. This does: before work is queued on a lane, the lane's
+# expected wait — tasks ahead of it × the lane's recent task duration ÷
+# workers (lanes.Lane.expected_wait) — is compared with a budget for that
+# lane. Over budget:
+#
+#   text, upload    the request is shed: 503 with Retry-After
+#   video           /api/generate-video is shed the same way; an /api/explain
+#                   decision of "video" is downgraded to "audio" instead
+#   audio           an "audio" decision is downgraded to "text"
+#
+# A downgraded decision carries degraded_for_load, the format it replaced
+# and retry_after, and the response gets a Retry-After header.
+#
+# Because the estimate is recomputed from the live queue on every request,
+# shedding stops as soon as the backlog drains — nothing has to expire.
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+
+# Longest acceptable wait for a worker, in seconds, per lane
+MAX_WAIT = {
+    "text": float(os.getenv("ADMIT_TEXT_MAX_WAIT", "8")),
+    "audio": float(os.getenv("ADMIT_AUDIO_MAX_WAIT", "20")),
+    "video": float(os.getenv("ADMIT_VIDEO_MAX_WAIT", "240")),
+    "upload": float(os.getenv("ADMIT_UPLOAD_MAX_WAIT", "20")),
+}
+
+# Task duration assumed until a lane has finished its first task
+TYPICAL_SECONDS = {"text": 2.0, "audio": 5.0, "video": 60.0, "upload": 1.0}
+
+# What a decision falls back to when its lane is over budget
+DEGRADE_TO = {"video": "audio", "audio": "text"}
+
+MAX_RETRY_AFTER = 600
+
+
+class Overloaded(Exception):
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} lane is overloaded, retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def assess(lane: str) -> tuple[bool, int]:
+    """
+    (admit, retry_after) for new work on `lane`. retry_after is roughly
+    how long until the backlog is back within budget; 0 when admitted.
+    """
+    if not ADMISSION_CONTROL:
+        return True, 0
+    wait = lanes.LANES[lane].expected_wait(TYPICAL_SECONDS[lane])
+    if wait <= MAX_WAIT[lane]:
+        return True, 0
+    return False, min(MAX_RETRY_AFTER, max(1, math.ceil(wait - MAX_WAIT[lane])))
+
+
+def admit(lane: str):
+    """Raise Overloaded if `lane` is over budget."""
+    ok, retry_after = assess(lane)
+    if not ok:
+        ADMISSION_DECISIONS.inc(lane=lane, outcome="shed")
+        logger.warning(f"🚦 Shedding {lane} request — retry in {retry_after}s")
+        raise Overloaded(lane, retry_after)
+    ADMISSION_DECISIONS.inc(lane=lane, outcome="admitted")
+
+
+def degrade(decision: dict) -> dict:
+    """
+    Step the decision's format down (video → audio → text) while its lane
+    is over budget. Returns the decision, marked if it was changed.
+    """
+    original = decision["format"]
+    fmt, retry_after = original, 0
+    while fmt in DEGRADE_TO:
+        ok, wait = assess(fmt)
+        if ok:
+            break
+        ADMISSION_DECISIONS.inc(lane=fmt, outcome="degraded")
+        retry_after = max(retry_after, wait)
+        fmt = DEGRADE_TO[fmt]
+
+    decision["degraded_for_load"] = fmt != original
+    if fmt != original:
+        logger.warning(f"🚦 Degraded {original} → {fmt} for load — full format in ~{retry_after}s")
+        decision.update(format=fmt, original_format=original, retry_after=retry_after,
+                        requires_diagram=False)
+    return decision
+
+
+def status() -> dict:
+    """Per lane: expected wait, its budget, and whether new work is admitted."""
+    report = {}
+    for name, lane in lanes.LANES.items():
+        wait = lane.expected_wait(TYPICAL_SECONDS[name])
+        report[name] = {
+            "expected_wait_seconds": round(wait, 2),
+            "max_wait_seconds": MAX_WAIT[name],
+            "admitting": not ADMISSION_CONTROL or wait <= MAX_WAIT[name]
+        }
+    return report
@@ -1,7 +1,10 @@
-from groq import Groq
-import os
-from rank_bm25 import BM25Okapi
+import logging
 from guardrails import log_token_estimate
+from agents.llm_client import groq_client
+from metrics import LLM_SECONDS, timed_call
+from tracing import span, stage
+
+logger = logging.getLogger("explainbot.agents")
 
 LANGUAGE_NAMES = {
     "en": "English",
@@ -16,9 +19,12 @@ LANGUAGE_NAMES = {
 class ContentAgent:
 
     def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.model = "llama-3.1-8b-instant"
 
+    @property
+    def client(self):
+        return groq_client()
+
     # ── Public ───────────────────────────────────────────────
 
     def generate_explanation(
@@ -72,15 +78,16 @@ class ContentAgent:
         log_token_estimate("ContentAgent prompt", system_msg + prompt)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_msg},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,   # lower = more faithful to context
-                max_tokens=600     # cap output — explanations don't need more
-            )
+            with span("llm", agent="content", model=self.model), timed_call(LLM_SECONDS, agent="content"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_msg},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,   # lower = more faithful to context
+                    max_tokens=600     # cap output — explanations don't need more
+                )
             text = response.choices[0].message.content
             return {
                 'text': text,
@@ -89,7 +96,7 @@ class ContentAgent:
             }
 
         except Exception as e:
-            print(f"Content agent error: {e}")
+            logger.error(f"Content agent error: {e}")
             return {
                 'text': f"Error generating explanation: {e}",
                 'script': None,
@@ -125,10 +132,15 @@ class ContentAgent:
         Returns the top_k most relevant chunks joined for the prompt.
         Falls back to first 2000 chars only if chunking fails entirely.
         """
+        with stage("retrieval", top_k=top_k, context_chars=len(context)):
+            return self._rank_chunks(query, context, top_k)
+
+    def _rank_chunks(self, query: str, context: str, top_k: int) -> str:
+        from rank_bm25 import BM25Okapi   # pulls in numpy — not needed at startup
         chunks = self._chunk(context, size=300, overlap=50)
 
         if not chunks:
-            print("[ContentAgent] ⚠️ Chunking returned nothing — falling back to slice")
+            logger.warning("[ContentAgent] ⚠️ Chunking returned nothing — falling back to slice")
             return context[:2000]
 
         tokenized_chunks = [c.lower().split() for c in chunks]
@@ -140,6 +152,6 @@ class ContentAgent:
         )
 
         retrieved = "\n\n".join(top_chunks)
-        print(f"[ContentAgent] Retrieved {len(top_chunks)} chunks "
-              f"({len(retrieved)} chars) for query: '{query[:60]}'")
+        logger.info(f"[ContentAgent] Retrieved {len(top_chunks)} chunks "
+                    f"({len(retrieved)} chars) for query: '{query[:60]}'")
         return retrieved
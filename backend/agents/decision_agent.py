@@ -1,8 +1,11 @@
-
-
-from groq import Groq
-import os
+import logging
 import json
+from guardrails import log_token_estimate
+from agents.llm_client import groq_client
+from metrics import LLM_SECONDS, timed_call
+from tracing import span
+
+logger = logging.getLogger("explainbot.agents")
 
 
 STRICT_PROMPT = """You decide the best format to explain content to a user.
@@ -37,9 +40,12 @@ Respond ONLY with valid JSON, no markdown:
 class DecisionAgent:
 
     def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.model = "llama-3.1-8b-instant"
 
+    @property
+    def client(self):
+        return groq_client()
+
     def analyze_and_decide(self, user_query: str, content_context: str, format_hint: str = "auto") -> dict:
         # User explicitly chose a format — respect it, skip AI
         if format_hint and format_hint != "auto":
@@ -52,16 +58,18 @@ class DecisionAgent:
 
         # Auto mode — AI decides
         prompt = STRICT_PROMPT.format(query=user_query, context=content_context[:500])
+        log_token_estimate("DecisionAgent prompt", prompt)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You respond only with valid JSON. No markdown, no extra text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.1
-            )
+            with span("llm", agent="decision", model=self.model), timed_call(LLM_SECONDS, agent="decision"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You respond only with valid JSON. No markdown, no extra text."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.1
+                )
 
             raw = response.choices[0].message.content.strip()
 
@@ -78,7 +86,7 @@ class DecisionAgent:
             return result
 
         except Exception as e:
-            print(f"Decision agent error: {e}")
+            logger.error(f"Decision agent error: {e}")
             return {
                 "format": "text",
                 "reasoning": "Fallback — could not parse decision",
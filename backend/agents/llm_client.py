@@ -0,0 +1,23 @@
+import os
+import threading
+
+# ── Shared Groq client ───────────────────────────────────────────────────────
+#
+# All agents share one client, created on the first LLM call rather than at
+# import: the SDK pulls in httpx and its pydantic models, which text-free
+# paths such as health checks and media serving never need. One client also
+# means one connection pool, so agents reuse each other's keep-alive
+# connections.
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def groq_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                _client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return _client
@@ -1,7 +1,11 @@
-from groq import Groq
-import os
+import logging
 import json
 from guardrails import log_token_estimate
+from agents.llm_client import groq_client
+from metrics import LLM_SECONDS, timed_call
+from tracing import span
+
+logger = logging.getLogger("explainbot.agents")
 
 LANGUAGE_NAMES = {
     "en": "English",
@@ -16,9 +20,12 @@ LANGUAGE_NAMES = {
 class VideoAgent:
 
     def __init__(self):
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
         self.model = "llama-3.1-8b-instant"
 
+    @property
+    def client(self):
+        return groq_client()
+
     def plan_scenes(
         self,
         query: str,
@@ -106,23 +113,24 @@ Rules:
         log_token_estimate("VideoAgent prompt", prompt)
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            f"You create video scripts strictly from provided source content. "
-                            f"Visual text in English, narration in {lang_name}. "
-                            f"Never invent facts not present in the source. "
-                            f"Respond only with valid JSON."
-                        )
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                max_tokens=800     # 4 scenes with narration — 800 is plenty
-            )
+            with span("llm", agent="video_plan", model=self.model), timed_call(LLM_SECONDS, agent="video_plan"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": (
+                                f"You create video scripts strictly from provided source content. "
+                                f"Visual text in English, narration in {lang_name}. "
+                                f"Never invent facts not present in the source. "
+                                f"Respond only with valid JSON."
+                            )
+                        },
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=800     # 4 scenes with narration — 800 is plenty
+                )
 
             raw = response.choices[0].message.content.strip()
 
@@ -140,7 +148,7 @@ Rules:
             return plan
 
         except Exception as e:
-            print(f"❌ Video agent error: {e}")
+            logger.error(f"❌ Video agent error: {e}")
             return self._fallback_plan(query, explanation)
 
     def _fallback_plan(self, query: str, explanation: str) -> dict:
@@ -0,0 +1,56 @@
+"""
+Query language detection: langdetect.detect() against language_detect's
+script + n-gram scorer (cold and memoised), on short queries in every
+supported language. Also reports how often each gets the language right.
+
+    cd backend && python benchmarks/bench_language.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import language_detect  # noqa: E402
+
+QUERIES = {
+    "en": ["How does the caching layer work?", "Explain the main risks in section three"],
+    "es": ["¿Cómo funciona la capa de caché?", "Explica los riesgos principales de la sección tres"],
+    "de": ["Wie funktioniert die Caching-Schicht?", "Erkläre die wichtigsten Risiken im dritten Abschnitt"],
+    "fr": ["Comment fonctionne la couche de cache ?", "Explique les principaux risques de la section trois"],
+    "pt": ["Qual é a política de reembolso para clientes?", "Explique os principais riscos da seção três"],
+    "it": ["Come funziona il livello di cache?", "Spiega i rischi principali della sezione tre"],
+    "pl": ["Jak działa warstwa pamięci podręcznej?", "Wyjaśnij główne ryzyka w sekcji trzeciej"],
+    "nl": ["Hoe werkt de cachelaag?", "Leg de belangrijkste risico's in sectie drie uit"],
+    "hi": ["कैशिंग परत कैसे काम करती है?", "धारा तीन के मुख्य जोखिम समझाइए"],
+}
+SAMPLES = [(lang, q) for lang, qs in QUERIES.items() for q in qs]
+
+
+def bench(fn, rounds: int = 50) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for _, q in SAMPLES:
+            fn(q)
+    return (time.perf_counter() - start) / (rounds * len(SAMPLES)) * 1e6
+
+
+def accuracy(fn) -> str:
+    return f"{sum(fn(q) == lang for lang, q in SAMPLES)}/{len(SAMPLES)}"
+
+
+if __name__ == "__main__":
+    from langdetect import detect
+
+    start = time.perf_counter()
+    detect("warm up")
+    print(f"langdetect first call      : {(time.perf_counter() - start) * 1000:7.1f} ms")
+    start = time.perf_counter()
+    language_detect.warm_up()
+    print(f"n-gram profiles first load : {(time.perf_counter() - start) * 1000:7.1f} ms")
+
+    print(f"langdetect                 : {bench(detect):7.1f} µs/query, {accuracy(detect)} correct")
+    scorer = lambda q: language_detect.detect(q)[0]  # noqa: E731
+    print(f"language_detect.detect     : {bench(scorer):7.1f} µs/query, {accuracy(scorer)} correct")
+    cached = lambda q: language_detect.detect_query(q)[0]  # noqa: E731
+    print(f"language_detect (memoised) : {bench(cached):7.1f} µs/query")
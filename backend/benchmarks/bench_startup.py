@@ -0,0 +1,49 @@
+"""
+Cold start: how long a fresh interpreter takes to import the app — what a
+new container or uvicorn worker pays before it can answer — with services
+built lazily, against building everything up front as the app used to.
+Also times the import a spawned render worker does, and the first text
+explanation's service setup.
+
+    cd backend && python benchmarks/bench_startup.py
+"""
+import os
+import sys
+import statistics
+import subprocess
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+TIMED = "import time; start = time.perf_counter(); {body}; print(time.perf_counter() - start)"
+
+CASES = {
+    "import main (lazy)": "import main",
+    "import main + build every service (eager)": (
+        "import main, moviepy.editor, reportlab.platypus, pypdf, rank_bm25, requests; "
+        "main.content_agent.client; main._build_services()"
+    ),
+    "render worker: import services.video_service": "import services.video_service",
+    "first text answer: ContentAgent + BM25 + Groq client": (
+        "import main; main.content_agent._rank_chunks('q', 'some words ' * 50, 2); "
+        "main.content_agent.client"
+    ),
+}
+
+
+def run(body: str, rounds: int) -> float:
+    env = dict(os.environ, WARM_UP="0", GROQ_API_KEY=os.getenv("GROQ_API_KEY", "bench"))
+    times = []
+    for _ in range(rounds):
+        out = subprocess.run(
+            [sys.executable, "-c", TIMED.format(body=body)],
+            cwd=BACKEND, env=env, capture_output=True, text=True, check=True
+        )
+        times.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for name, body in CASES.items():
+        print(f"{name:54s}: {run(body, rounds) * 1000:7.0f} ms (median of {rounds})")
@@ -1,6 +1,14 @@
+import os
+import logging
 import re
+import json
 import time
-from collections import defaultdict
+import sqlite3
+import threading
+from collections import Counter, OrderedDict
+from metrics import LLM_TOKENS_ESTIMATED, register_collector
+
+logger = logging.getLogger("explainbot.guardrails")
 
 
 # ── Config ────────────────────────────────────────────────────────────────────
@@ -47,12 +55,237 @@ OFF_TOPIC_PATTERNS = [
     r"translate (this |the )?(entire |whole )?(document|text|file)",
 ]
 
-_COMPILED_INJECTION = [re.compile(p, re.IGNORECASE) for p in INJECTION_PATTERNS]
-_COMPILED_OFF_TOPIC = [re.compile(p, re.IGNORECASE) for p in OFF_TOPIC_PATTERNS]
+# Optional JSON file {"injection": [...], "off_topic": [...]} replacing the
+# lists above; edits are picked up without a restart
+GUARDRAIL_RULES_FILE = os.getenv("GUARDRAIL_RULES_FILE", "")
+RULES_CHECK_SECONDS = 2.0
+
+
+class RuleEngine:
+    """
+    Each category's patterns compiled into one alternation, so a query is
+    scanned once per category instead of once per rule.
+
+    The query is lowercased once up front and the alternations compiled
+    without re.IGNORECASE: case-insensitive matching stops sre from
+    skipping ahead on the rules' leading literals and costs more than the
+    merge saves. Rules written with capitals are wrapped in a scoped
+    `(?i:...)` so they still match. Categories are tried in priority
+    order, and only on a hit are the category's rules re-tried at the
+    match position to report which one fired.
+    """
+
+    def __init__(self, rules: dict):
+        self.rules = {category: list(patterns) for category, patterns in rules.items() if patterns}
+        self._combined = {}
+        self._single = {}
+        for category, patterns in self.rules.items():
+            scoped = [self._fold(p) for p in patterns]
+            self._single[category] = [re.compile(p) for p in scoped]
+            self._combined[category] = re.compile("|".join(f"(?:{p})" for p in scoped))
+
+    @staticmethod
+    def _fold(pattern: str) -> str:
+        # Escapes like \S or \W are case-sensitive syntax, not literals
+        literals = re.sub(r"\\.", "", pattern)
+        return f"(?i:{pattern})" if any(c.isupper() for c in literals) else pattern
+
+    def match(self, text: str):
+        """(category, rule index, pattern) of the highest-priority rule that matches, or None."""
+        folded = text.lower()
+        for category, combined in self._combined.items():
+            m = combined.search(folded)
+            if m is None:
+                continue
+            # Alternation is ordered: the first rule matching at that spot is the one that fired
+            for index, single in enumerate(self._single[category]):
+                if single.match(folded, m.start()):
+                    return category, index, self.rules[category][index]
+            return category, -1, None
+        return None
+
+
+_engine = RuleEngine({"injection": INJECTION_PATTERNS, "off_topic": OFF_TOPIC_PATTERNS})
+_engine_lock = threading.Lock()
+_rules_state = {"mtime": None, "checked": 0.0}
+_rule_hits: Counter = Counter()
+_rule_hits_lock = threading.Lock()
+
+
+def _load_rules_file(path: str) -> RuleEngine:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return RuleEngine({
+        "injection": data.get("injection", INJECTION_PATTERNS),
+        "off_topic": data.get("off_topic", OFF_TOPIC_PATTERNS),
+    })
+
+
+def _rule_engine() -> RuleEngine:
+    """Current engine, rebuilt when GUARDRAIL_RULES_FILE changes on disk."""
+    global _engine
+    if not GUARDRAIL_RULES_FILE:
+        return _engine
+    now = time.monotonic()
+    if now - _rules_state["checked"] < RULES_CHECK_SECONDS:
+        return _engine
+
+    with _engine_lock:
+        _rules_state["checked"] = now
+        try:
+            mtime = os.stat(GUARDRAIL_RULES_FILE).st_mtime_ns
+        except OSError:
+            return _engine
+        if mtime != _rules_state["mtime"]:
+            try:
+                _engine = _load_rules_file(GUARDRAIL_RULES_FILE)
+                logger.info(f"🛡️ Guardrail rules loaded from {GUARDRAIL_RULES_FILE}")
+            except (OSError, ValueError, re.error) as e:
+                # Keep enforcing the previous rules rather than none
+                logger.warning(f"⚠️ Guardrail rules not reloaded: {e}")
+            _rules_state["mtime"] = mtime
+    return _engine
+
+
+@register_collector
+def _guardrail_metrics() -> list:
+    # How often each rule has rejected a query since startup
+    with _rule_hits_lock:
+        hits = list(_rule_hits.items())
+    rules = _rule_engine().rules
+    return [
+        ("explainbot_guardrail_rules", "gauge", "Guardrail rules in force, by category.",
+         [({"category": category}, len(patterns)) for category, patterns in rules.items()]),
+        ("explainbot_guardrail_rejections_total", "counter", "Queries rejected, by category and rule.",
+         [({"category": category, "rule": pattern}, n) for (category, pattern), n in hits]),
+    ]
+
+
+# ── IP-based rate limiter ────────────────────────────────────────────────────
+#
+# Sliding-window counter: each IP keeps only the request count of the current
+# fixed window and of the one before it. The previous window's count is
+# weighted by how much of it still overlaps the sliding window, so a check is
+# O(1) time and O(1) memory per IP however many requests it has made.
+#
+# State lives behind a small store interface — in-process by default, or a
+# SQLite file shared by every uvicorn worker (RATE_LIMIT_BACKEND=sqlite).
+# Both follow STATE_BACKEND / STATE_DB unless set explicitly.
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", os.getenv("STATE_BACKEND", "memory"))
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.getenv("STATE_DB", "outputs/ratelimit.db"))
+RATE_MAX_TRACKED_IPS = 100_000    # in-process store: hard cap on tracked IPs
+
+
+def _slide(state, now: float, window: int, limit: int):
+    """
+    One rate-limit step. `state` is (window_index, current, previous) or None.
+    Returns (new_state, allowed, retry_after_seconds).
+    """
+    index = int(now // window)
+    if state is None or state[0] < index - 1:
+        current, previous = 0, 0
+    elif state[0] == index - 1:
+        current, previous = 0, state[1]
+    else:
+        current, previous = state[1], state[2]
+
+    elapsed = now - index * window
+    weight = 1 - elapsed / window
+    if previous * weight + current < limit:
+        return (index, current + 1, previous), True, 0.0
+
+    # Time until the weighted count drops back under the limit
+    if current < limit:
+        retry = window * (1 - (limit - current) / previous) - elapsed
+    else:
+        retry = (window - elapsed) + window * (1 - limit / current)
+    return (index, current, previous), False, max(retry, 1.0)
+
+
+class MemoryRateStore:
+    """Per-process limiter state; IPs idle for two windows are evicted."""
+
+    def __init__(self, max_entries: int = RATE_MAX_TRACKED_IPS):
+        self.max_entries = max_entries
+        self._state: OrderedDict[str, tuple] = OrderedDict()   # key → (index, current, previous, last_seen)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: float, window: int, limit: int) -> tuple[bool, float]:
+        with self._lock:
+            entry = self._state.pop(key, None)
+            state, allowed, retry = _slide(entry[:3] if entry else None, now, window, limit)
+            self._state[key] = (*state, now)
+
+            # Least recently seen first — stop at the first IP still active
+            while self._state:
+                oldest_key, oldest = next(iter(self._state.items()))
+                if len(self._state) <= self.max_entries and oldest[3] > now - 2 * window:
+                    break
+                del self._state[oldest_key]
+            return allowed, retry
+
+    def __len__(self):
+        return len(self._state)
+
+
+class SqliteRateStore:
+    """Limiter state in a SQLite file, so every worker process shares one limit."""
+
+    PURGE_EVERY = 500   # hits between idle-row sweeps
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        self._hits = 0
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                "key TEXT PRIMARY KEY, window_index INTEGER, current INTEGER, "
+                "previous INTEGER, last_seen REAL)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key: str, now: float, window: int, limit: int) -> tuple[bool, float]:
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, making read-modify-write atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_index, current, previous FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            state, allowed, retry = _slide(row, now, window, limit)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)", (key, *state, now)
+            )
+            self._hits += 1
+            if self._hits % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM rate_limits WHERE last_seen < ?", (now - 2 * window,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
 
-# ── IP-based rate tracker (in-memory, resets on restart) ─────────────────────
+def make_rate_store(backend: str = RATE_LIMIT_BACKEND):
+    if backend == "sqlite":
+        return SqliteRateStore(RATE_LIMIT_DB)
+    return MemoryRateStore()
 
-_ip_requests: dict[str, list[float]] = defaultdict(list)
+
+_rate_store = make_rate_store()
 
 
 def check_ip_rate(ip: str) -> tuple[bool, str]:
@@ -60,17 +293,10 @@ def check_ip_rate(ip: str) -> tuple[bool, str]:
     Sliding window rate limiter per IP.
     Returns (allowed: bool, reason: str).
     """
-    now = time.time()
-    window_start = now - RATE_WINDOW_SECONDS
-
-    # Prune old entries
-    _ip_requests[ip] = [t for t in _ip_requests[ip] if t > window_start]
-
-    if len(_ip_requests[ip]) >= MAX_REQUESTS_PER_IP:
-        wait_minutes = int((RATE_WINDOW_SECONDS - (now - _ip_requests[ip][0])) / 60) + 1
+    allowed, retry_after = _rate_store.hit(ip, time.time(), RATE_WINDOW_SECONDS, MAX_REQUESTS_PER_IP)
+    if not allowed:
+        wait_minutes = int(retry_after / 60) + 1
         return False, f"Too many requests. Try again in ~{wait_minutes} minute(s)."
-
-    _ip_requests[ip].append(now)
     return True, ""
 
 
@@ -99,20 +325,20 @@ def validate_query(query: str) -> tuple[bool, str]:
     if _is_gibberish(q):
         return False, "Query appears to be gibberish. Please ask a real question."
 
-    # Prompt injection
-    for pattern in _COMPILED_INJECTION:
-        if pattern.search(q):
-            return False, "Query contains disallowed content."
-
-    # Off-topic
-    for pattern in _COMPILED_OFF_TOPIC:
-        if pattern.search(q):
-            return False, (
-                "ExplainBot answers questions about uploaded documents only. "
-                "Please ask something specific to your document."
-            )
+    # Prompt injection, then off-topic — one scan for every rule
+    hit = _rule_engine().match(q)
+    if hit is None:
+        return True, ""
 
-    return True, ""
+    category, _, pattern = hit
+    with _rule_hits_lock:
+        _rule_hits[(category, pattern)] += 1
+    if category == "injection":
+        return False, "Query contains disallowed content."
+    return False, (
+        "ExplainBot answers questions about uploaded documents only. "
+        "Please ask something specific to your document."
+    )
 
 
 def _is_gibberish(text: str) -> bool:
@@ -124,13 +350,16 @@ def _is_gibberish(text: str) -> bool:
     if not stripped:
         return True
 
+    # One counting pass; both checks then only look at distinct characters
+    counts = Counter(stripped)
+
     # All same character
-    most_common_ratio = max(stripped.count(c) for c in set(stripped)) / len(stripped)
+    most_common_ratio = max(counts.values()) / len(stripped)
     if most_common_ratio > 0.6 and len(stripped) > 8:
         return True
 
     # No alphanumeric characters at all
-    if not any(c.isalnum() for c in stripped):
+    if not any(c.isalnum() for c in counts):
         return True
 
     return False
@@ -174,6 +403,7 @@ def log_token_estimate(stage: str, text: str):
     Useful for debugging runaway token consumption.
     """
     tokens = estimate_tokens(text)
-    print(f"[TOKEN GUARD] {stage}: ~{tokens} tokens ({len(text)} chars)")
+    LLM_TOKENS_ESTIMATED.inc(tokens, stage=stage)
+    logger.info(f"[TOKEN GUARD] {stage}: ~{tokens} tokens ({len(text)} chars)")
     if tokens > 3000:
-        print(f"[TOKEN GUARD] ⚠️  High token count at '{stage}' — check chunking.")
+        logger.warning(f"[TOKEN GUARD] ⚠️  High token count at '{stage}' — check chunking.")
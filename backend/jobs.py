@@ -0,0 +1,183 @@
+import os
+import logging
+import time
+import uuid
+import threading
+from state import MemoryState
+from lanes import Lane
+from tracing import span
+import profiling
+
+logger = logging.getLogger("explainbot.jobs")
+
+
+class QueueFull(Exception):
+    pass
+
+
+def _is_pending(job: dict) -> bool:
+    return job["status"] in ("queued", "running")
+
+
+class JobQueue:
+    """
+    Bounded queue of long-running renders, run on a lane (lanes.py).
+
+    `submit(fn, **kwargs)` returns a job record straight away; the worker
+    later calls `fn(progress, **kwargs)` where `progress(stage, percent)`
+    updates what the status endpoint reports. Finished jobs are kept for
+    `ttl_seconds` so clients can still collect the result.
+
+    Job records live in `state` (see state.py). With a shared backend every
+    worker process sees every job, and `max_pending` bounds the whole
+    deployment; each job still runs in the process that accepted it.
+
+    That process refreshes `heartbeat_at` on its unfinished jobs every
+    HEARTBEAT_SECONDS. A queued or running job whose heartbeat is older
+    than `orphan_seconds` was left behind by a worker that crashed or
+    restarted: it is marked failed, stops counting toward `max_pending`
+    and then expires like any other finished job.
+    """
+
+    KIND = "job"
+    HEARTBEAT_SECONDS = 15.0
+
+    def __init__(self, lane: Lane = None, max_pending: int = 20, ttl_seconds: int = 3600,
+                 state=None, orphan_seconds: float = 120.0):
+        self.lane = lane or Lane("render", workers=2)
+        self.workers = self.lane.workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self.orphan_seconds = orphan_seconds
+        self.state = state or MemoryState()
+        self._lock = threading.Lock()
+        self._owned: set[str] = set()     # this process's unfinished jobs
+        self._heartbeat = None
+
+    def submit(self, fn, **kwargs) -> dict:
+        self._expire(self.state.records(self.KIND))
+        self._start_heartbeat()
+
+        job_id = uuid.uuid4().hex[:16]
+        now = time.time()
+        # Count and insert in one state transaction, so workers can't both
+        # take the last free slot
+        stored, pending = self.state.put_record_bounded(self.KIND, job_id, {
+            "job_id": job_id,
+            "status": "queued",
+            "stage": "queued",
+            "progress": 0,
+            "created_at": now,
+            "owner_pid": os.getpid(),
+            "heartbeat_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None
+        }, counts=_is_pending, limit=self.max_pending)
+        if not stored:
+            raise QueueFull(f"{pending} renders already queued")
+        with self._lock:
+            self._owned.add(job_id)
+
+        # The job's spans and log lines stay under the submitting request's ID,
+        # and a profiled request's profile stays open until the job ends
+        self.lane.submit(self._run, job_id, fn, kwargs, profiling.hold())
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        job = self.state.get_record(self.KIND, job_id)
+        if job is None:
+            return None
+        if self._orphaned(job, time.time()):
+            job = self._fail_orphan(job)
+        if job["status"] == "queued":
+            ahead = [j for j in self.state.records(self.KIND)
+                     if j["status"] == "queued" and j["created_at"] < job["created_at"]]
+            job["queue_position"] = len(ahead) + 1
+        return job
+
+    def stats(self) -> dict:
+        counts = {"queued": 0, "running": 0, "done": 0, "failed": 0}
+        for job in self._expire(self.state.records(self.KIND)):
+            counts[job["status"]] += 1
+        return {"workers": self.workers, "max_pending": self.max_pending, **counts}
+
+    # ── Worker side ─────────────────────────────────────────
+
+    def _run(self, job_id: str, fn, kwargs: dict, release_profile=None):
+        try:
+            self._execute(job_id, fn, kwargs)
+        finally:
+            with self._lock:
+                self._owned.discard(job_id)
+            if release_profile:
+                release_profile()
+
+    def _execute(self, job_id: str, fn, kwargs: dict):
+        self._update(job_id, status="running", stage="starting", started_at=time.time())
+
+        def progress(stage: str, percent: float):
+            self._update(job_id, stage=stage, progress=int(min(99, max(0, percent))))
+
+        try:
+            with span("job", job_id=job_id, fn=fn.__name__):
+                result = fn(progress, **kwargs)
+        except Exception as e:
+            logger.error(f"❌ Job {job_id} failed: {e}")
+            self._update(job_id, status="failed", stage="failed",
+                         error=str(e), finished_at=time.time())
+            return
+        self._update(job_id, status="done", stage="done", progress=100,
+                     result=result, finished_at=time.time())
+
+    def _update(self, job_id: str, **fields):
+        # Only the process running a job writes its record
+        with self._lock:
+            job = self.state.get_record(self.KIND, job_id)
+            if job is not None:
+                job.update(fields, heartbeat_at=time.time())
+                self.state.put_record(self.KIND, job_id, job)
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is None:
+                self._heartbeat = threading.Thread(
+                    target=self._heartbeat_loop, name="job-heartbeat", daemon=True
+                )
+                self._heartbeat.start()
+
+    def _heartbeat_loop(self):
+        while True:
+            time.sleep(self.HEARTBEAT_SECONDS)
+            with self._lock:
+                owned = list(self._owned)
+            for job_id in owned:
+                self._update(job_id)
+
+    # ── Expiry ──────────────────────────────────────────────
+
+    def _orphaned(self, job: dict, now: float) -> bool:
+        # Records written before heartbeats existed fall back to created_at
+        heartbeat = job.get("heartbeat_at") or job["created_at"]
+        return _is_pending(job) and heartbeat < now - self.orphan_seconds
+
+    def _fail_orphan(self, job: dict) -> dict:
+        logger.warning(f"⚠️ Job {job['job_id']} orphaned by worker {job.get('owner_pid')} — marking failed")
+        job.update(status="failed", stage="failed", finished_at=time.time(),
+                   error="The render worker stopped before finishing this job. Please try again.")
+        self.state.put_record(self.KIND, job["job_id"], job)
+        return job
+
+    def _expire(self, jobs: list[dict]) -> list[dict]:
+        """
+        Fail orphaned jobs and drop finished jobs older than the TTL;
+        returns the ones kept.
+        """
+        now = time.time()
+        jobs = [self._fail_orphan(j) if self._orphaned(j, now) else j for j in jobs]
+        cutoff = now - self.ttl_seconds
+        stale = {j["job_id"] for j in jobs
+                 if j["finished_at"] is not None and j["finished_at"] < cutoff}
+        self.state.delete_records(self.KIND, stale)
+        return [j for j in jobs if j["job_id"] not in stale]
@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from metrics import LANE_WAIT_SECONDS
+from tracing import bind
+
+logger = logging.getLogger("explainbot.lanes")
+
+# ── Priority lanes ───────────────────────────────────────────────────────────
+#
+# Blocking work runs on one of four bounded executors, by workload class, so
+# a burst of one kind can only fill its own lane:
+#
+#   text     decision + explanation LLM calls       LANE_TEXT_WORKERS
+#   audio    narration for /api/explain (TTS)       LANE_AUDIO_WORKERS
+#   video    render jobs (see jobs.py)              VIDEO_WORKERS
+#   upload   PDF/TXT extraction + detection         LANE_UPLOAD_WORKERS
+#
+# Each lane holds at most LANE_<NAME>_MAX_QUEUE tasks waiting for a worker;
+# past that, submit() raises LaneFull and the endpoint answers 503 rather
+# than letting latency grow without bound. The video lane is bounded by the
+# job queue's VIDEO_MAX_PENDING instead.
+#
+# Video lane threads run at a lower CPU priority (RENDER_NICE, Linux only),
+# and so do the pipeline threads they start, so frame rendering yields the
+# CPU to the interactive lanes.
+
+RENDER_NICE = int(os.getenv("RENDER_NICE", "10"))
+SERVICE_SMOOTHING = 0.2   # weight of the latest task in a lane's average duration
+
+
+class LaneFull(Exception):
+    retry_after = 5   # seconds suggested to a client turned away
+
+    def __init__(self, lane: str, waiting: int):
+        super().__init__(f"{lane} lane is full ({waiting} waiting)")
+        self.lane = lane
+
+
+def _lower_priority(nice: int):
+    # Per-thread on Linux; elsewhere this would renice the whole process
+    if nice and sys.platform.startswith("linux"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not lower lane thread priority: {e}")
+
+
+class Lane:
+    """
+    A bounded thread pool for one class of work. `submit()` returns a
+    Future; `await lane.run(...)` is the same from async code. Tasks keep
+    the submitting request's trace (tracing.bind).
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int = None, nice: int = 0):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.nice = nice
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"lane-{name}",
+            initializer=_lower_priority, initargs=(nice,)
+        )
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._service_seconds = None
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self.max_queue is not None and self._waiting >= self.max_queue:
+                self._rejected += 1
+                raise LaneFull(self.name, self._waiting)
+            self._waiting += 1
+
+        task = bind(fn)
+        enqueued = time.perf_counter()
+
+        def run():
+            with self._lock:
+                self._waiting -= 1
+                self._running += 1
+            started = time.perf_counter()
+            LANE_WAIT_SECONDS.observe(started - enqueued, lane=self.name)
+            try:
+                return task(*args, **kwargs)
+            finally:
+                took = time.perf_counter() - started
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    previous = self._service_seconds
+                    self._service_seconds = took if previous is None else \
+                        previous + SERVICE_SMOOTHING * (took - previous)
+
+        future = self._pool.submit(run)
+        # A task cancelled before it started (client went away) never runs
+        future.add_done_callback(self._forget_if_cancelled)
+        return future
+
+    def _forget_if_cancelled(self, future: Future):
+        if future.cancelled():
+            with self._lock:
+                self._waiting -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def expected_wait(self, typical_seconds: float) -> float:
+        """
+        Seconds a task submitted now would wait for a worker, from the queue
+        depth and the lane's recent task durations (`typical_seconds` until
+        a task has finished).
+        """
+        with self._lock:
+            ahead = self._waiting + self._running + 1 - self.workers
+            service = self._service_seconds if self._service_seconds is not None else typical_seconds
+        return max(0, ahead) * service / self.workers
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "waiting": self._waiting,
+                "running": self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_task_seconds": round(self._service_seconds, 3) if self._service_seconds is not None else None
+            }
+
+
+def _lane(name: str, workers: int, max_queue: int) -> Lane:
+    key = name.upper()
+    return Lane(
+        name,
+        workers=int(os.getenv(f"LANE_{key}_WORKERS", str(workers))),
+        max_queue=int(os.getenv(f"LANE_{key}_MAX_QUEUE", str(max_queue)))
+    )
+
+
+TEXT = _lane("text", workers=16, max_queue=64)
+AUDIO = _lane("audio", workers=4, max_queue=16)
+UPLOAD = _lane("upload", workers=2, max_queue=8)
+VIDEO = Lane("video", workers=int(os.getenv("VIDEO_WORKERS", "2")), nice=RENDER_NICE)
+
+LANES = {lane.name: lane for lane in (TEXT, AUDIO, VIDEO, UPLOAD)}
+
+
+def stats() -> dict:
+    return {name: lane.stats() for name, lane in LANES.items()}
@@ -0,0 +1,159 @@
+import os
+import re
+import json
+import math
+import threading
+import importlib.util
+from functools import lru_cache
+
+# ── Language detection ───────────────────────────────────────────────────────
+#
+# Deterministic replacement for langdetect.detect(), restricted to the
+# languages the app narrates in. Devanagari text is Hindi outright; Latin
+# text is scored with a naive-Bayes character 1–3-gram model built from
+# langdetect's own frequency profiles (only the supported languages are
+# read, ~25 ms once). Same text in, same answer out — no random sampling.
+
+SUPPORTED_LANGUAGES = ("en", "hi", "es", "de", "fr", "pt", "it", "pl", "nl")
+LATIN_LANGUAGES = tuple(lang for lang in SUPPORTED_LANGUAGES if lang != "hi")
+DEFAULT_LANGUAGE = "en"
+
+SAMPLE_CHARS = 4000      # documents are judged on a prefix this long
+MIN_LETTERS = 12         # shorter queries are never reported as confident
+MIN_MARGIN = 0.35        # best-vs-runner-up log-prob gap per n-gram
+MIN_DOCUMENT_WORDS = 5   # distinct words a document needs before its best guess is kept
+
+_NON_LETTERS = re.compile(r"[^\w]+|[\d_]+")
+
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def _load_profiles() -> dict:
+    """gram → {lang: log P(gram | lang)} for every gram any language has seen."""
+    spec = importlib.util.find_spec("langdetect")
+    profile_dir = os.path.join(spec.submodule_search_locations[0], "profiles")
+
+    table: dict[str, dict[str, float]] = {}
+    floors = {}
+    for lang in LATIN_LANGUAGES:
+        with open(os.path.join(profile_dir, lang), encoding="utf-8") as f:
+            profile = json.load(f)
+        totals = profile["n_words"]
+        counts: dict[str, int] = {}
+        for gram, count in profile["freq"].items():
+            gram = gram.lower()
+            counts[gram] = counts.get(gram, 0) + count
+        for gram, count in counts.items():
+            table.setdefault(gram, {})[lang] = math.log(count / totals[len(gram) - 1])
+        # Unseen grams cost the same as a half-count one
+        floors[lang] = [math.log(0.5 / total) for total in totals]
+
+    for gram, scores in table.items():
+        for lang in LATIN_LANGUAGES:
+            if lang not in scores:
+                scores[lang] = floors[lang][len(gram) - 1]
+    return table
+
+
+def _profile_table() -> dict:
+    global _profiles
+    if _profiles is None:
+        with _profiles_lock:
+            if _profiles is None:
+                _profiles = _load_profiles()
+    return _profiles
+
+
+def _script_counts(text: str) -> tuple[int, int, int]:
+    """(latin, devanagari, other) letter counts."""
+    latin = devanagari = other = 0
+    for ch in text:
+        if not ch.isalpha():
+            continue
+        code = ord(ch)
+        if code < 0x250:
+            latin += 1
+        elif 0x900 <= code <= 0x97F:
+            devanagari += 1
+        else:
+            other += 1
+    return latin, devanagari, other
+
+
+def detect(text: str) -> tuple[str, bool]:
+    """
+    (language, confident) for `text`. Unsupported scripts and text with
+    no letters come back as (DEFAULT_LANGUAGE, False).
+    """
+    text = text[:SAMPLE_CHARS]
+    latin, devanagari, other = _script_counts(text)
+    letters = latin + devanagari + other
+    if not letters:
+        return DEFAULT_LANGUAGE, False
+    if devanagari >= max(latin, other):
+        return "hi", devanagari >= MIN_LETTERS // 3
+    if other > latin:
+        return DEFAULT_LANGUAGE, False
+
+    table = _profile_table()
+    scores = dict.fromkeys(LATIN_LANGUAGES, 0.0)
+    grams = 0
+    for word in _NON_LETTERS.sub(" ", text.lower()).split():
+        padded = f" {word} "
+        for n in (1, 2, 3):
+            for i in range(len(padded) - n + 1):
+                gram_scores = table.get(padded[i:i + n])
+                if gram_scores is None:
+                    continue
+                grams += 1
+                for lang, score in gram_scores.items():
+                    scores[lang] += score
+    if not grams:
+        return DEFAULT_LANGUAGE, False
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    (best, best_score), (_, runner_up) = ranked[0], ranked[1]
+    confident = latin >= MIN_LETTERS and (best_score - runner_up) / grams >= MIN_MARGIN
+    return best, confident
+
+
+def detect_document(text: str) -> str | None:
+    """
+    Language of an uploaded document, or None if it can't be told.
+
+    Judged on each distinct word once, so repeated boilerplate doesn't
+    outweigh the rest. Prose rarely clears the per-gram margin tuned for
+    queries, so the best guess is kept once the document has
+    MIN_DOCUMENT_WORDS distinct words in a supported script.
+    """
+    words = dict.fromkeys(_NON_LETTERS.sub(" ", text.lower()).split())
+    sample = " ".join(words)[:SAMPLE_CHARS]
+    language, confident = detect(sample)
+    if confident:
+        return language
+    latin, devanagari, other = _script_counts(sample)
+    if other > latin + devanagari or len(words) < MIN_DOCUMENT_WORDS:
+        return None
+    return language
+
+
+@lru_cache(maxsize=4096)
+def detect_query(query: str) -> tuple[str, bool]:
+    """detect(), memoised — repeated and retried queries cost a dict lookup."""
+    return detect(query)
+
+
+def cache_stats() -> dict:
+    info = detect_query.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "hit_rate": round(info.hits / total, 3) if total else 0.0
+    }
+
+
+def warm_up():
+    """Load the n-gram profiles now rather than on the first request."""
+    _profile_table()
@@ -1,24 +1,38 @@
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
-import shutil, time, re
-from pypdf import PdfReader
+from contextlib import asynccontextmanager
+import os, shutil, logging
 from dotenv import load_dotenv
-from langdetect import detect, LangDetectException
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
+from collections import Counter
 
 from agents.decision_agent import DecisionAgent
 from agents.content_agent import ContentAgent
 from agents.video_agent import VideoAgent
 from services.tts_service import HybridTTSService
 from services.diagram_service import DiagramService
-from services.video_service import VideoService
+from services.video_service import VideoService, get_profile
+from services.video_pipeline import VideoPipeline
+from services.export_service import ExportService
+from services.lazy import LazyService
+from services.ffmpeg_encoder import ffmpeg_version
+from agents.llm_client import groq_client
+from warmup import WarmUp
+from jobs import JobQueue, QueueFull
+from lanes import LaneFull
+from admission import Overloaded
+import lanes
+import admission
+from state import make_state
+import language_detect
+import metrics
+import tracing
+import profiling
+from tracing import span, stage
+from media import media_response
+from uploads import spool_upload, UploadTooLarge, UploadRejected
 from guardrails import (
     validate_query,
     validate_context,
@@ -29,113 +43,170 @@ from guardrails import (
 
 load_dotenv()
 
+# Log lines carry the request ID and are written by a background thread
+tracing.setup_logging()
+logger = logging.getLogger("explainbot.api")
+
+# ── Shared state ──────────────────────────────────────────────────────────────
+
+# Documents, usage counters, TTS quota and job records — in-process, or a
+# SQLite file every uvicorn worker shares (STATE_BACKEND=sqlite)
+state = make_state()
+
 # ── Daily rate limits (video/audio are expensive) ────────────────────────────
 
 from datetime import datetime
 
 LIMITS = {"video": 5, "audio": 5}
-usage = {"video": 0, "audio": 0, "reset_date": datetime.now().date().isoformat()}
+
+
+def usage_key(type_: str) -> str:
+    # One counter per day — tomorrow's key starts from zero
+    return f"usage:{type_}:{datetime.now().date().isoformat()}"
 
 
 def check_and_increment(type_: str) -> tuple[bool, int]:
-    today = datetime.now().date().isoformat()
-    if usage["reset_date"] != today:
-        usage["video"] = 0
-        usage["audio"] = 0
-        usage["reset_date"] = today
     limit = LIMITS.get(type_, 999)
-    if usage.get(type_, 0) >= limit:
+    applied, used = state.add(usage_key(type_), 1, limit=limit)
+    if not applied:
         return False, 0
-    usage[type_] = usage.get(type_, 0) + 1
-    return True, limit - usage[type_]
+    return True, limit - used
+
+
+def refund_usage(type_: str):
+    # The request failed after check_and_increment — give the unit back
+    state.add(usage_key(type_), -1)
 
 
 # ── App ───────────────────────────────────────────────────────────────────────
 
-app = FastAPI(title="ExplainBot AI", version="1.1.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The app serves (and reports "warming_up") while this runs
+    warm_up.start()
+    yield
+
+
+app = FastAPI(title="ExplainBot AI", version="1.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
+app.add_middleware(metrics.MetricsMiddleware, router=app.router)
+if profiling.PROFILE_TOKEN:
+    # Opt-in: only requests carrying X-Profile-Token are sampled
+    app.add_middleware(profiling.ProfileMiddleware)
+# Outermost, so every other layer runs inside the request's trace
+app.add_middleware(tracing.TraceMiddleware)
 
 decision_agent = DecisionAgent()
 content_agent  = ContentAgent()
 video_agent    = VideoAgent()
-tts_service    = HybridTTSService()
-diagram_service = DiagramService()
-video_service  = VideoService()
+tts_service    = LazyService("TTS", lambda: HybridTTSService(state))
+diagram_service = LazyService("Diagrams", DiagramService)
+video_service  = LazyService("Video renderer", VideoService)
+export_service = LazyService("PDF export", ExportService)
+video_pipeline = LazyService("Video pipeline", lambda: VideoPipeline(
+    content_agent, video_agent, tts_service, diagram_service, video_service
+))
+
+# Renders run on the video lane — /api/generate-video only enqueues
+video_jobs = JobQueue(
+    lane=lanes.VIDEO,
+    max_pending=int(os.getenv("VIDEO_MAX_PENDING", "20")),
+    state=state
+)
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# ── Multi-document store ──────────────────────────────────────────────────────
+# ── Warm-up ───────────────────────────────────────────────────────────────────
 
-documents: dict[str, str] = {}
-current_content: str = ""
+# Services are built on first use, so the process answers requests before
+# the TTS SDKs, render pools and output directories exist. These steps do
+# that work right after startup instead (WARM_UP=0 skips them), and
+# /api/health reports not-ready until they finish.
+warm_up = WarmUp()
 
-SUPPORTED_LANGUAGES = {"en", "hi", "es", "de", "fr", "pt", "it", "pl", "nl"}
 
+@warm_up.step("services", required=True)
+def _build_services():
+    for service in (tts_service, diagram_service, video_service, export_service, video_pipeline):
+        service.get()
 
-def detect_language(text: str) -> str:
-    try:
-        lang = detect(text)
-        return lang if lang in SUPPORTED_LANGUAGES else "en"
-    except LangDetectException:
-        return "en"
 
+@warm_up.step("language_detection", required=True)
+def _prime_language_detection():
+    language_detect.warm_up()
 
-def combine_documents() -> str:
-    return "\n\n---\n\n".join(
-        f"[Document: {name}]\n{text}" for name, text in documents.items()
-    )
 
+@warm_up.step("fonts")
+def _load_fonts():
+    export_service.styles
+    return video_service.load_renderers()
 
-def generate_pdf_export(query: str, explanation_text: str, language: str) -> str:
-    output_dir = Path("outputs/exports")
-    output_dir.mkdir(parents=True, exist_ok=True)
 
-    timestamp = int(time.time())
-    output_path = output_dir / f"export_{timestamp}.pdf"
+@warm_up.step("ffmpeg")
+def _check_ffmpeg():
+    return ffmpeg_version()
 
-    doc = SimpleDocTemplate(
-        str(output_path),
-        pagesize=letter,
-        rightMargin=inch, leftMargin=inch,
-        topMargin=inch, bottomMargin=inch
-    )
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle', parent=styles['Title'],
-        fontSize=18, textColor=colors.HexColor('#1e3a8a'), spaceAfter=12
-    )
-    meta_style = ParagraphStyle(
-        'Meta', parent=styles['Normal'],
-        fontSize=9, textColor=colors.HexColor('#94a3b8'), spaceAfter=20
-    )
-    body_style = ParagraphStyle(
-        'Body', parent=styles['Normal'],
-        fontSize=11, leading=18, spaceAfter=8
-    )
 
-    clean_text = re.sub(r'\*\*(.*?)\*\*', r'\1', explanation_text)
-    clean_text = re.sub(r'\*(.*?)\*', r'\1', clean_text)
+@warm_up.step("render")
+def _synthetic_render():
+    return video_service.test_render()
 
-    story = [
-        Paragraph("ExplainBot AI", title_style),
-        Paragraph(f"Query: {query} &nbsp;|&nbsp; Language: {language.upper()}", meta_style),
-        Spacer(1, 0.2 * inch),
-    ]
-    for para in clean_text.split('\n\n'):
-        para = para.strip()
-        if para:
-            story.append(Paragraph(para.replace('\n', '<br/>'), body_style))
-            story.append(Spacer(1, 0.1 * inch))
 
-    doc.build(story)
-    return str(output_path)
+@warm_up.step("connections")
+def _open_connections():
+    # Leaves a pooled keep-alive connection to each provider
+    outcome = tts_service.open_connections()
+    try:
+        groq_client().with_options(max_retries=0, timeout=10).models.list()
+        outcome["groq"] = "ok"
+    except Exception as e:
+        outcome["groq"] = f"failed: {e}"
+    failed = [f"{provider} {result}" for provider, result in outcome.items() if result != "ok"]
+    if failed:
+        raise RuntimeError("; ".join(failed))
+    return outcome
+
+# ── Multi-document store ──────────────────────────────────────────────────────
+
+# Documents live in `state`; the combined text is rebuilt only when another
+# upload or delete (in any worker) has bumped the version
+_combined = {"version": None, "text": ""}
+
+def detect_language(query: str) -> str:
+    # Short or ambiguous queries follow the language of the uploaded documents,
+    # which was detected once at upload
+    with stage("language_detect") as s:
+        lang, confident = language_detect.detect_query(query)
+        s.set(language=lang, confident=confident)
+    if confident:
+        return lang
+    doc_languages = Counter(lang for lang in state.document_languages().values() if lang)
+    if doc_languages:
+        return doc_languages.most_common(1)[0][0]
+    # An unsure guess ("Explain RAG" scores as French) is worse than the default
+    return language_detect.DEFAULT_LANGUAGE
+
+
+def combine_documents(documents: dict[str, str]) -> str:
+    return "\n\n---\n\n".join(
+        f"[Document: {name}]\n{text}" for name, text in documents.items()
+    )
+
+
+def current_content() -> str:
+    version = state.documents_version()
+    if version != _combined["version"]:
+        _combined["text"] = combine_documents(state.documents())
+        _combined["version"] = version
+    return _combined["text"]
 
 
 # ── Helper: get real client IP ────────────────────────────────────────────────
@@ -151,106 +222,151 @@ def get_client_ip(request: Request) -> str:
 
 @app.get("/api/health")
 def health_check():
-    return {
-        "status": "healthy",
+    # 503 until warm-up has finished, so a load balancer keeps traffic away
+    readiness = warm_up.status()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content={
+        "status": "healthy" if readiness["ready"] else readiness["state"],
+        "ready": readiness["ready"],
+        "warm_up": readiness,
         "llm": "groq",
-        "tts": tts_service.get_status()['active_provider'],
+        # A health probe shouldn't be what builds the TTS service
+        "tts": tts_service.get_status()['active_provider'] if tts_service.loaded else "not loaded",
         "video": "moviepy",
-        "documents_loaded": len(documents),
-        "combined_length": len(current_content)
-    }
+        "documents_loaded": len(state.document_names()),
+        "combined_length": len(current_content())
+    })
 
 
 # ── Upload ────────────────────────────────────────────────────────────────────
 
-@app.post("/api/upload")
-async def upload_document(request: Request, file: UploadFile = File(...)):
-    global current_content
-
+@app.post("/api/upload", openapi_extra={
+    "requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "required": ["file"],
+        "properties": {"file": {"type": "string", "format": "binary"}}
+    }}}}
+})
+async def upload_document(request: Request):
     # IP rate limit
     ip = get_client_ip(request)
     allowed, reason = check_ip_rate(ip)
     if not allowed:
         raise HTTPException(status_code=429, detail=reason)
+    admission.admit("upload")
 
-    # File type guard
-    if not (file.filename.endswith('.pdf') or file.filename.endswith('.txt')):
-        raise HTTPException(status_code=400, detail="Only PDF and TXT files accepted.")
-
-    # File size guard — read into memory first to check size
-    contents = await file.read()
-    size_ok, size_msg = validate_upload_size(len(contents))
-    if not size_ok:
+    # Body is streamed to a spool file here rather than parsed up front, so
+    # type and size guards fire as soon as the offending bytes arrive
+    try:
+        with span("upload.spool") as s:
+            upload = await spool_upload(
+                request, max_bytes=MAX_UPLOAD_BYTES, directory=UPLOAD_DIR,
+                suffixes=(".pdf", ".txt")
+            )
+            s.set(bytes=upload["size"])
+    except UploadTooLarge as e:
+        _, size_msg = validate_upload_size(e.size)
         raise HTTPException(status_code=413, detail=size_msg)
+    except UploadRejected as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Sanitise filename — no path traversal
-    safe_name = Path(file.filename).name
+    safe_name = Path(upload["filename"]).name
     file_path = UPLOAD_DIR / safe_name
-
-    with open(file_path, "wb") as buffer:
-        buffer.write(contents)
+    os.replace(upload["path"], file_path)
+    logger.info(f"📥 Upload {safe_name}: {upload['size']} bytes, sha256 {upload['sha256'][:12]}")
 
     try:
-        if safe_name.endswith('.pdf'):
-            reader = PdfReader(file_path)
-            text = "\n".join(
-                page.extract_text() or "" for page in reader.pages
-            )
-        else:
-            text = contents.decode("utf-8", errors="ignore")
-
-        # Context sanity check
-        ctx_ok, ctx_msg = validate_context(text)
-        if not ctx_ok:
-            raise HTTPException(status_code=422, detail=ctx_msg)
-        if ctx_msg:
-            print(f"[Upload] {ctx_msg}")
-
-        documents[safe_name] = text
-        current_content = combine_documents()
+        # Extraction and detection are CPU-bound — upload lane, not the event loop
+        text, language = await lanes.UPLOAD.run(extract_document, file_path)
+        state.put_document(safe_name, text, language)
+        names = state.document_names()
 
         return {
             "success": True,
             "filename": safe_name,
             "content_length": len(text),
-            "total_documents": len(documents),
-            "document_names": list(documents.keys()),
+            "language": language,
+            "total_documents": len(names),
+            "document_names": names,
+            "sha256": upload["sha256"],
             "preview": text[:200] + "..." if len(text) > 200 else text
         }
 
-    except HTTPException:
+    except (HTTPException, LaneFull):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to process document: {str(e)}")
 
 
+def extract_document(file_path: Path) -> tuple[str, str | None]:
+    """
+    Text and detected language (None if unsure) of a spooled upload;
+    422 if the text fails the context guard.
+    """
+    # Extraction reads from the spooled file on disk
+    with span("upload.extract") as s:
+        if file_path.name.lower().endswith('.pdf'):
+            from pypdf import PdfReader
+            reader = PdfReader(file_path)
+            text = "\n".join(
+                page.extract_text() or "" for page in reader.pages
+            )
+        else:
+            text = file_path.read_text(encoding="utf-8", errors="ignore")
+        s.set(chars=len(text))
+
+    # Context sanity check
+    ctx_ok, ctx_msg = validate_context(text)
+    if not ctx_ok:
+        raise HTTPException(status_code=422, detail=ctx_msg)
+    if ctx_msg:
+        logger.info(f"[Upload] {ctx_msg}")
+
+    with stage("language_detect", chars=len(text)):
+        language = language_detect.detect_document(text)
+    return text, language
+
+
+@app.exception_handler(LaneFull)
+@app.exception_handler(Overloaded)
+async def server_busy(request: Request, e):
+    # A full lane or an over-budget one (admission.py) — shed with a hint
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"Server is busy ({e.lane} requests). "
+                           f"Please try again in {e.retry_after} seconds."},
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+
 @app.delete("/api/document/{filename}")
 async def remove_document(filename: str):
-    global current_content
     safe_name = Path(filename).name   # prevent path traversal
-    if safe_name in documents:
-        del documents[safe_name]
-        current_content = combine_documents()
-        return {"success": True, "remaining": list(documents.keys())}
+    if state.remove_document(safe_name):
+        return {"success": True, "remaining": state.document_names()}
     raise HTTPException(status_code=404, detail="Document not found")
 
 
 @app.get("/api/documents")
 def list_documents():
+    documents = state.documents()
+    languages = state.document_languages()
     return {
-        "documents": [{"name": k, "length": len(v)} for k, v in documents.items()],
+        "documents": [{"name": k, "length": len(v), "language": languages.get(k)}
+                      for k, v in documents.items()],
         "total": len(documents)
     }
 
 
 @app.get("/api/status")
 def document_status():
+    names = state.document_names()
     return {
-        "document_loaded": len(documents) > 0,
-        "documents": list(documents.keys()),
-        "combined_length": len(current_content),
+        "document_loaded": len(names) > 0,
+        "documents": names,
+        "combined_length": len(current_content()),
         "agents_ready": True,
-        "tts": tts_service.get_status()
+        # Same as /api/health: a status poll mustn't build the TTS service
+        "tts": tts_service.get_status() if tts_service.loaded else "not loaded"
     }
 
 
@@ -259,6 +375,7 @@ def document_status():
 @app.post("/api/explain")
 async def generate_explanation(
     request: Request,
+    response: Response,
     query: str = Form(...),
     language: str = Form("auto"),
     generate_audio: bool = Form(True),
@@ -275,43 +392,40 @@ async def generate_explanation(
     if not q_ok:
         raise HTTPException(status_code=400, detail=q_msg)
 
-    if not current_content:
+    context = current_content()
+    if not context:
         raise HTTPException(status_code=400, detail="No document uploaded.")
 
+    # Shed before any LLM work if the text lane is already over budget
+    admission.admit("text")
+
     try:
         effective_language = (
             language if language != "auto" else detect_language(query)
         )
-        decision = decision_agent.analyze_and_decide(
-            query, current_content, format_hint
-        )
-
-        # Rate limit audio
-        if decision["format"] in ["audio"] and generate_audio:
-            a_ok, _ = check_and_increment("audio")
-            if not a_ok:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Audio limit reached ({LIMITS['audio']}/day). "
-                           f"Try text format or come back tomorrow."
-                )
-
-        explanation = content_agent.generate_explanation(
-            query=query,
-            context=current_content,
-            format_type=decision['format'],
-            language=effective_language
+        # LLM calls run on the text lane, TTS on the audio lane, so neither
+        # holds up the event loop or queues behind the other
+        decision, explanation = await lanes.TEXT.run(
+            decide_and_explain, query, context, format_hint, effective_language, generate_audio
         )
+        if decision["degraded_for_load"]:
+            response.headers["Retry-After"] = str(decision["retry_after"])
 
         audio_result = None
         if generate_audio and decision['format'] in ['audio', 'video']:
             script = explanation['script'] or explanation['text']
-            audio_result = tts_service.generate_audio(
-                text=script, language=effective_language
-            )
+            try:
+                audio_result = await lanes.AUDIO.run(
+                    tts_service.generate_audio, text=script, language=effective_language
+                )
+            except Exception:
+                # Audio lane full or TTS failed: no narration was delivered
+                if decision['format'] == 'audio':
+                    refund_usage("audio")
+                raise
 
-        pdf_path = generate_pdf_export(query, explanation['text'], effective_language)
-        pdf_filename = Path(pdf_path).name
+        # The PDF itself is laid out on first download, not here
+        pdf_filename = export_service.register(query, explanation['text'], effective_language)
 
         return {
             "success": True,
@@ -324,19 +438,56 @@ async def generate_explanation(
             "pdf_export": pdf_filename
         }
 
-    except HTTPException:
+    except (HTTPException, LaneFull):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Explanation failed: {str(e)}")
 
 
+def decide_and_explain(query: str, context: str, format_hint: str, language: str,
+                       generate_audio: bool) -> tuple[dict, dict]:
+    # One text-lane task per request, so a request admitted to the lane is
+    # never turned away halfway through
+    with stage("decision", hint=format_hint) as s:
+        decision = decision_agent.analyze_and_decide(query, context, format_hint)
+        # Under load a video answer becomes audio, and audio becomes text
+        decision = admission.degrade(decision)
+        s.set(format=decision["format"], degraded=decision["degraded_for_load"])
+
+    # Rate limit audio
+    if decision["format"] in ["audio"] and generate_audio:
+        a_ok, _ = check_and_increment("audio")
+        if not a_ok:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Audio limit reached ({LIMITS['audio']}/day). "
+                       f"Try text format or come back tomorrow."
+            )
+
+    try:
+        with span("explanation", language=language):
+            explanation = content_agent.generate_explanation(
+                query=query,
+                context=context,
+                format_type=decision['format'],
+                language=language
+            )
+    except Exception:
+        if decision["format"] in ["audio"] and generate_audio:
+            refund_usage("audio")
+        raise
+    return decision, explanation
+
+
 # ── Video ─────────────────────────────────────────────────────────────────────
 
 @app.post("/api/generate-video")
 async def generate_video(
     request: Request,
     query: str = Form(...),
-    language: str = Form("auto")
+    language: str = Form("auto"),
+    profile: str = Form("standard"),
+    upgrade_to: str = Form("")
 ):
     # IP rate limit
     ip = get_client_ip(request)
@@ -349,9 +500,21 @@ async def generate_video(
     if not q_ok:
         raise HTTPException(status_code=400, detail=q_msg)
 
-    if not current_content:
+    context = current_content()
+    if not context:
         raise HTTPException(status_code=400, detail="No document uploaded")
 
+    # Render profile, plus an optional second profile rendered after it
+    # (e.g. profile=preview&upgrade_to=standard)
+    try:
+        profile = get_profile(profile)["name"]
+        upgrade_to = get_profile(upgrade_to)["name"] if upgrade_to else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Shed before spending the daily allowance if renders are backed up
+    admission.admit("video")
+
     # Daily video limit
     v_ok, _ = check_and_increment("video")
     if not v_ok:
@@ -361,137 +524,177 @@ async def generate_video(
                    f"Try audio or text format instead."
         )
 
+    effective_language = (
+        language if language != "auto" else detect_language(query)
+    )
+
+    # The render runs on a background worker — return a job ID straight away
     try:
-        effective_language = (
-            language if language != "auto" else detect_language(query)
+        job = video_jobs.submit(
+            render_video_job,
+            query=query,
+            context=context,
+            language=effective_language,
+            profile=profile,
+            upgrade_to=upgrade_to
+        )
+    except QueueFull:
+        # Nothing was rendered — give the daily allowance back
+        refund_usage("video")
+        raise HTTPException(
+            status_code=503,
+            detail="Video renderer is busy. Please try again in a minute.",
+            headers={"Retry-After": "60"}
         )
 
-        print(f"\n{'='*60}")
-        print(f"🎬 VIDEO GENERATION: {query}")
-        print(f"{'='*60}")
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/api/jobs/{job['job_id']}",
+        "query": query,
+        "detected_language": effective_language,
+        "profile": profile
+    })
 
-        print("📝 Generating explanation...")
-        explanation = content_agent.generate_explanation(
-            query=query,
-            context=current_content,
-            format_type='video',
-            language=effective_language
-        )
-        print(f"✅ Explanation: {len(explanation['text'])} chars")
 
-        # Get grounded context for video agent — avoids hallucination cascading
-        grounded_context = content_agent.retrieve_for_video(
-            query=query,
-            context=current_content,
-            top_k=5
-        )
+def render_video_job(progress, query: str, context: str, language: str,
+                     profile: str, upgrade_to: str = None) -> dict:
+    logger.info(f"🎬 VIDEO GENERATION ({profile}): {query}")
 
-        print("\n🎞️  Planning video scenes...")
-        scene_plan = video_agent.plan_scenes(
+    try:
+        # Diagram, TTS and frame rendering overlap once the scene plan exists
+        result = video_pipeline.run(
             query=query,
-            explanation=explanation['text'],
-            language=effective_language,
-            grounded_context=grounded_context   # ← grounded, not hallucinated
-        )
-        print(f"✅ {len(scene_plan['scenes'])} scenes planned")
-        for scene in scene_plan['scenes']:
-            print(f"   Scene {scene['id']}: {scene['type']} (~{scene.get('duration', 0):.0f}s)")
-
-        print("\n📊 Rendering diagram...")
-        diagram_path = diagram_service.mermaid_to_png(scene_plan['mermaid_diagram'])
-        print("✅ Diagram rendered")
-
-        print("\n🎤 Generating scene audio...")
-        audio_clips = tts_service.generate_audio_batch(
-            scenes=scene_plan['scenes'],
-            language=effective_language
+            context=context,
+            language=language,
+            progress=progress,
+            profile=profile
         )
+    except Exception as e:
+        logger.error(f"❌ VIDEO GENERATION FAILED: {e}")
+        raise
 
-        if not audio_clips:
-            raise Exception("Audio generation failed for all scenes")
+    response = video_job_result(result, query, language, profile)
+
+    # The preview is done — queue the full-quality render of the same plan
+    # and narration, so only frames and the encode run again
+    if upgrade_to and upgrade_to != profile:
+        # The follow-up may wait behind other renders — pin its inputs first
+        pinned = video_pipeline.pin_inputs(result['audio_clips'], result['diagram_path'])
+        try:
+            follow_up = video_jobs.submit(
+                rerender_video_job,
+                query=query,
+                language=language,
+                profile=upgrade_to,
+                scene_plan=result['scene_plan'],
+                **pinned
+            )
+            response["upgrade"] = {
+                "profile": upgrade_to,
+                "job_id": follow_up["job_id"],
+                "status_url": f"/api/jobs/{follow_up['job_id']}"
+            }
+        except QueueFull:
+            shutil.rmtree(pinned["pinned_dir"], ignore_errors=True)
+            logger.warning(f"⚠️ Render queue full — skipping {upgrade_to} follow-up")
+            response["upgrade"] = None
+
+    return response
+
+
+def rerender_video_job(progress, query: str, language: str, profile: str,
+                       scene_plan: dict, audio_clips: list, diagram_path: str,
+                       pinned_dir: str) -> dict:
+    logger.info(f"🎬 Re-rendering at {profile}: {query}")
+    result = video_pipeline.rerender(
+        scene_plan=scene_plan,
+        audio_clips=audio_clips,
+        diagram_path=diagram_path,
+        profile=profile,
+        progress=progress,
+        pinned_dir=pinned_dir
+    )
+    return video_job_result(result, query, language, profile)
 
-        total_duration = sum(clip['duration'] for clip in audio_clips)
-        print(f"✅ {len(audio_clips)} audio clips ({total_duration:.1f}s total)")
 
-        print("\n🎬 Composing video...")
-        video_path = video_service.create_video(
-            scenes=scene_plan['scenes'],
-            audio_clips=audio_clips,
-            diagram_path=diagram_path
-        )
+def video_job_result(result: dict, query: str, language: str, profile: str) -> dict:
+    scene_plan = result['scene_plan']
+    audio_clips = result['audio_clips']
+    total_duration = sum(clip['duration'] for clip in audio_clips)
+    filename = Path(result['video_path']).name
 
-        filename = Path(video_path).name
+    logger.info(f"✅ VIDEO COMPLETE: {filename} ({result['timings']['total']:.1f}s)")
 
-        print(f"\n{'='*60}")
-        print(f"✅ VIDEO COMPLETE: {filename}")
-        print(f"{'='*60}\n")
+    return {
+        "success": True,
+        "query": query,
+        "detected_language": language,
+        "profile": profile,
+        "video_filename": filename,
+        "video_url": f"/api/video/{filename}",
+        "scenes": len(scene_plan['scenes']),
+        "duration": int(total_duration),
+        "audio_clips": len(audio_clips),
+        "sync_method": "scene-by-scene",
+        "timings": result['timings']
+    }
 
-        return {
-            "success": True,
-            "query": query,
-            "detected_language": effective_language,
-            "video_filename": filename,
-            "video_url": f"/api/video/{filename}",
-            "scenes": len(scene_plan['scenes']),
-            "duration": int(total_duration),
-            "audio_clips": len(audio_clips),
-            "sync_method": "scene-by-scene"
-        }
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        print(f"\n❌ VIDEO GENERATION FAILED: {e}\n")
-        raise HTTPException(status_code=500, detail=f"Video generation failed: {str(e)}")
+@app.get("/api/jobs/{job_id}")
+def job_status(job_id: str):
+    job = video_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
 
 
 # ── Media serving ─────────────────────────────────────────────────────────────
 
+# Range, ETag/Last-Modified and Cache-Control handling lives in media.py
+
 @app.get("/api/video/{filename}")
-async def serve_video(filename: str):
+async def serve_video(filename: str, request: Request):
     # Prevent path traversal
     safe = Path(filename).name
     file_path = Path("outputs/video") / safe
-    if not file_path.exists():
+    if not file_path.is_file():
         raise HTTPException(status_code=404, detail="Video not found")
-    return FileResponse(path=file_path, media_type="video/mp4", filename=safe)
+    return media_response(request, file_path, "video/mp4")
 
 
 @app.get("/api/audio/{filename}")
-async def serve_audio(filename: str):
+async def serve_audio(filename: str, request: Request):
     safe = Path(filename).name
     file_path = Path("outputs/audio") / safe
-    if not file_path.exists():
+    if not file_path.is_file():
         raise HTTPException(status_code=404, detail="Audio not found")
-    return FileResponse(path=file_path, media_type="audio/mpeg", filename=safe)
+    return media_response(request, file_path, "audio/mpeg")
 
 
 @app.get("/api/export/{filename}")
-async def serve_export(filename: str):
-    safe = Path(filename).name
-    file_path = Path("outputs/exports") / safe
-    if not file_path.exists():
+def serve_export(filename: str, request: Request):
+    # Sync handler — a first download lays out the PDF on a worker thread
+    file_path = export_service.pdf_path(Path(filename).name)
+    if file_path is None:
         raise HTTPException(status_code=404, detail="Export not found")
-    return FileResponse(path=file_path, media_type="application/pdf", filename=safe)
+    return media_response(request, Path(file_path), "application/pdf")
 
 
 @app.get("/api/usage")
 def get_usage():
-    today = datetime.now().date().isoformat()
-    if usage["reset_date"] != today:
-        usage["video"] = 0
-        usage["audio"] = 0
-        usage["reset_date"] = today
+    used = {type_: state.value(usage_key(type_)) for type_ in ("video", "audio")}
     return {
         "video": {
-            "used": usage["video"],
+            "used": used["video"],
             "limit": LIMITS["video"],
-            "remaining": LIMITS["video"] - usage["video"]
+            "remaining": LIMITS["video"] - used["video"]
         },
         "audio": {
-            "used": usage["audio"],
+            "used": used["audio"],
             "limit": LIMITS["audio"],
-            "remaining": LIMITS["audio"] - usage["audio"]
+            "remaining": LIMITS["audio"] - used["audio"]
         },
         "resets": "daily"
     }
@@ -502,6 +705,93 @@ def tts_status():
     return tts_service.get_status()
 
 
+@metrics.register_collector
+def _service_metrics() -> list:
+    # A scrape reports on services that exist; it never builds one
+    jobs = video_jobs.stats()
+    caches = {"language": language_detect.cache_stats()}
+    if diagram_service.loaded:
+        caches["diagram"] = diagram_service.cache.stats()
+    if video_service.loaded:
+        caches["video_segment"] = video_service.segments.stats()
+    if export_service.loaded:
+        caches["export_pdf"] = export_service.pdfs.stats()
+    lane_stats = lanes.stats()
+    families = metrics.cache_samples(caches) + [
+        ("explainbot_render_jobs", "gauge", "Render jobs by status.",
+         [({"status": s}, jobs[s]) for s in ("queued", "running", "done", "failed")]),
+        ("explainbot_lane_waiting", "gauge", "Tasks waiting for a worker, by priority lane.",
+         [({"lane": name}, s["waiting"]) for name, s in lane_stats.items()]),
+        ("explainbot_lane_running", "gauge", "Tasks running, by priority lane.",
+         [({"lane": name}, s["running"]) for name, s in lane_stats.items()]),
+        ("explainbot_lane_rejected_total", "counter", "Tasks turned away with 503, by priority lane.",
+         [({"lane": name}, s["rejected"]) for name, s in lane_stats.items()]),
+        ("explainbot_lane_expected_wait_seconds", "gauge",
+         "Wait a new task would see, as estimated by admission control.",
+         [({"lane": name}, s["expected_wait_seconds"]) for name, s in admission.status().items()]),
+    ]
+    if tts_service.loaded:
+        tts = tts_service.get_status()["elevenlabs"]
+        families.append(("explainbot_tts_quota_remaining_characters", "gauge",
+                         "ElevenLabs characters left.", [({}, tts["chars_remaining"])]))
+    return families
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/api/debug/traces")
+def debug_traces():
+    if not tracing.TRACE_DEBUG:
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"traces": tracing.recent_traces()}
+
+
+@app.get("/api/debug/traces/{request_id}")
+def debug_trace(request_id: str):
+    # Span tree for one request, including a video job's spans as they land
+    trace = tracing.get_trace(request_id) if tracing.TRACE_DEBUG else None
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+
+def require_profile_token(request: Request):
+    if not profiling.authorised(request.headers.get("X-Profile-Token", "")):
+        raise HTTPException(status_code=404, detail="Not found")
+
+
+@app.get("/api/debug/profiles")
+def list_profiles(request: Request):
+    require_profile_token(request)
+    files = sorted(profiling.PROFILE_DIR.glob("profile_*.folded"),
+                   key=lambda f: f.stat().st_mtime, reverse=True)
+    return {"profiles": [{"filename": f.name, "url": f"/api/debug/profiles/{f.name}",
+                          "bytes": f.stat().st_size} for f in files]}
+
+
+@app.get("/api/debug/profiles/{filename}")
+def download_profile(filename: str, request: Request):
+    require_profile_token(request)
+    file_path = profiling.PROFILE_DIR / Path(filename).name
+    if not file_path.is_file() or not file_path.name.startswith("profile_"):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return media_response(request, file_path, "text/plain", immutable=False)
+
+
+@app.get("/api/lanes")
+def lane_status():
+    load = admission.status()
+    return {name: {**stats, **load[name]} for name, stats in lanes.stats().items()}
+
+
+@app.get("/api/render/profiles")
+def render_profiles():
+    return video_service.render_stats()
+
+
 # Serve frontend — must be LAST
 app.mount("/", StaticFiles(directory="../frontend", html=True), name="frontend")
 
@@ -0,0 +1,60 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# Generated media never changes once written — every render gets a fresh
+# unique filename — so clients may keep it for a year without revalidating
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def _etag(stat: os.stat_result) -> str:
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def _not_modified(request: Request, etag: str, stat: os.stat_result) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison, as RFC 9110 requires for If-None-Match
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(stat.st_mtime) <= since
+    return False
+
+
+def media_response(request: Request, file_path: Path, media_type: str,
+                   immutable: bool = True) -> Response:
+    """
+    Serve a generated file with validators and caching headers.
+
+    Conditional GETs (If-None-Match / If-Modified-Since) get a bodyless 304;
+    everything else is a FileResponse, which also answers Range and
+    If-Range requests with 206 partial content so players can seek.
+    """
+    stat = file_path.stat()
+    headers = {
+        "ETag": _etag(stat),
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Accept-Ranges": "bytes"
+    }
+
+    if _not_modified(request, headers["ETag"], stat):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path=file_path,
+        media_type=media_type,
+        filename=file_path.name,
+        headers=headers,
+        stat_result=stat
+    )
@@ -0,0 +1,273 @@
+import logging
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from starlette.routing import Match, Mount
+
+logger = logging.getLogger("explainbot.metrics")
+
+# ── Metrics ──────────────────────────────────────────────────────────────────
+#
+# Counters, gauges and histograms served at /metrics in the Prometheus text
+# format. Recording is a lock and a few additions, so it's safe on every
+# request. Values are per process: under `--workers N` each scrape sees the
+# worker that answered it.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds — from sub-millisecond detection up to multi-minute renders
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_metrics: list = []
+_collectors: list = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            samples = list(self._samples())
+        for suffix, labels, value in samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield "", dict(zip(self.labels, key)), value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield "", dict(zip(self.labels, key)), value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (last slot is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        for key, (counts, total) in self._values.items():
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+@contextmanager
+def timed_call(histogram: Histogram, **labels):
+    """histogram.time(), plus outcome="ok" or "error" by whether the block raised."""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        histogram.observe(time.perf_counter() - start, outcome=outcome, **labels)
+
+
+def register_collector(fn):
+    """
+    `fn()` is called on every scrape and returns (name, kind, help, samples)
+    tuples, samples being [(labels_dict, value)] — for values that already
+    live elsewhere, such as cache hit counts and job queue depth.
+    """
+    _collectors.append(fn)
+    return fn
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            logger.warning(f"⚠️ Metrics collector {collector.__name__} failed: {e}")
+            continue
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ── Application metrics ──────────────────────────────────────────────────────
+
+STAGE_SECONDS = Histogram(
+    "explainbot_stage_seconds",
+    "Time spent in each pipeline stage.", ("stage",)
+)
+LLM_SECONDS = Histogram(
+    "explainbot_llm_seconds",
+    "Latency of each LLM call, by calling agent and outcome.", ("agent", "outcome")
+)
+LLM_TOKENS_ESTIMATED = Counter(
+    "explainbot_llm_prompt_tokens_estimated_total",
+    "Estimated prompt tokens sent, by stage.", ("stage",)
+)
+TTS_SECONDS = Histogram(
+    "explainbot_tts_seconds",
+    "Latency of each TTS call, by provider and outcome.", ("provider", "outcome")
+)
+TTS_CHARACTERS = Counter(
+    "explainbot_tts_characters_total",
+    "Characters synthesised, by provider.", ("provider",)
+)
+LANE_WAIT_SECONDS = Histogram(
+    "explainbot_lane_wait_seconds",
+    "Time tasks waited for a worker, by priority lane.", ("lane",)
+)
+ADMISSION_DECISIONS = Counter(
+    "explainbot_admission_decisions_total",
+    "Admission control outcomes (admitted / degraded / shed), by lane.", ("lane", "outcome")
+)
+HTTP_SECONDS = Histogram(
+    "explainbot_http_request_seconds",
+    "HTTP request latency, by route template and status.", ("method", "handler", "status")
+)
+HTTP_IN_FLIGHT = Gauge(
+    "explainbot_http_requests_in_flight",
+    "Requests currently being handled, by route template.", ("handler",)
+)
+
+
+def cache_samples(stats: dict) -> list:
+    """Collector families for {cache_name: {"hits", "misses", "hit_rate"}}."""
+    return [
+        ("explainbot_cache_hits_total", "counter", "Cache hits, by cache.",
+         [({"cache": name}, s["hits"]) for name, s in stats.items()]),
+        ("explainbot_cache_misses_total", "counter", "Cache misses, by cache.",
+         [({"cache": name}, s["misses"]) for name, s in stats.items()]),
+        ("explainbot_cache_hit_ratio", "gauge", "Hits / lookups since start, by cache.",
+         [({"cache": name}, s["hit_rate"]) for name, s in stats.items()]),
+    ]
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware tracking in-flight requests and latency per route
+    template (e.g. /api/jobs/{job_id}), so ids never become label values.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    def _handler(self, scope) -> str:
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return "static" if isinstance(route, Mount) else route.path
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        handler = self._handler(scope)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(handler=handler)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec(handler=handler)
+            HTTP_SECONDS.observe(time.perf_counter() - start, method=scope["method"],
+                                 handler=handler, status=status["code"])
@@ -0,0 +1,233 @@
+import os
+import sys
+import hmac
+import time
+import logging
+import threading
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from services.file_cache import FileCache
+
+logger = logging.getLogger("explainbot.profiling")
+
+# ── Per-request sampling profiler ────────────────────────────────────────────
+#
+# Off unless PROFILE_TOKEN is set. A request carrying
+# `X-Profile-Token: <PROFILE_TOKEN>` then runs under a sampling profiler:
+# every PROFILE_INTERVAL_MS a background thread grabs the Python stack of
+# each thread working for that request — the handler, pipeline stages,
+# TTS and encode waiters, and the render job it queued — and counts them.
+# The result is written to outputs/profiles/ in collapsed-stack format
+# ("frame;frame;frame count", readable by speedscope or flamegraph.pl)
+# once the request and everything it queued has finished.
+#
+# Encodes inside the render process pool are not sampled; their time shows
+# up as the waiting thread blocked on the future. Handlers that run on the
+# event loop share that thread with other requests, whose stacks may be
+# sampled too.
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000
+PROFILE_MAX_DEPTH = 128
+PROFILE_DIR = Path("outputs/profiles")
+
+_session = contextvars.ContextVar("profile_session", default=None)
+
+_active: set = set()
+_active_lock = threading.Lock()
+_sampler = None
+
+# Built with the first captured profile, so nothing touches the disk in
+# processes that never profile (render workers, PROFILE_TOKEN unset)
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def profile_store() -> FileCache:
+    global _profiles
+    if _profiles is None:
+        with _profiles_lock:
+            if _profiles is None:
+                _profiles = FileCache(PROFILE_DIR, prefix="profile_", suffix=".folded",
+                                      max_entries=int(os.getenv("PROFILE_KEEP", "50")))
+    return _profiles
+
+
+def authorised(token: str) -> bool:
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+class Session:
+    """
+    Stacks sampled for one request. Threads join with enter()/exit();
+    hold()/release() keep it open for queued work that hasn't started yet.
+    It is saved when the last reference goes.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self._threads: Counter = Counter()
+        self._refs = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def enter(self) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self._refs += 1
+            self._threads[threading.get_ident()] += 1
+            return True
+
+    def exit(self):
+        with self._lock:
+            tid = threading.get_ident()
+            self._threads[tid] -= 1
+            if self._threads[tid] <= 0:
+                del self._threads[tid]
+        self.release()
+
+    def hold(self) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self._refs += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._refs -= 1
+            if self._refs > 0 or self._closed:
+                return
+            self._closed = True
+        _stop(self)
+        self._save()
+
+    def threads(self) -> list:
+        with self._lock:
+            return list(self._threads)
+
+    def record(self, frame):
+        stack = []
+        while frame is not None and len(stack) < PROFILE_MAX_DEPTH:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+            frame = frame.f_back
+        with self._lock:
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def _save(self):
+        with self._lock:
+            lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        try:
+            path = profile_store().put(self.key, lambda p: Path(p).write_text("\n".join(lines) + "\n"))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save profile {self.key}: {e}")
+            return
+        elapsed = time.perf_counter() - self.started
+        logger.info(f"🔬 Profile saved: {Path(path).name} ({self.samples} samples over {elapsed:.1f}s)")
+
+
+def _start(session: Session):
+    global _sampler
+    with _active_lock:
+        _active.add(session)
+        if _sampler is None or not _sampler.is_alive():
+            _sampler = threading.Thread(target=_sample_loop, name="profile-sampler", daemon=True)
+            _sampler.start()
+
+
+def _stop(session: Session):
+    with _active_lock:
+        _active.discard(session)
+
+
+def _sample_loop():
+    # Exits once no session is active, so nothing runs while profiling is idle
+    global _sampler
+    while True:
+        with _active_lock:
+            sessions = list(_active)
+            if not sessions:
+                _sampler = None
+                return
+        frames = sys._current_frames()
+        for session in sessions:
+            for tid in session.threads():
+                frame = frames.get(tid)
+                if frame is not None:
+                    session.record(frame)
+        time.sleep(PROFILE_INTERVAL)
+
+
+# ── Hooks for the rest of the app ───────────────────────────────────────────
+
+@contextmanager
+def enrolled():
+    """Sample the current thread for the active session, if any, while inside."""
+    session = _session.get()
+    if session is None or not session.enter():
+        yield
+        return
+    try:
+        yield
+    finally:
+        session.exit()
+
+
+def hold():
+    """
+    Keep the active session open for work that will start later (a queued
+    render job). Returns a release callable, or None when not profiling.
+    """
+    session = _session.get()
+    if session is None or not session.hold():
+        return None
+    return session.release
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+
+class ProfileMiddleware:
+    """
+    Profiles requests that present the admin token; others pass straight
+    through after one header lookup. Must sit inside TraceMiddleware, whose
+    request ID names the profile.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = dict(scope["headers"]).get(b"x-profile-token")
+        if (token is None or scope["path"].startswith("/api/debug/profiles")
+                or not authorised(token.decode("latin-1"))):
+            await self.app(scope, receive, send)
+            return
+
+        key = scope.get("state", {}).get("request_id") or os.urandom(8).hex()
+        session = Session(key)
+        url = f"/api/debug/profiles/{profile_store().path_for(key).name}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile", url.encode())]
+            await send(message)
+
+        token = _session.set(session)
+        session.enter()
+        _start(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            session.exit()
+            _session.reset(token)
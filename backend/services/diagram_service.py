@@ -1,39 +1,116 @@
-import requests
+import os
+import logging
+import re
+import uuid
 import base64
-import time
 from pathlib import Path
+from services.file_cache import FileCache
+from services.mermaid_renderer import render_mermaid, split_statements, UnsupportedDiagram
+from tracing import stage
+
+logger = logging.getLogger("explainbot.diagram")
+
+# Bump when the renderer output changes so stale cached PNGs are not reused
+RENDER_VERSION = "1"
+
+_EDGE_STATEMENT = re.compile(r"--|==|-\.|~~~")
+_STRUCTURAL = ("subgraph", "end", "direction", "classDef", "class", "style", "linkStyle", "click")
+
+
+def normalise_mermaid(mermaid_code: str) -> str:
+    """
+    Canonical form used for the cache key and for rendering:
+    comments and blank lines dropped, whitespace collapsed, `graph` spelled
+    `flowchart`, and each run of flowchart edge statements sorted so the
+    same graph declared in a different order maps to the same PNG.
+    Sequence diagrams keep their order — it is meaningful there.
+    """
+    lines = []
+    for raw in mermaid_code.strip().splitlines():
+        line = re.sub(r"\s+", " ", raw).strip()
+        if line and not line.startswith("%%"):
+            lines.append(line)
+    if not lines:
+        return ""
+
+    has_type = any(lines[0].startswith(t) for t in [
+        "graph", "sequenceDiagram", "flowchart",
+        "classDiagram", "erDiagram", "gantt", "pie"
+    ])
+    if not has_type:
+        lines.insert(0, "graph TD")
+
+    if not lines[0].startswith(("graph", "flowchart")):
+        return "\n".join(lines)
+
+    statements = [s for line in lines for s in split_statements(line)]
+    header = statements[0].split()
+    header[0] = "flowchart"
+    if len(header) > 1:
+        header[1] = "TD" if header[1].upper() == "TB" else header[1].upper()
+    out = [" ".join(header)]
+
+    run = []
+    for stmt in statements[1:]:
+        if _EDGE_STATEMENT.search(stmt) and not stmt.startswith(_STRUCTURAL):
+            run.append(stmt)
+            continue
+        out.extend(sorted(run))
+        run = []
+        out.append(stmt)
+    out.extend(sorted(run))
+    return "\n".join(out)
 
 
 class DiagramService:
     def __init__(self):
         self.output_dir = Path("outputs/diagrams")
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache = FileCache(
+            self.output_dir, prefix="diagram_", suffix=".png",
+            max_entries=int(os.getenv("DIAGRAM_CACHE_MAX", "200"))
+        )
 
     def mermaid_to_png(self, mermaid_code: str) -> str:
-        clean_code = mermaid_code.strip()
+        with stage("diagram"):
+            return self._mermaid_to_png(mermaid_code)
+
+    def _mermaid_to_png(self, mermaid_code: str) -> str:
+        clean_code = normalise_mermaid(mermaid_code)
+        key = FileCache.make_key(RENDER_VERSION, clean_code)
+
+        cached = self.cache.get(key)
+        if cached:
+            logger.info(f"✅ Diagram cache hit: {Path(cached).name}")
+            return cached
+
+        # flowchart/graph/sequenceDiagram render in-process — no network needed
+        try:
+            img = render_mermaid(clean_code)
+            output_path = self.cache.put(key, lambda p: img.save(p, format="PNG"))
+            logger.info(f"✅ Diagram rendered locally: {Path(output_path).name}")
+            return output_path
+        except UnsupportedDiagram as e:
+            logger.warning(f"⚠️ Local renderer can't draw '{e}', trying mermaid.ink")
+        except Exception as e:
+            logger.warning(f"⚠️ Local diagram render failed: {e}, using fallback")
+            return self._create_fallback_diagram(mermaid_code)
 
-        # Only add graph TD if no diagram type is specified
-        has_type = any(clean_code.startswith(t) for t in [
-            "graph", "sequenceDiagram", "flowchart",
-            "classDiagram", "erDiagram", "gantt", "pie"
-        ])
-        if not has_type:
-            clean_code = "graph TD;\n" + clean_code
+        return self._render_remote(key, clean_code, mermaid_code)
 
+    def _render_remote(self, key: str, clean_code: str, mermaid_code: str) -> str:
+        import requests
         encoded = base64.urlsafe_b64encode(clean_code.encode()).decode()
         url = f"https://mermaid.ink/img/{encoded}?bgColor=white&width=1200&height=600"
 
         try:
             response = requests.get(url, timeout=15)
             response.raise_for_status()
-            timestamp = int(time.time())
-            output_path = self.output_dir / f"diagram_{timestamp}.png"
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
-            print(f"✅ Diagram rendered: {output_path.name}")
-            return str(output_path)
+            output_path = self.cache.put(key, lambda p: Path(p).write_bytes(response.content))
+            logger.info(f"✅ Diagram rendered: {Path(output_path).name}")
+            return output_path
         except Exception as e:
-            print(f"⚠️ Mermaid.ink failed: {e}, using fallback")
+            logger.warning(f"⚠️ Mermaid.ink failed: {e}, using fallback")
             return self._create_fallback_diagram(mermaid_code)
 
     def _create_fallback_diagram(self, mermaid_code: str) -> str:
@@ -43,7 +120,8 @@ class DiagramService:
         draw.rectangle([(20, 20), (1180, 580)], outline='#dee2e6', width=3)
         draw.text((60, 50), "Diagram", fill='#495057')
         draw.text((60, 120), mermaid_code[:200], fill='#6c757d')
-        timestamp = int(time.time())
-        output_path = self.output_dir / f"diagram_{timestamp}.png"
+        # Not cached — a failed render shouldn't stick for this source
+        output_path = self.output_dir / f"diagram_fallback_{uuid.uuid4().hex[:12]}.png"
         img.save(str(output_path))
+        self.cache.evict()
         return str(output_path)
@@ -0,0 +1,119 @@
+import os
+import logging
+import re
+import json
+from pathlib import Path
+from typing import Optional
+from services.file_cache import FileCache
+from tracing import stage
+
+logger = logging.getLogger("explainbot.export")
+
+# Bump when the PDF layout changes so stale cached exports are not reused
+EXPORT_VERSION = "1"
+
+_FILENAME = re.compile(r"export_([0-9a-f]{20})\.pdf")
+
+
+def _build_styles() -> dict:
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle', parent=styles['Title'],
+            fontSize=18, textColor=colors.HexColor('#1e3a8a'), spaceAfter=12
+        ),
+        "meta": ParagraphStyle(
+            'Meta', parent=styles['Normal'],
+            fontSize=9, textColor=colors.HexColor('#94a3b8'), spaceAfter=20
+        ),
+        "body": ParagraphStyle(
+            'Body', parent=styles['Normal'],
+            fontSize=11, leading=18, spaceAfter=8
+        ),
+    }
+
+
+class ExportService:
+    """
+    PDF exports of explanations, rendered only when someone downloads one.
+
+    `register()` is all the explain endpoint pays for: it stores the
+    query, text and language as a small JSON source under a hash of the
+    three and returns the export's filename. The first request for that
+    filename lays out the PDF; later requests (and repeats of the same
+    explanation) are served from the cache.
+    """
+
+    def __init__(self):
+        self.output_dir = Path("outputs/exports")
+        max_entries = int(os.getenv("EXPORT_CACHE_MAX", "200"))
+        self.pdfs = FileCache(self.output_dir, prefix="export_", suffix=".pdf",
+                              max_entries=max_entries)
+        # Sources outlive their PDFs so an evicted export can be rebuilt
+        self.sources = FileCache(self.output_dir, prefix="export_", suffix=".json",
+                                 max_entries=max_entries * 5)
+        # ParagraphStyles are built once, on the first export rather than at startup
+        self._styles = None
+
+    def register(self, query: str, explanation_text: str, language: str) -> str:
+        key = FileCache.make_key(EXPORT_VERSION, query, explanation_text, language)
+        if self.sources.get(key) is None:
+            source = json.dumps({"query": query, "text": explanation_text, "language": language})
+            self.sources.put(key, lambda p: Path(p).write_text(source, encoding="utf-8"))
+        return self.pdfs.path_for(key).name
+
+    def pdf_path(self, filename: str) -> Optional[str]:
+        """Path to the export's PDF, building it on first request; None if unknown."""
+        match = _FILENAME.fullmatch(filename)
+        if not match:
+            return None
+        key = match.group(1)
+
+        cached = self.pdfs.get(key)
+        if cached:
+            return cached
+
+        source = self.sources.get(key)
+        if source is None:
+            return None
+        data = json.loads(Path(source).read_text(encoding="utf-8"))
+        with stage("pdf_export"):
+            path = self.pdfs.put(key, lambda p: self._build(p, data["query"], data["text"], data["language"]))
+        logger.info(f"📄 Export rendered: {Path(path).name}")
+        return path
+
+    @property
+    def styles(self) -> dict:
+        if self._styles is None:
+            self._styles = _build_styles()
+        return self._styles
+
+    def _build(self, output_path: str, query: str, explanation_text: str, language: str):
+        # reportlab is only imported once a PDF is actually laid out
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+        from reportlab.lib.units import inch
+        doc = SimpleDocTemplate(
+            output_path,
+            pagesize=letter,
+            rightMargin=inch, leftMargin=inch,
+            topMargin=inch, bottomMargin=inch
+        )
+
+        clean_text = re.sub(r'\*\*(.*?)\*\*', r'\1', explanation_text)
+        clean_text = re.sub(r'\*(.*?)\*', r'\1', clean_text)
+
+        story = [
+            Paragraph("ExplainBot AI", self.styles["title"]),
+            Paragraph(f"Query: {query} &nbsp;|&nbsp; Language: {language.upper()}", self.styles["meta"]),
+            Spacer(1, 0.2 * inch),
+        ]
+        for para in clean_text.split('\n\n'):
+            para = para.strip()
+            if para:
+                story.append(Paragraph(para.replace('\n', '<br/>'), self.styles["body"]))
+                story.append(Spacer(1, 0.1 * inch))
+
+        doc.build(story)
@@ -0,0 +1,106 @@
+import os
+import subprocess
+
+
+def ffmpeg_binary() -> str:
+    """ffmpeg to invoke: FFMPEG_BINARY, else the one imageio-ffmpeg ships (as MoviePy uses)."""
+    configured = os.getenv("FFMPEG_BINARY")
+    if configured:
+        return configured
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def ffmpeg_version() -> str:
+    """First line of `ffmpeg -version`; raises if the binary can't be run."""
+    proc = subprocess.run([ffmpeg_binary(), "-version"], capture_output=True, text=True, timeout=10)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg -version exited {proc.returncode}")
+    return proc.stdout.splitlines()[0] if proc.stdout else "unknown"
+
+
+def run_ffmpeg(args: list, timeout: float = 600):
+    cmd = [ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y", *args]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-5:]
+        raise RuntimeError(f"ffmpeg exited {proc.returncode}: {' | '.join(tail)}")
+
+
+def encode_segment(frame: str, duration: float, output_path: str,
+                   fps: int, bitrate: str, preset: str, threads: int,
+                   fade: float = 0.3):
+    """
+    Encode one scene's picture — a still frame held for `duration` seconds
+    and faded in and out from black. Segments carry no audio; narration is
+    joined separately by `assemble` so it is never decoded.
+
+    Every segment is written with identical stream parameters so a run of
+    them can be joined without re-encoding.
+
+    The PNG is decoded once and held with `tpad` clones; `-loop 1` would
+    re-decode the image for every output frame.
+    """
+    fade_out_at = max(0.0, duration - fade)
+    run_ffmpeg([
+        "-framerate", str(fps), "-i", frame,
+        "-vf",
+        f"format=yuv420p,setsar=1,"
+        f"tpad=stop_mode=clone:stop_duration={duration:.3f},trim=duration={duration:.3f},"
+        f"fade=t=in:st=0:d={fade},fade=t=out:st={fade_out_at:.3f}:d={fade}",
+        "-an",
+        "-r", str(fps),
+        "-c:v", "libx264", "-preset", preset, "-tune", "stillimage",
+        "-b:v", bitrate, "-pix_fmt", "yuv420p",
+        "-threads", str(threads),
+        output_path
+    ])
+
+
+def encode_mp3(output_path: str, duration: float, sample_rate: int, channels: int,
+               source: str = None):
+    """MP3 at the given format: `source` resampled, or silence when there is none."""
+    if source:
+        inputs = ["-i", source]
+    else:
+        layout = "mono" if channels == 1 else "stereo"
+        inputs = ["-f", "lavfi", "-t", f"{duration:.3f}",
+                  "-i", f"anullsrc=r={sample_rate}:cl={layout}"]
+    run_ffmpeg([
+        *inputs,
+        "-ar", str(sample_rate), "-ac", str(channels),
+        "-c:a", "libmp3lame", "-b:a", "128k",
+        output_path
+    ], timeout=60)
+
+
+def _write_concat_list(paths: list, list_path: str):
+    with open(list_path, "w") as f:
+        for path in paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+
+def assemble(segment_paths: list, audio_paths: list, output_path: str, scratch_dir: str):
+    """
+    Join video segments from `encode_segment` and per-scene MP3s into one
+    MP4 by stream copy — no decode, no encode. The MP3s must already share
+    a sample rate and channel count.
+    """
+    video_list = os.path.join(scratch_dir, "segments.txt")
+    audio_list = os.path.join(scratch_dir, "narration.txt")
+    _write_concat_list(segment_paths, video_list)
+    _write_concat_list(audio_paths, audio_list)
+
+    run_ffmpeg([
+        "-f", "concat", "-safe", "0", "-i", video_list,
+        "-f", "concat", "-safe", "0", "-i", audio_list,
+        "-map", "0:v", "-map", "1:a",
+        "-c", "copy",
+        # Index (moov) at the front so playback starts before the download ends
+        "-movflags", "+faststart",
+        output_path
+    ], timeout=120)
@@ -0,0 +1,106 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class FileCache:
+    """
+    Directory of rendered artifacts named `{prefix}{key}{suffix}`.
+
+    Keys are content hashes, so a hit means the exact same output was
+    already produced. Once the directory holds more than `max_entries`
+    matching files the least recently used ones are deleted — except any
+    used in the last `EVICT_GRACE` seconds, whose path a caller may be
+    about to open.
+
+    Use is the later of the file's mtime (when it was written) and this
+    process's last hit on it. Hits are kept in memory rather than by
+    touching the file, because media.py builds ETag and Last-Modified
+    from the mtime and they must not change on every download.
+    """
+
+    EVICT_GRACE = 60.0
+
+    def __init__(self, directory: Path, prefix: str, suffix: str, max_entries: int):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.suffix = suffix
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._last_hit: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(part if isinstance(part, bytes) else str(part).encode())
+            h.update(b"\0")
+        return h.hexdigest()[:20]
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{self.prefix}{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self.path_for(key)
+        with self._lock:
+            if not path.exists():
+                self.misses += 1
+                return None
+            self._last_hit[path.name] = time.time()
+            self.hits += 1
+        return str(path)
+
+    def put(self, key: str, write: Callable[[str], None]) -> str:
+        """Call `write(tmp_path)`, then atomically move the result into place."""
+        path = self.path_for(key)
+        tmp = self.directory / f".{key}.{uuid.uuid4().hex}{self.suffix}"
+        try:
+            write(str(tmp))
+            os.replace(tmp, path)
+        finally:
+            if tmp.exists():
+                tmp.unlink()
+        self.evict()
+        return str(path)
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for f in self.directory.glob(f"{self.prefix}*{self.suffix}"):
+                try:
+                    used = max(f.stat().st_mtime, self._last_hit.get(f.name, 0.0))
+                except FileNotFoundError:
+                    continue
+                entries.append((used, f))
+            # Forget hits on files that are gone (evicted by another worker)
+            present = {f.name for _, f in entries}
+            self._last_hit = {n: t for n, t in self._last_hit.items() if n in present}
+
+            excess = len(entries) - self.max_entries
+            if excess <= 0:
+                return
+            entries.sort()
+            recent = time.time() - self.EVICT_GRACE
+            for _, f in [e for e in entries if e[0] < recent][:excess]:
+                try:
+                    f.unlink()
+                except FileNotFoundError:
+                    pass
+                self._last_hit.pop(f.name, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0
+        }
@@ -0,0 +1,41 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger("explainbot.api")
+
+
+class LazyService:
+    """
+    Stands in for a service until it is first used. The first attribute
+    access builds the real object with `factory()` (once, under a lock);
+    after that every access is forwarded to it.
+
+    Constructors that import SDKs, open clients or create output
+    directories therefore run on first use, or during warm-up, rather than
+    while the process is starting.
+    """
+
+    def __init__(self, name: str, factory):
+        self._name = name
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    start = time.perf_counter()
+                    self._instance = self._factory()
+                    logger.info(f"⚙️ {self._name} ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+                instance = self._instance
+        return instance
+
+    def __getattr__(self, attr):
+        return getattr(self.get(), attr)
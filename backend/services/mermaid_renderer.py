@@ -0,0 +1,653 @@
+import re
+from PIL import Image, ImageDraw
+from services.scene_renderer import COLORS, get_font
+
+# Renders the Mermaid subsets VideoAgent asks for (flowchart/graph and
+# sequenceDiagram) straight to a PIL image, in the same palette as the video
+# scenes. Anything else raises UnsupportedDiagram so the caller can fall back.
+
+CANVAS_W, CANVAS_H = 1200, 600
+MARGIN = 40
+FONT_SIZES = (26, 23, 20, 17, 14)   # tried in order until the layout fits
+
+
+class UnsupportedDiagram(ValueError):
+    pass
+
+
+def render_mermaid(code: str, width: int = CANVAS_W, height: int = CANVAS_H) -> Image.Image:
+    raw_lines = [ln.strip() for ln in code.strip().splitlines()]
+    raw_lines = [ln for ln in raw_lines if ln and not ln.startswith("%%")]
+    if not raw_lines:
+        raise UnsupportedDiagram("empty diagram")
+
+    kind = raw_lines[0].split()[0].rstrip(";")
+
+    if kind in ("graph", "flowchart"):
+        statements = [s for ln in raw_lines for s in split_statements(ln)]
+        header = statements[0].split()
+        direction = header[1].upper() if len(header) > 1 else "TD"
+        nodes, edges = _parse_flowchart(statements[1:])
+        if not nodes:
+            raise UnsupportedDiagram("flowchart has no nodes")
+        return _render_flowchart(nodes, edges, direction, width, height)
+
+    if kind == "sequenceDiagram":
+        participants, events = _parse_sequence(raw_lines[1:])
+        if not participants:
+            raise UnsupportedDiagram("sequence diagram has no participants")
+        return _render_sequence(participants, events, width, height)
+
+    raise UnsupportedDiagram(kind)
+
+
+# ── Flowchart parsing ─────────────────────────────────────────────────────────
+
+_OPENERS = {"[": "]", "(": ")", "{": "}"}
+
+
+def split_statements(line: str) -> list:
+    """
+    A flowchart line's ";"-separated statements, stripped and non-empty.
+    Semicolons inside quotes, node shapes or |edge labels| are label text.
+    """
+    statements, current = [], []
+    closers = []          # expected closing brackets, innermost last
+    quoted = in_label = False
+    for ch in line:
+        if quoted:
+            quoted = ch != '"'
+        elif ch == '"':
+            quoted = True
+        elif ch in _OPENERS:
+            closers.append(_OPENERS[ch])
+        elif closers and ch == closers[-1]:
+            closers.pop()
+        elif ch == "|" and not closers:
+            in_label = not in_label
+        elif ch == ";" and not closers and not in_label:
+            statements.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    statements.append("".join(current))
+    return [s.strip() for s in statements if s.strip()]
+
+
+_SKIP_KEYWORDS = ("classDef", "class", "style", "linkStyle", "click", "subgraph", "end", "direction")
+
+_NODE_ID = re.compile(r"\s*(\w+)")
+_NODE_CLASS = re.compile(r":::\w+")
+_AMPERSAND = re.compile(r"\s*&")
+
+# (opener, closer, shape) — longest openers first
+_SHAPES = [
+    ("([", "])", "stadium"),
+    ("[[", "]]", "rect"),
+    ("[(", ")]", "rect"),
+    ("((", "))", "circle"),
+    ("{{", "}}", "hexagon"),
+    ("[/", "/]", "rect"),
+    ("[\\", "\\]", "rect"),
+    ("[", "]", "rect"),
+    ("(", ")", "round"),
+    ("{", "}", "diamond"),
+    (">", "]", "rect"),
+]
+
+_LINK = re.compile(
+    r"\s*(?:"
+    r"(?P<text_open>--|==|-\.)\s+(?P<text>[^|>]+?)\s*"
+    r"(?P<text_close>-{2,}>|={2,}>|\.-+>|-{3,}|={3,}|\.-+)"
+    r"|(?P<op><?(?:-{2,}>|={2,}>|-\.+->|-{2,}[ox](?=[\s|])|-{3,}|={3,}|-\.+-|~~~))"
+    r")\s*(?:\|(?P<label>[^|]*)\|)?"
+)
+
+
+def _parse_flowchart(statements: list) -> tuple[dict, list]:
+    nodes: dict[str, dict] = {}
+    edges: list[dict] = []
+
+    for stmt in statements:
+        first = stmt.split()[0]
+        if first in _SKIP_KEYWORDS:
+            continue
+
+        left, pos = _parse_node_group(stmt, 0, nodes)
+        if not left:
+            continue
+
+        while True:
+            m = _LINK.match(stmt, pos)
+            if not m:
+                break
+            right, next_pos = _parse_node_group(stmt, m.end(), nodes)
+            if not right:
+                break
+            edge_style = _edge_style(m)
+            for src in left:
+                for dst in right:
+                    edges.append({"src": src, "dst": dst, **edge_style})
+            left, pos = right, next_pos
+
+    return nodes, edges
+
+
+def _parse_node_group(text: str, pos: int, nodes: dict) -> tuple[list, int]:
+    ids = []
+    while True:
+        node_id, pos = _parse_node(text, pos, nodes)
+        if node_id is None:
+            break
+        ids.append(node_id)
+        amp = _AMPERSAND.match(text, pos)
+        if not amp:
+            break
+        pos = amp.end()
+    return ids, pos
+
+
+def _parse_node(text: str, pos: int, nodes: dict) -> tuple:
+    m = _NODE_ID.match(text, pos)
+    if not m:
+        return None, pos
+    node_id = m.group(1)
+    pos = m.end()
+
+    label, shape = None, None
+    for opener, closer, shape_name in _SHAPES:
+        if not text.startswith(opener, pos):
+            continue
+        start = pos + len(opener)
+        search_from = start
+        if text.startswith('"', start):
+            end_quote = text.find('"', start + 1)
+            search_from = end_quote if end_quote != -1 else start
+        end = text.find(closer, search_from)
+        if end == -1:
+            continue
+        label = text[start:end].strip().strip('"')
+        shape = shape_name
+        pos = end + len(closer)
+        break
+
+    cls = _NODE_CLASS.match(text, pos)
+    if cls:
+        pos = cls.end()
+
+    node = nodes.setdefault(node_id, {"label": node_id, "shape": "rect"})
+    if label is not None:
+        node["label"] = label
+        node["shape"] = shape
+    return node_id, pos
+
+
+def _edge_style(m: re.Match) -> dict:
+    op = m.group("op") or f"{m.group('text_open')}{m.group('text_close')}"
+    label = m.group("label") or m.group("text") or ""
+    return {
+        "label": label.strip().strip('"'),
+        "arrow": op.endswith(">"),
+        "both": op.startswith("<"),
+        "dashed": "." in op,
+        "thick": "=" in op,
+    }
+
+
+# ── Flowchart layout ──────────────────────────────────────────────────────────
+
+def _layer_graph(node_ids: list, edges: list) -> tuple[dict, list]:
+    """Break cycles, assign longest-path layers, split long edges with dummies."""
+    adj = {n: [] for n in node_ids}
+    for e in edges:
+        if e["src"] != e["dst"]:
+            adj[e["src"]].append(e["dst"])
+
+    state, back = {}, set()
+
+    def dfs(u):
+        state[u] = 1
+        for v in adj[u]:
+            s = state.get(v, 0)
+            if s == 0:
+                dfs(v)
+            elif s == 1:
+                back.add((u, v))
+        state[u] = 2
+
+    for n in node_ids:
+        if n not in state:
+            dfs(n)
+
+    dag = []
+    for e in edges:
+        u, v = e["src"], e["dst"]
+        if u == v:
+            continue
+        dag.append((v, u) if (u, v) in back else (u, v))
+
+    indeg = {n: 0 for n in node_ids}
+    succ = {n: [] for n in node_ids}
+    for u, v in dag:
+        succ[u].append(v)
+        indeg[v] += 1
+
+    layer = {n: 0 for n in node_ids}
+    queue = [n for n in node_ids if indeg[n] == 0]
+    while queue:
+        u = queue.pop(0)
+        for v in succ[u]:
+            layer[v] = max(layer[v], layer[u] + 1)
+            indeg[v] -= 1
+            if indeg[v] == 0:
+                queue.append(v)
+
+    # Route each edge through one dummy per skipped layer
+    routes = []
+    for e in edges:
+        u, v = e["src"], e["dst"]
+        if u == v:
+            routes.append([u])
+            continue
+        lo, hi = (u, v) if layer[u] < layer[v] else (v, u)
+        chain = [lo]
+        for step in range(layer[lo] + 1, layer[hi]):
+            dummy = f"__dummy_{len(layer)}"
+            layer[dummy] = step
+            chain.append(dummy)
+        chain.append(hi)
+        routes.append(chain if chain[0] == u else chain[::-1])
+
+    return layer, routes
+
+
+def _order_layers(node_ids: list, layer: dict, routes: list) -> list:
+    depth = max(layer.values()) + 1
+    layers = [[] for _ in range(depth)]
+    for n in node_ids:
+        layers[layer[n]].append(n)
+    for n in layer:
+        if n not in node_ids:
+            layers[layer[n]].append(n)
+
+    up, down = {n: [] for n in layer}, {n: [] for n in layer}
+    for chain in routes:
+        for a, b in zip(chain, chain[1:]):
+            if layer[a] > layer[b]:
+                a, b = b, a
+            down[a].append(b)
+            up[b].append(a)
+
+    def sweep(rows, neighbours):
+        for i in range(1, len(rows)):
+            index = {n: k for k, n in enumerate(rows[i - 1])}
+            def bary(n, pos):
+                linked = [index[m] for m in neighbours[n] if m in index]
+                return sum(linked) / len(linked) if linked else pos
+            rows[i] = [n for _, n in sorted(
+                ((bary(n, k), n) for k, n in enumerate(rows[i])), key=lambda t: t[0]
+            )]
+
+    for _ in range(4):
+        sweep(layers, up)
+        layers.reverse()
+        sweep(layers, down)
+        layers.reverse()
+    return layers
+
+
+def _measure_nodes(nodes: dict, layer: dict, font, size: int, draw) -> dict:
+    line_h = int(size * 1.25)
+    pad = int(size * 0.7)
+    sizes = {}
+    for n in layer:
+        if n not in nodes:
+            sizes[n] = (0, 0, [])
+            continue
+        lines = _wrap(draw, nodes[n]["label"], font, size * 9)
+        text_w = max(draw.textlength(line, font=font) for line in lines)
+        w = max(text_w + 2 * pad, size * 4)
+        h = len(lines) * line_h + 2 * pad
+        shape = nodes[n]["shape"]
+        if shape == "diamond":
+            w, h = w * 1.5, h * 1.6
+        elif shape == "circle":
+            w = h = max(w, h)
+        elif shape == "hexagon":
+            w += pad * 2
+        sizes[n] = (int(w), int(h), lines)
+    return sizes
+
+
+def _place(layers: list, sizes: dict, horizontal: bool, node_gap: int, rank_gap: int) -> dict:
+    """Centre of every node/dummy, with layers stacked along the rank axis."""
+    centres = {}
+    # rank axis extent of each layer
+    extents = [max((sizes[n][0] if horizontal else sizes[n][1]) for n in row) for row in layers]
+    spans = []
+    for row in layers:
+        across = [sizes[n][1] if horizontal else sizes[n][0] for n in row]
+        spans.append(sum(across) + node_gap * (len(row) - 1))
+    widest = max(spans)
+
+    rank_pos = 0
+    for row, extent, span in zip(layers, extents, spans):
+        cross = (widest - span) / 2
+        for n in row:
+            size_across = sizes[n][1] if horizontal else sizes[n][0]
+            c_cross = cross + size_across / 2
+            c_rank = rank_pos + extent / 2
+            centres[n] = (c_rank, c_cross) if horizontal else (c_cross, c_rank)
+            cross += size_across + node_gap
+        rank_pos += extent + rank_gap
+    return centres
+
+
+def _render_flowchart(nodes: dict, edges: list, direction: str, width: int, height: int) -> Image.Image:
+    horizontal = direction in ("LR", "RL")
+    flipped = direction in ("BT", "RL")
+    node_ids = list(nodes)
+    layer, routes = _layer_graph(node_ids, edges)
+    layers = _order_layers(node_ids, layer, routes)
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+    for size in FONT_SIZES:
+        font = get_font(size, bold=True)
+        label_size = max(12, size - 6)
+        label_font = get_font(label_size)
+        sizes = _measure_nodes(nodes, layer, font, size, draw)
+        label_w = max((draw.textlength(e["label"], font=label_font) for e in edges if e["label"]), default=0)
+        node_gap = size * 2
+        rank_gap = size * 2 + (label_w + size if horizontal and label_w else size if label_w else 0)
+        centres = _place(layers, sizes, horizontal, node_gap, int(rank_gap))
+        box_w = max(c[0] + sizes[n][0] / 2 for n, c in centres.items())
+        box_h = max(c[1] + sizes[n][1] / 2 for n, c in centres.items())
+        if box_w <= width - 2 * MARGIN and box_h <= height - 2 * MARGIN:
+            break
+
+    canvas_w = int(max(width, box_w + 2 * MARGIN))
+    canvas_h = int(max(height, box_h + 2 * MARGIN))
+    off_x = (canvas_w - box_w) / 2
+    off_y = (canvas_h - box_h) / 2
+
+    def to_canvas(pt):
+        x, y = pt
+        if flipped and horizontal:
+            x = box_w - x
+        elif flipped:
+            y = box_h - y
+        return (x + off_x, y + off_y)
+
+    centres = {n: to_canvas(c) for n, c in centres.items()}
+
+    img = Image.new("RGB", (canvas_w, canvas_h), COLORS["bg_dark"])
+    draw = ImageDraw.Draw(img)
+    line_w = max(2, size // 8)
+
+    for edge, chain in zip(edges, routes):
+        _draw_edge(draw, edge, chain, centres, sizes, nodes, label_font, label_size, line_w, size)
+
+    line_h = int(size * 1.25)
+    for n in node_ids:
+        cx, cy = centres[n]
+        w, h, lines = sizes[n]
+        _draw_shape(draw, nodes[n]["shape"], cx, cy, w, h, line_w)
+        ty = cy - len(lines) * line_h / 2
+        for line in lines:
+            tw = draw.textlength(line, font=font)
+            draw.text((cx - tw / 2, ty), line, fill=COLORS["text_white"], font=font)
+            ty += line_h
+
+    return img
+
+
+# ── Flowchart drawing ─────────────────────────────────────────────────────────
+
+def _draw_shape(draw, shape: str, cx: float, cy: float, w: int, h: int, line_w: int):
+    x0, y0, x1, y1 = cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2
+    fill, outline = COLORS["bg_card"], COLORS["accent"]
+    if shape == "diamond":
+        draw.polygon([(cx, y0), (x1, cy), (cx, y1), (x0, cy)], fill=fill, outline=outline, width=line_w)
+    elif shape == "circle":
+        draw.ellipse([x0, y0, x1, y1], fill=fill, outline=outline, width=line_w)
+    elif shape == "hexagon":
+        inset = h / 2
+        draw.polygon([(x0 + inset, y0), (x1 - inset, y0), (x1, cy),
+                      (x1 - inset, y1), (x0 + inset, y1), (x0, cy)],
+                     fill=fill, outline=outline, width=line_w)
+    else:
+        radius = {"round": h / 4, "stadium": h / 2}.get(shape, 6)
+        draw.rounded_rectangle([x0, y0, x1, y1], radius=radius, fill=fill, outline=outline, width=line_w)
+
+
+def _clip_to_node(centre, size, shape, toward):
+    cx, cy = centre
+    dx, dy = toward[0] - cx, toward[1] - cy
+    hw, hh = size[0] / 2, size[1] / 2
+    if (dx == 0 and dy == 0) or (hw == 0 and hh == 0):
+        return centre
+    if shape == "diamond":
+        t = 1 / (abs(dx) / hw + abs(dy) / hh)
+    elif shape == "circle":
+        t = hw / (dx * dx + dy * dy) ** 0.5
+    else:
+        t = min(hw / abs(dx) if dx else float("inf"), hh / abs(dy) if dy else float("inf"))
+    return (cx + dx * t, cy + dy * t)
+
+
+def _draw_edge(draw, edge, chain, centres, sizes, nodes, label_font, label_size, line_w, size):
+    colour = COLORS["text_gray"]
+    width = line_w * 2 if edge["thick"] else line_w
+
+    if len(chain) == 1:   # self-loop
+        cx, cy = centres[chain[0]]
+        w, h = sizes[chain[0]][:2]
+        r = h / 3
+        draw.arc([cx + w / 2 - r, cy - h / 2 - r, cx + w / 2 + r, cy - h / 2 + r],
+                 start=0, end=270, fill=colour, width=width)
+        return
+
+    points = [centres[n] for n in chain]
+    src, dst = chain[0], chain[-1]
+    points[0] = _clip_to_node(points[0], sizes[src][:2], nodes[src]["shape"], points[1])
+    points[-1] = _clip_to_node(points[-1], sizes[dst][:2], nodes[dst]["shape"], points[-2])
+
+    for a, b in zip(points, points[1:]):
+        if edge["dashed"]:
+            _dashed_line(draw, a, b, colour, width, dash=size // 2)
+        else:
+            draw.line([a, b], fill=colour, width=width)
+
+    head = size * 0.55
+    if edge["arrow"]:
+        _arrow_head(draw, points[-2], points[-1], head, colour)
+    if edge["both"]:
+        _arrow_head(draw, points[1], points[0], head, colour)
+
+    if edge["label"]:
+        mid = len(points) // 2
+        a, b = points[mid - 1], points[mid]
+        mx, my = (a[0] + b[0]) / 2, (a[1] + b[1]) / 2
+        tw = draw.textlength(edge["label"], font=label_font)
+        th = label_size
+        draw.rectangle([mx - tw / 2 - 6, my - th / 2 - 4, mx + tw / 2 + 6, my + th / 2 + 6],
+                       fill=COLORS["bg_dark"])
+        draw.text((mx - tw / 2, my - th / 2), edge["label"], fill=COLORS["text_gray"], font=label_font)
+
+
+def _arrow_head(draw, tail, tip, length, colour):
+    dx, dy = tip[0] - tail[0], tip[1] - tail[1]
+    dist = (dx * dx + dy * dy) ** 0.5 or 1
+    ux, uy = dx / dist, dy / dist
+    bx, by = tip[0] - ux * length, tip[1] - uy * length
+    half = length * 0.5
+    draw.polygon([tip, (bx - uy * half, by + ux * half), (bx + uy * half, by - ux * half)], fill=colour)
+
+
+def _dashed_line(draw, a, b, colour, width, dash):
+    dash = max(4, dash)
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    dist = (dx * dx + dy * dy) ** 0.5
+    if dist == 0:
+        return
+    steps = int(dist // dash)
+    for i in range(0, steps + 1, 2):
+        t0 = i * dash / dist
+        t1 = min(1.0, (i + 1) * dash / dist)
+        draw.line([(a[0] + dx * t0, a[1] + dy * t0), (a[0] + dx * t1, a[1] + dy * t1)],
+                  fill=colour, width=width)
+
+
+# ── Sequence diagrams ─────────────────────────────────────────────────────────
+
+_PARTICIPANT = re.compile(r"^(?:participant|actor)\s+(.+?)(?:\s+as\s+(.+))?$")
+_MESSAGE = re.compile(r"^(.+?)\s*(-->>|->>|--x|-x|--\)|-\)|-->|->)\s*[+-]?\s*(.+?)\s*:\s*(.*)$")
+_NOTE = re.compile(r"^note\s+(?:(?:left|right)\s+of|over)\s+(.+?)\s*:\s*(.*)$", re.IGNORECASE)
+
+
+def _parse_sequence(lines: list) -> tuple[dict, list]:
+    participants: dict[str, str] = {}   # id → display name
+    events = []
+
+    def ensure(name):
+        name = name.strip()
+        participants.setdefault(name, name)
+        return name
+
+    for line in lines:
+        m = _PARTICIPANT.match(line)
+        if m:
+            pid = m.group(1).strip()
+            participants[pid] = (m.group(2) or pid).strip()
+            continue
+        m = _NOTE.match(line)
+        if m:
+            over = [ensure(p) for p in m.group(1).split(",")]
+            events.append({"type": "note", "over": over, "text": m.group(2).strip()})
+            continue
+        m = _MESSAGE.match(line)
+        if m:
+            op = m.group(2)
+            events.append({
+                "type": "message",
+                "src": ensure(m.group(1)),
+                "dst": ensure(m.group(3)),
+                "text": m.group(4).strip(),
+                "dashed": op.startswith("--"),
+                "head": "cross" if op.endswith("x") else ("none" if op in ("->", "-->") else "arrow"),
+            })
+        # loop/alt/opt/par/rect/end/autonumber/activate blocks are layout-neutral here
+
+    return participants, events
+
+
+def _render_sequence(participants: dict, events: list, width: int, height: int) -> Image.Image:
+    draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    ids = list(participants)
+    count = len(ids)
+
+    for size in FONT_SIZES:
+        font = get_font(size, bold=True)
+        msg_size = max(12, size - 4)
+        msg_font = get_font(msg_size)
+        col_w = (width - 2 * MARGIN) / count
+        box_w = min(col_w - size, max(draw.textlength(participants[p], font=font) for p in ids) + size * 2)
+        header_h = int(size * 2.4)
+        rows = []
+        for ev in events:
+            span = col_w * (abs(ids.index(ev["dst"]) - ids.index(ev["src"])) or 1) if ev["type"] == "message" \
+                else col_w * len(ev["over"])
+            lines = _wrap(draw, ev["text"], msg_font, max(span - size, size * 4))
+            rows.append(lines)
+        body_h = sum(len(lines) * int(msg_size * 1.25) + size for lines in rows) + size
+        total_h = header_h * 2 + body_h + size
+        if total_h <= height - 2 * MARGIN and box_w > size * 3:
+            break
+
+    canvas_h = int(max(height, total_h + 2 * MARGIN))
+    img = Image.new("RGB", (width, canvas_h), COLORS["bg_dark"])
+    draw = ImageDraw.Draw(img)
+    line_w = max(2, size // 8)
+    top = (canvas_h - total_h) / 2
+    bottom = top + total_h - header_h
+    xs = {p: MARGIN + col_w * (i + 0.5) for i, p in enumerate(ids)}
+
+    for p in ids:
+        _dashed_line(draw, (xs[p], top + header_h), (xs[p], bottom), COLORS["text_gray"], line_w, size // 2)
+        for y in (top, bottom):
+            _participant_box(draw, participants[p], xs[p], y, box_w, header_h, font, size, line_w)
+
+    msg_line_h = int(msg_size * 1.25)
+    y = top + header_h + size
+    for ev, lines in zip(events, rows):
+        text_h = len(lines) * msg_line_h
+        if ev["type"] == "note":
+            left = min(xs[p] for p in ev["over"]) - col_w * 0.4
+            right = max(xs[p] for p in ev["over"]) + col_w * 0.4
+            draw.rectangle([left, y, right, y + text_h + size * 0.6],
+                           fill=COLORS["bg_card"], outline=COLORS["text_gray"], width=line_w)
+            ty = y + size * 0.3
+            for line in lines:
+                tw = draw.textlength(line, font=msg_font)
+                draw.text(((left + right - tw) / 2, ty), line, fill=COLORS["text_white"], font=msg_font)
+                ty += msg_line_h
+            y += text_h + size
+            continue
+
+        x0, x1 = xs[ev["src"]], xs[ev["dst"]]
+        ty = y
+        centre = (x0 + x1) / 2 if x0 != x1 else x0 + col_w * 0.3
+        for line in lines:
+            tw = draw.textlength(line, font=msg_font)
+            draw.text((centre - tw / 2, ty), line, fill=COLORS["text_white"], font=msg_font)
+            ty += msg_line_h
+        ay = y + text_h + size * 0.4
+        colour = COLORS["accent"]
+        if x0 == x1:   # self message
+            loop = [(x0, ay - size * 0.3), (x0 + col_w * 0.3, ay - size * 0.3),
+                    (x0 + col_w * 0.3, ay + size * 0.3), (x0, ay + size * 0.3)]
+            for a, b in zip(loop, loop[1:]):
+                draw.line([a, b], fill=colour, width=line_w)
+            _arrow_head(draw, loop[2], loop[3], size * 0.5, colour)
+        else:
+            if ev["dashed"]:
+                _dashed_line(draw, (x0, ay), (x1, ay), colour, line_w, size // 2)
+            else:
+                draw.line([(x0, ay), (x1, ay)], fill=colour, width=line_w)
+            if ev["head"] == "arrow":
+                _arrow_head(draw, (x0, ay), (x1, ay), size * 0.55, colour)
+            elif ev["head"] == "cross":
+                c = size * 0.3
+                draw.line([(x1 - c, ay - c), (x1 + c, ay + c)], fill=colour, width=line_w)
+                draw.line([(x1 - c, ay + c), (x1 + c, ay - c)], fill=colour, width=line_w)
+        y += text_h + size
+
+    return img
+
+
+def _participant_box(draw, name, cx, y, box_w, box_h, font, size, line_w):
+    draw.rounded_rectangle([cx - box_w / 2, y, cx + box_w / 2, y + box_h], radius=6,
+                           fill=COLORS["bg_card"], outline=COLORS["accent"], width=line_w)
+    label = name
+    while draw.textlength(label, font=font) > box_w - 10 and len(label) > 4:
+        label = label[:-2] + "…"
+    tw = draw.textlength(label, font=font)
+    draw.text((cx - tw / 2, y + (box_h - size) / 2 - 2), label, fill=COLORS["text_white"], font=font)
+
+
+# ── Text helpers ──────────────────────────────────────────────────────────────
+
+def _wrap(draw, text: str, font, max_width: float) -> list:
+    lines = []
+    for chunk in re.split(r"<br\s*/?>|\\n", text):
+        current = ""
+        for word in chunk.split():
+            candidate = f"{current} {word}".strip()
+            if current and draw.textlength(candidate, font=font) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        if current:
+            lines.append(current)
+    return lines or [""]
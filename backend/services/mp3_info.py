@@ -0,0 +1,110 @@
+import struct
+
+# MPEG Layer III frame header tables, indexed by the header's bit fields.
+# Version bits: 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5 (1 is reserved).
+_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_BITRATES[0] = _BITRATES[2]
+
+_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),
+    2: (22050, 24000, 16000),
+    0: (11025, 12000, 8000),
+}
+
+
+def _parse_header(data: bytes, pos: int):
+    """Decode the 4-byte frame header at `pos`, or None if it isn't a Layer III header."""
+    if pos + 4 > len(data):
+        return None
+    h = struct.unpack(">I", data[pos:pos + 4])[0]
+    if (h >> 21) & 0x7FF != 0x7FF:
+        return None
+    version = (h >> 19) & 0x3
+    layer = (h >> 17) & 0x3
+    bitrate_idx = (h >> 12) & 0xF
+    rate_idx = (h >> 10) & 0x3
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    bitrate = _BITRATES[version][bitrate_idx] * 1000
+    padding = (h >> 9) & 0x1
+    mono = (h >> 6) & 0x3 == 3
+    mpeg1 = version == 3
+    return {
+        "sample_rate": sample_rate,
+        "channels": 1 if mono else 2,
+        "samples": 1152 if mpeg1 else 576,
+        "length": (144 if mpeg1 else 72) * bitrate // sample_rate + padding,
+        # Xing/Info tag sits right after the side information
+        "side_info": (17 if mono else 32) if mpeg1 else (9 if mono else 17),
+    }
+
+
+def _skip_id3v2(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = 0
+    for b in data[6:10]:
+        size = (size << 7) | (b & 0x7F)
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _first_frame(data: bytes, start: int):
+    # A lone 0xFFE sync can occur inside tag data; require the next frame to line up too
+    pos = data.find(b"\xff", start)
+    while pos != -1:
+        header = _parse_header(data, pos)
+        if header:
+            following = pos + header["length"]
+            if following >= len(data) or _parse_header(data, following):
+                return pos, header
+        pos = data.find(b"\xff", pos + 1)
+    return None, None
+
+
+def probe_mp3(path: str) -> dict:
+    """
+    Duration and stream format of an MP3 read from its frame headers —
+    nothing is decoded. Uses the Xing/Info or VBRI frame count when the
+    encoder wrote one, otherwise walks the frame headers.
+
+    Returns {"duration", "sample_rate", "channels", "frames"}; raises
+    ValueError if no Layer III frame is found.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    pos, first = _first_frame(data, _skip_id3v2(data))
+    if first is None:
+        raise ValueError(f"No MPEG Layer III frames in {path}")
+
+    frames = None
+    xing = pos + 4 + first["side_info"]
+    tagged = data[xing:xing + 4] in (b"Xing", b"Info")
+    if tagged:
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+    elif data[pos + 36:pos + 40] == b"VBRI":
+        frames = struct.unpack(">I", data[pos + 50:pos + 54])[0]
+
+    if frames is None:
+        # The tag frame carries no audio, so it isn't counted
+        frames = -1 if tagged else 0
+        header = first
+        while header:
+            frames += 1
+            pos += header["length"]
+            header = _parse_header(data, pos)
+
+    return {
+        "duration": frames * first["samples"] / first["sample_rate"],
+        "sample_rate": first["sample_rate"],
+        "channels": first["channels"],
+        "frames": frames,
+    }
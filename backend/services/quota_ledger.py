@@ -0,0 +1,257 @@
+import os
+import logging
+import json
+import time
+import atexit
+import tempfile
+import threading
+from pathlib import Path
+
+logger = logging.getLogger("explainbot.tts")
+
+try:
+    import fcntl    # POSIX only — cross-process lock around the merge step
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+class QuotaLedger:
+    """
+    Character quota for a metered provider (ElevenLabs).
+
+    Usage lives in memory behind a lock. Callers `reserve()` characters
+    before a provider call and then `commit()` or `refund()` them, so
+    concurrent requests can never promise more than `limit` between them.
+
+    The state file is written with write-then-rename on a background
+    interval and at shutdown. Each flush merges only the characters this
+    process committed since the previous flush into whatever is on disk,
+    so several workers sharing the file don't overwrite each other. Every
+    interval also re-reads the file, even with nothing to write, so a
+    worker picks up what the others have used.
+    """
+
+    def __init__(self, state_file: Path, limit: int, flush_interval: float = 5.0):
+        self.state_file = Path(state_file)
+        self.lock_file = self.state_file.with_suffix(".lock")
+        self.limit = limit
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        # One flush at a time: the interval thread and close() at exit would
+        # otherwise both merge the same pending delta into the file
+        self._flush_lock = threading.Lock()
+        self._used = 0
+        self._reserved = 0
+        self._exhausted = False
+        self._unflushed = 0      # committed chars not yet merged into the file
+        self._dirty = False
+
+        self._load()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="quota-ledger-flush", daemon=True
+        )
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # ── Quota operations ────────────────────────────────────
+
+    def reserve(self, chars: int) -> bool:
+        """Hold `chars` against the limit. False if they don't fit."""
+        with self._lock:
+            if self._exhausted:
+                return False
+            if self._used + self._reserved + chars > self.limit:
+                return False
+            self._reserved += chars
+            return True
+
+    def commit(self, chars: int):
+        """Turn a reservation into real usage after a successful call."""
+        with self._lock:
+            self._reserved = max(0, self._reserved - chars)
+            self._used += chars
+            self._unflushed += chars
+            self._dirty = True
+
+    def refund(self, chars: int):
+        """Release a reservation after a failed call."""
+        with self._lock:
+            self._reserved = max(0, self._reserved - chars)
+
+    def mark_exhausted(self):
+        with self._lock:
+            if not self._exhausted:
+                self._exhausted = True
+                self._dirty = True
+
+    @property
+    def used(self) -> int:
+        with self._lock:
+            return self._used
+
+    @property
+    def exhausted(self) -> bool:
+        with self._lock:
+            return self._exhausted
+
+    @property
+    def remaining(self) -> int:
+        with self._lock:
+            return max(0, self.limit - self._used - self._reserved)
+
+    # ── Persistence ─────────────────────────────────────────
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            dirty = self._dirty
+            delta = self._unflushed
+            exhausted = self._exhausted
+
+        try:
+            if dirty:
+                with self._file_lock():
+                    on_disk = self._read_file()
+                    merged_used = on_disk.get("el_chars_used", 0) + delta
+                    merged_exhausted = on_disk.get("el_quota_exhausted", False) or exhausted
+                    self._atomic_write({
+                        "el_chars_used": merged_used,
+                        "el_quota_exhausted": merged_exhausted,
+                        "updated_at": time.time()
+                    })
+            else:
+                # Nothing of ours to merge — just catch up with the other workers
+                on_disk = self._read_file()
+                merged_used = on_disk.get("el_chars_used", 0)
+                merged_exhausted = on_disk.get("el_quota_exhausted", False)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not save TTS state: {e}")
+            return
+
+        with self._lock:
+            # Adopt usage other workers merged in, keep anything committed meanwhile
+            self._unflushed -= delta
+            self._used = merged_used + self._unflushed
+            self._exhausted = self._exhausted or merged_exhausted
+            self._dirty = self._unflushed > 0 or self._exhausted != merged_exhausted
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+
+    def _load(self):
+        state = self._read_file()
+        self._used = state.get("el_chars_used", 0)
+        self._exhausted = state.get("el_quota_exhausted", False)
+
+    def _read_file(self) -> dict:
+        if not self.state_file.exists():
+            return {}
+        try:
+            return json.loads(self.state_file.read_text())
+        except Exception:
+            return {}
+
+    def _atomic_write(self, state: dict):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            dir=self.state_file.parent, prefix=".tts_state.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.state_file)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _file_lock(self):
+        return _FileLock(self.lock_file)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+
+class SharedQuotaLedger:
+    """
+    QuotaLedger with the same interface, kept in a shared state backend
+    (see state.py) instead of process memory and a JSON file.
+
+    A reservation is added straight to the shared counter with an atomic
+    check against `limit`, so workers can't oversell the quota between
+    them; `refund()` gives it back and `commit()` has nothing left to do.
+    `used` therefore includes calls still in flight.
+    """
+
+    USED = "tts:el_chars_used"
+    EXHAUSTED = "tts:el_quota_exhausted"
+
+    def __init__(self, state, limit: int):
+        self.state = state
+        self.limit = limit
+
+    def reserve(self, chars: int) -> bool:
+        if self.exhausted:
+            return False
+        applied, _ = self.state.add(self.USED, chars, limit=self.limit)
+        return applied
+
+    def commit(self, chars: int):
+        pass
+
+    def refund(self, chars: int):
+        self.state.add(self.USED, -chars)
+
+    def mark_exhausted(self):
+        self.state.add(self.EXHAUSTED, 1, limit=1)
+
+    @property
+    def used(self) -> int:
+        return self.state.value(self.USED)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.state.value(self.EXHAUSTED) > 0
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.limit - self.used)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _FileLock:
+    """Exclusive advisory lock on a sidecar file; no-op where fcntl is missing."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a")
+            fcntl.flock(self._fh, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
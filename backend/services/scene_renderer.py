@@ -0,0 +1,259 @@
+import os
+import logging
+from functools import lru_cache
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger("explainbot.video")
+
+WIDTH, HEIGHT = 1280, 720
+
+COLORS = {
+    'bg_dark':    '#0f172a',
+    'bg_card':    '#1e293b',
+    'accent':     '#3b82f6',
+    'text_white': '#f8fafc',
+    'text_gray':  '#94a3b8',
+}
+
+# Font paths — Liberation Sans ships with fonts-liberation on Debian/Ubuntu
+# Falls back through options until one works
+FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/liberation2/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/liberation/LiberationSans-Regular.ttf",
+    "arial.ttf",  # Windows fallback
+]
+FONT_BOLD_CANDIDATES = [
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation2/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/liberation/LiberationSans-Bold.ttf",
+    "arialbd.ttf",
+]
+
+def _find_font(candidates: list, size: int) -> ImageFont.ImageFont:
+    for path in candidates:
+        try:
+            return ImageFont.truetype(path, size)
+        except:
+            continue
+    # Pillow's built-in font honours the size, so scaled layouts still scale
+    return ImageFont.load_default(size)
+
+@lru_cache(maxsize=64)
+def get_font(size: int, bold: bool = False) -> ImageFont.ImageFont:
+    # Loaded once per (size, bold) — truetype() re-reads the file every call
+    return _find_font(FONT_BOLD_CANDIDATES if bold else FONT_CANDIDATES, size)
+
+
+@lru_cache(maxsize=16)
+def _fitted_diagram(path: str, mtime_ns: int, max_size: tuple) -> Image.Image:
+    # Decode + LANCZOS downscale is most of a diagram scene's cost; diagrams
+    # are content-addressed, so (path, mtime) identifies the pixels
+    diagram = Image.open(path)
+    diagram.thumbnail(max_size, Image.Resampling.LANCZOS)
+    return diagram
+
+
+def _hex(hex_color: str):
+    h = hex_color.lstrip('#')
+    return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+
+
+class SceneRenderer:
+    """
+    Draws the still frame for each scene type.
+
+    Layout is written against a 1280x720 canvas; a renderer built for
+    another size scales every coordinate and font size to match.
+
+    Everything that doesn't depend on the scene — background, accent bars,
+    header/caption panels, fixed captions and the numbered bullet badges —
+    is rasterised once into per-type templates when the renderer is built.
+    Rendering a scene copies its template and draws only the variable text.
+    """
+
+    BADGE_SIZE = 56
+
+    def __init__(self, width: int = WIDTH, height: int = HEIGHT):
+        self.width = width
+        self.height = height
+        self.scale = width / WIDTH
+        self.templates = {
+            'title': self._title_template(),
+            'diagram': self._diagram_template(),
+            'text': self._text_template(),
+            'summary': self._summary_template(),
+        }
+        self.badges = [self._badge(i + 1) for i in range(3)]
+
+    def render(self, scene: dict, diagram_path: str = None) -> Image.Image:
+        if scene['type'] == 'title':
+            return self._make_title_scene(scene)
+        elif scene['type'] == 'diagram':
+            return self._make_diagram_scene(scene, diagram_path)
+        elif scene['type'] == 'text':
+            return self._make_text_scene(scene)
+        elif scene['type'] == 'summary':
+            return self._make_summary_scene(scene)
+        return self._make_title_scene(scene)
+
+    def _px(self, value: float) -> int:
+        """Layout units (1280x720 canvas) → pixels on this renderer's canvas."""
+        return round(value * self.scale)
+
+    def _box(self, x0, y0, x1, y1) -> list:
+        return [(self._px(x0), self._px(y0)), (self._px(x1), self._px(y1))]
+
+    # ── Templates (built once) ───────────────────────────────
+
+    def _blank(self):
+        img = Image.new('RGB', (self.width, self.height), _hex(COLORS['bg_dark']))
+        return img, ImageDraw.Draw(img)
+
+    def _title_template(self) -> Image.Image:
+        img, draw = self._blank()
+        draw.rectangle(self._box(0, 0, WIDTH, 10), fill=_hex(COLORS['accent']))
+        self._draw_centered_text(draw, "AI Generated Explanation",
+                                 HEIGHT // 2 + 130, size=28, color=COLORS['text_gray'])
+        draw.rectangle(self._box(0, HEIGHT-10, WIDTH, HEIGHT), fill=_hex(COLORS['accent']))
+        cx = WIDTH // 2
+        cy = HEIGHT // 2 + 185
+        draw.ellipse(self._box(cx-15, cy-15, cx+15, cy+15), fill=_hex(COLORS['accent']))
+        return img
+
+    def _diagram_template(self) -> Image.Image:
+        img, draw = self._blank()
+        draw.rectangle(self._box(0, 0, WIDTH, 90), fill=_hex(COLORS['bg_card']))
+        draw.rectangle(self._box(0, 88, WIDTH, 90), fill=_hex(COLORS['accent']))
+        self._draw_centered_text(draw, "System Architecture", 28,
+                                 size=38, color=COLORS['accent'], bold=True)
+        draw.rectangle(self._box(0, HEIGHT-100, WIDTH, HEIGHT), fill=_hex(COLORS['bg_card']))
+        draw.rectangle(self._box(0, HEIGHT-102, WIDTH, HEIGHT-100), fill=_hex(COLORS['accent']))
+        return img
+
+    def _text_template(self) -> Image.Image:
+        img, draw = self._blank()
+        draw.rectangle(self._box(0, 0, WIDTH, 110), fill=_hex(COLORS['bg_card']))
+        draw.rectangle(self._box(0, 108, WIDTH, 110), fill=_hex(COLORS['accent']))
+        return img
+
+    def _summary_template(self) -> Image.Image:
+        img, draw = self._blank()
+        draw.rectangle(self._box(0, 0, WIDTH, 10), fill=_hex(COLORS['accent']))
+        padding = 100
+        draw.rectangle(
+            self._box(padding, HEIGHT//2-130, WIDTH-padding, HEIGHT//2+100),
+            fill=_hex(COLORS['bg_card']),
+            outline=_hex(COLORS['accent']),
+            width=max(1, self._px(3))
+        )
+        draw.rectangle(self._box(0, HEIGHT-75, WIDTH, HEIGHT), fill=_hex(COLORS['bg_card']))
+        self._draw_centered_text(draw, "ExplainBot AI • Powered by Groq + ElevenLabs",
+                                 HEIGHT-48, size=22, color=COLORS['text_gray'])
+        return img
+
+    def _badge(self, number: int) -> Image.Image:
+        size = self._px(self.BADGE_SIZE)
+        img = Image.new('RGB', (size, size), _hex(COLORS['bg_dark']))
+        draw = ImageDraw.Draw(img)
+        draw.ellipse(self._box(0, 0, 55, 55), fill=_hex(COLORS['accent']))
+        num_font = get_font(self._px(32), bold=True)
+        num = str(number)
+        bbox = draw.textbbox((0, 0), num, font=num_font)
+        draw.text((self._px(27) - (bbox[2]-bbox[0])//2, self._px(10)), num,
+                  fill=_hex(COLORS['text_white']), font=num_font)
+        return img
+
+    # ── Scene Creators ───────────────────────────────────────
+
+    def _make_title_scene(self, scene: dict) -> Image.Image:
+        img = self.templates['title'].copy()
+        draw = ImageDraw.Draw(img)
+
+        title = scene.get('text', 'Explanation')
+        lines = self._wrap_text(title, max_chars=35)
+
+        y_start = HEIGHT // 2 - (len(lines) * 40)
+        for i, line in enumerate(lines[:3]):
+            self._draw_centered_text(draw, line, y_start + (i * 75),
+                                     size=52, color=COLORS['text_white'], bold=True)
+        return img
+
+    def _make_diagram_scene(self, scene: dict, diagram_path: str) -> Image.Image:
+        img = self.templates['diagram'].copy()
+        draw = ImageDraw.Draw(img)
+
+        try:
+            max_size = (self._px(WIDTH - 80), self._px(HEIGHT - 220))
+            diagram = _fitted_diagram(diagram_path, os.stat(diagram_path).st_mtime_ns, max_size)
+            x = (self.width - diagram.width) // 2
+            img.paste(diagram, (x, self._px(100)))
+        except Exception as e:
+            logger.warning(f"⚠️ Diagram error: {e}")
+            self._draw_centered_text(draw, "[ Process Diagram ]", HEIGHT // 2,
+                                     size=48, color=COLORS['text_gray'])
+
+        caption = scene.get('caption', 'Flow Overview')
+        caption_lines = self._wrap_text(caption, max_chars=70)
+        self._draw_centered_text(draw, caption_lines[0], HEIGHT-70, size=28, color=COLORS['text_white'])
+        return img
+
+    def _make_text_scene(self, scene: dict) -> Image.Image:
+        img = self.templates['text'].copy()
+        draw = ImageDraw.Draw(img)
+
+        heading = scene.get('heading', 'Key Points')
+        self._draw_centered_text(draw, heading, 32, size=44, color=COLORS['accent'], bold=True)
+
+        points = scene.get('points', [])[:3]
+        y_start = 160
+        point_spacing = 155
+        tf = get_font(self._px(28))
+
+        for i, point in enumerate(points):
+            y = y_start + (i * point_spacing)
+            img.paste(self.badges[i], (self._px(80), self._px(y)))
+
+            lines = self._wrap_text(point, max_chars=52)
+            for j, line in enumerate(lines[:2]):
+                draw.text((self._px(155), self._px(y + 5 + j * 35)), line,
+                          fill=_hex(COLORS['text_white']), font=tf)
+        return img
+
+    def _make_summary_scene(self, scene: dict) -> Image.Image:
+        img = self.templates['summary'].copy()
+        draw = ImageDraw.Draw(img)
+
+        text = scene.get('text', 'Summary')
+        lines = self._wrap_text(text, max_chars=45)
+        y_start = HEIGHT//2 - (len(lines) * 25)
+        for i, line in enumerate(lines[:3]):
+            self._draw_centered_text(draw, line, y_start + i * 52,
+                                     size=36, color=COLORS['text_white'])
+        return img
+
+    # ── Helpers ──────────────────────────────────────────────
+
+    def _wrap_text(self, text: str, max_chars: int = 40) -> list:
+        if len(text) <= max_chars:
+            return [text]
+        words = text.split()
+        lines, current = [], []
+        for word in words:
+            current.append(word)
+            if len(' '.join(current)) > max_chars:
+                if len(current) > 1:
+                    current.pop()
+                    lines.append(' '.join(current))
+                    current = [word]
+        if current:
+            lines.append(' '.join(current))
+        return lines
+
+    def _draw_centered_text(self, draw, text: str, y: int, size: int, color: str, bold: bool = False):
+        """`y` and `size` are in layout units."""
+        font = get_font(self._px(size), bold)
+        bbox = draw.textbbox((0, 0), text, font=font)
+        text_width = bbox[2] - bbox[0]
+        x = max(self._px(20), (self.width - text_width) // 2)
+        draw.text((x, self._px(y)), text, fill=_hex(color), font=font)
@@ -1,8 +1,15 @@
 import os
+import logging
 import time
-import json
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from moviepy.editor import AudioFileClip
+from services.quota_ledger import QuotaLedger, SharedQuotaLedger
+from services.mp3_info import probe_mp3
+from metrics import TTS_SECONDS, TTS_CHARACTERS, timed_call
+from tracing import span, bind
+
+logger = logging.getLogger("explainbot.tts")
 
 OPENAI_VOICE_BY_LANG = {
     "en": "fable",    # warm, natural, storytelling
@@ -18,38 +25,33 @@ class HybridTTSService:
 
     VOICE_ID = "pNInz6obpgDQGcFmaJgB"
     FILE_MAX_AGE_SECONDS = 3600
+    BATCH_CONCURRENCY = int(os.getenv("TTS_BATCH_CONCURRENCY", "4"))
 
-    def __init__(self):
+    def __init__(self, state=None):
         self.output_dir = Path("outputs/audio")
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
         self.el_char_limit = 10000
         self.state_file = Path("outputs/.tts_state.json")
 
-        self._load_state()
+        # Quota is reserved before each ElevenLabs call and committed/refunded
+        # after it; the ledger flushes to disk on an interval and at shutdown,
+        # or lives in the shared state backend when several workers run
+        if state is not None and state.shared:
+            self.ledger = SharedQuotaLedger(state, self.el_char_limit)
+        else:
+            self.ledger = QuotaLedger(self.state_file, self.el_char_limit)
+
         self._init_elevenlabs()
         self._init_openai()
 
-    def _load_state(self):
-        if self.state_file.exists():
-            try:
-                state = json.loads(self.state_file.read_text())
-                self.el_chars_used = state.get("el_chars_used", 0)
-                self.el_quota_exhausted = state.get("el_quota_exhausted", False)
-                return
-            except Exception:
-                pass
-        self.el_chars_used = 0
-        self.el_quota_exhausted = False
-
-    def _save_state(self):
-        try:
-            self.state_file.write_text(json.dumps({
-                "el_chars_used": self.el_chars_used,
-                "el_quota_exhausted": self.el_quota_exhausted
-            }))
-        except Exception as e:
-            print(f"⚠️ Could not save TTS state: {e}")
+    @property
+    def el_chars_used(self) -> int:
+        return self.ledger.used
+
+    @property
+    def el_quota_exhausted(self) -> bool:
+        return self.ledger.exhausted
 
     def _init_elevenlabs(self):
         key = os.getenv("ELEVENLABS_API_KEY")
@@ -57,13 +59,13 @@ class HybridTTSService:
             try:
                 from elevenlabs.client import ElevenLabs
                 self.el_client = ElevenLabs(api_key=key)
-                print("✅ ElevenLabs TTS ready")
+                logger.info("✅ ElevenLabs TTS ready")
             except Exception as e:
                 self.el_client = None
-                print(f"⚠️ ElevenLabs init failed: {e}")
+                logger.warning(f"⚠️ ElevenLabs init failed: {e}")
         else:
             self.el_client = None
-            print("⚠️ No ElevenLabs key found")
+            logger.warning("⚠️ No ElevenLabs key found")
 
     def _init_openai(self):
         key = os.getenv("OPENAI_API_KEY")
@@ -71,73 +73,106 @@ class HybridTTSService:
             try:
                 from openai import OpenAI
                 self.oai_client = OpenAI(api_key=key)
-                print("✅ OpenAI TTS ready (fallback)")
+                logger.info("✅ OpenAI TTS ready (fallback)")
             except Exception as e:
                 self.oai_client = None
-                print(f"⚠️ OpenAI init failed: {e}")
+                logger.warning(f"⚠️ OpenAI init failed: {e}")
         else:
             self.oai_client = None
-            print("⚠️ No OpenAI key found")
+            logger.warning("⚠️ No OpenAI key found")
 
     # ── Public ──────────────────────────────────────────────
 
+    def open_connections(self) -> dict:
+        """
+        One cheap, unbilled call per configured provider, leaving a warm
+        connection in each client's pool. Returns provider → outcome.
+        """
+        calls = {}
+        if self.el_client:
+            calls["elevenlabs"] = lambda: self.el_client.models.list(
+                request_options={"timeout_in_seconds": 10, "max_retries": 0}
+            )
+        if self.oai_client:
+            calls["openai"] = lambda: self.oai_client.with_options(max_retries=0, timeout=10).models.list()
+
+        outcome = {}
+        for provider, call in calls.items():
+            try:
+                call()
+                outcome[provider] = "ok"
+            except Exception as e:
+                outcome[provider] = f"failed: {e}"
+        return outcome
+
     def generate_audio(self, text: str, language: str = "en") -> dict:
         char_count = len(text)
-        timestamp = int(time.time())
+        # Unique per call — batch scenes are generated concurrently
+        timestamp = f"{int(time.time())}_{uuid.uuid4().hex[:8]}"
 
-        print(f"🎤 Generating audio ({char_count} chars, lang: {language})")
+        logger.info(f"🎤 Generating audio ({char_count} chars, lang: {language})")
 
-        if self._should_use_elevenlabs(char_count):
+        if self._reserve_elevenlabs(char_count):
             try:
-                result = self._generate_elevenlabs(text, timestamp)
-                result.update({"provider": "elevenlabs", "characters": char_count, "language": language})
-                self.el_chars_used += char_count
-                self._save_state()
-                print("✅ ElevenLabs audio generated")
-                return result
+                with span("tts", provider="elevenlabs", chars=char_count), \
+                        timed_call(TTS_SECONDS, provider="elevenlabs"):
+                    result = self._generate_elevenlabs(text, timestamp)
             except Exception as e:
+                self.ledger.refund(char_count)
                 error_str = str(e)
-                print(f"⚠️ ElevenLabs failed: {error_str}, trying OpenAI...")
+                logger.warning(f"⚠️ ElevenLabs failed: {error_str}, trying OpenAI...")
                 if "quota_exceeded" in error_str or "401" in error_str:
-                    self.el_quota_exhausted = True
-                    self._save_state()
-                    print("⚠️ ElevenLabs blocked — switching to OpenAI permanently")
+                    self.ledger.mark_exhausted()
+                    logger.warning("⚠️ ElevenLabs blocked — switching to OpenAI permanently")
+            else:
+                self.ledger.commit(char_count)
+                TTS_CHARACTERS.inc(char_count, provider="elevenlabs")
+                result.update({"provider": "elevenlabs", "characters": char_count, "language": language})
+                logger.info("✅ ElevenLabs audio generated")
+                return result
 
         if self.oai_client:
             try:
-                result = self._generate_openai(text, timestamp, language)
+                with span("tts", provider="openai", chars=char_count), \
+                        timed_call(TTS_SECONDS, provider="openai"):
+                    result = self._generate_openai(text, timestamp, language)
+                TTS_CHARACTERS.inc(char_count, provider="openai")
                 result.update({"provider": "openai", "characters": char_count, "language": language})
-                print("✅ OpenAI audio generated")
+                logger.info("✅ OpenAI audio generated")
                 return result
             except Exception as e:
-                print(f"❌ OpenAI also failed: {e}")
+                logger.error(f"❌ OpenAI also failed: {e}")
 
         raise Exception("Both TTS providers failed. Check API keys and quotas.")
 
     def generate_audio_batch(self, scenes: list, language: str = "en") -> list:
-        print(f"🎤 Generating {len(scenes)} audio clips...")
+        logger.info(f"🎤 Generating {len(scenes)} audio clips...")
         self._cleanup_old_files()
 
-        audio_results = []
-        for scene in scenes:
+        def one(scene):
             narration = scene.get("narration", "").strip()
             if len(narration) < 5:
-                print(f"   ⚠️ Scene {scene['id']}: No narration, skipping")
-                continue
+                logger.warning(f"   ⚠️ Scene {scene['id']}: No narration, skipping")
+                return None
             try:
                 result = self.generate_audio(text=narration, language=language)
-                audio_results.append({
-                    "scene_id": scene["id"],
-                    "audio_path": result["audio_path"],
-                    "filename": result["filename"],
-                    "duration": result["duration_actual"],
-                    "provider": result["provider"]
-                })
-                print(f"   ✅ Scene {scene['id']}: {result['duration_actual']:.1f}s via {result['provider']}")
             except Exception as e:
-                print(f"   ❌ Scene {scene['id']} audio failed: {e}")
+                logger.error(f"   ❌ Scene {scene['id']} audio failed: {e}")
+                return None
+            logger.info(f"   ✅ Scene {scene['id']}: {result['duration_actual']:.1f}s via {result['provider']}")
+            return {
+                "scene_id": scene["id"],
+                "audio_path": result["audio_path"],
+                "filename": result["filename"],
+                "duration": result["duration_actual"],
+                "provider": result["provider"]
+            }
+
+        # Scenes are independent; the quota ledger keeps concurrent calls honest
+        with ThreadPoolExecutor(max_workers=max(1, min(self.BATCH_CONCURRENCY, len(scenes)))) as pool:
+            results = list(pool.map(bind(one), scenes))
 
-        return audio_results
+        return [r for r in results if r]
 
     def get_status(self) -> dict:
         el_available = self.el_client is not None and not self.el_quota_exhausted
@@ -146,7 +181,7 @@ class HybridTTSService:
                 "available": el_available,
                 "quota_exhausted": self.el_quota_exhausted,
                 "chars_used": self.el_chars_used,
-                "chars_remaining": max(0, self.el_char_limit - self.el_chars_used)
+                "chars_remaining": self.ledger.remaining
             },
             "openai": {"available": self.oai_client is not None},
             "active_provider": "elevenlabs" if el_available else "openai"
@@ -154,25 +189,22 @@ class HybridTTSService:
 
     # ── Private ─────────────────────────────────────────────
 
-    def _should_use_elevenlabs(self, char_count: int) -> bool:
+    def _reserve_elevenlabs(self, char_count: int) -> bool:
         if not self.el_client or self.el_quota_exhausted:
             return False
-        remaining = self.el_char_limit - self.el_chars_used
-        if remaining < char_count:
-            print(f"⚠️ ElevenLabs quota low: {remaining} chars remaining")
+        if not self.ledger.reserve(char_count):
+            logger.warning(f"⚠️ ElevenLabs quota low: {self.ledger.remaining} chars remaining")
             return False
         return True
 
     def _get_actual_duration(self, path: str) -> float:
+        # Read from the MP3 frame headers — no decode
         try:
-            clip = AudioFileClip(path)
-            duration = clip.duration
-            clip.close()
-            return duration
+            return probe_mp3(path)["duration"]
         except Exception:
             return 0.0
 
-    def _generate_elevenlabs(self, text: str, timestamp: int) -> dict:
+    def _generate_elevenlabs(self, text: str, timestamp: str) -> dict:
         audio_bytes = b"".join(self.el_client.text_to_speech.convert(
             text=text,
             voice_id=self.VOICE_ID,
@@ -194,7 +226,7 @@ class HybridTTSService:
             "duration_actual": actual
         }
 
-    def _generate_openai(self, text: str, timestamp: int, language: str = "en") -> dict:
+    def _generate_openai(self, text: str, timestamp: str, language: str = "en") -> dict:
         voice = OPENAI_VOICE_BY_LANG.get(language, OPENAI_VOICE_BY_LANG["default"])
         response = self.oai_client.audio.speech.create(
             model="tts-1-hd", voice=voice, input=text, speed=1.0
@@ -222,4 +254,4 @@ class HybridTTSService:
                 except Exception:
                     pass
         if deleted:
-            print(f"🧹 Cleaned up {deleted} old audio file(s)")
+            logger.info(f"🧹 Cleaned up {deleted} old audio file(s)")
@@ -0,0 +1,283 @@
+import os
+import logging
+import time
+import shutil
+from pathlib import Path
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from tracing import bind, span
+
+logger = logging.getLogger("explainbot.pipeline")
+
+
+class StageGraph:
+    """
+    Runs named stages on a thread pool as soon as their dependencies finish.
+
+    Each stage function receives the dict of results produced so far and
+    returns its own result. Wall time ends up bounded by the slowest chain
+    of dependent stages rather than the sum of all of them.
+    """
+
+    def __init__(self):
+        self._stages: dict[str, tuple] = {}
+
+    def add(self, name: str, fn, after: tuple = ()):
+        for dep in after:
+            if dep not in self._stages:
+                raise ValueError(f"Stage '{name}' depends on unknown stage '{dep}'")
+        self._stages[name] = (fn, tuple(after))
+        return self
+
+    def run(self, on_event=None) -> tuple[dict, dict]:
+        """`on_event(event, name)` is called with "start"/"done" per stage."""
+        results, spans = {}, {}
+        pending = dict(self._stages)
+        running = {}
+        origin = time.perf_counter()
+
+        def timed(name, fn):
+            start = time.perf_counter()
+            if on_event:
+                on_event("start", name)
+            try:
+                with span(f"pipeline.{name}"):
+                    return fn(results)
+            finally:
+                spans[name] = (start - origin, time.perf_counter() - origin)
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self._stages))) as pool:
+            while pending or running:
+                for name, (fn, after) in list(pending.items()):
+                    if all(dep in results for dep in after):
+                        running[pool.submit(bind(timed), name, fn)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+                    if on_event:
+                        on_event("done", name)
+
+        return results, self._timings(spans, origin)
+
+    def _timings(self, spans: dict, origin: float) -> dict:
+        # Walk back from the last stage to finish through whichever
+        # dependency finished last — that chain is what set the wall time.
+        path = []
+        current = max(spans, key=lambda n: spans[n][1]) if spans else None
+        while current:
+            path.append(current)
+            deps = self._stages[current][1]
+            current = max(deps, key=lambda n: spans[n][1]) if deps else None
+
+        return {
+            "stages": {name: round(end - start, 3) for name, (start, end) in spans.items()},
+            "total": round(time.perf_counter() - origin, 3),
+            "critical_path": path[::-1]
+        }
+
+
+class VideoPipeline:
+    """
+    LLM → diagram / TTS / frames → encode, expressed as a StageGraph.
+
+    Explanation and retrieval run side by side, then the scene plan fans
+    out: diagram rendering, per-scene TTS and frame rasterisation overlap,
+    and the encode starts once audio durations and frames are both ready.
+    """
+
+    # Rough share of a typical render spent in each stage, for progress reporting
+    STAGE_WEIGHTS = {
+        "explanation": 10, "retrieval": 2, "plan": 10,
+        "diagram": 3, "tts": 30, "frames": 5, "encode": 40
+    }
+
+    def __init__(self, content_agent, video_agent, tts_service, diagram_service, video_service):
+        self.content_agent = content_agent
+        self.video_agent = video_agent
+        self.tts_service = tts_service
+        self.diagram_service = diagram_service
+        self.video_service = video_service
+
+    def run(self, query: str, context: str, language: str, progress=None,
+            profile: str = None) -> dict:
+        """
+        `progress(stage, percent)` is called as stages start and finish;
+        `profile` names a VideoService render profile.
+        """
+        graph = StageGraph()
+
+        graph.add("explanation", lambda r: self._explain(query, context, language))
+
+        # Grounded context for video agent — avoids hallucination cascading
+        graph.add("retrieval", lambda r: self.content_agent.retrieve_for_video(
+            query=query,
+            context=context,
+            top_k=5
+        ))
+
+        graph.add("plan", lambda r: self._plan(query, language, r), after=("explanation", "retrieval"))
+        graph.add("diagram", self._diagram, after=("plan",))
+        graph.add("tts", lambda r: self._tts(language, r), after=("plan",))
+        # Frames and encoder temp files live in a scratch dir private to this job
+        scratch_dir = self.video_service.new_scratch_dir()
+        graph.add("frames", lambda r: self._frames(scratch_dir, profile, r), after=("plan", "diagram"))
+        graph.add("encode", lambda r: self._encode(scratch_dir, profile, r), after=("tts", "frames"))
+
+        try:
+            results, timings = graph.run(on_event=self._progress_reporter(progress))
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+        return {
+            "explanation": results["explanation"],
+            "scene_plan": results["plan"],
+            "audio_clips": results["tts"],
+            "diagram_path": results["diagram"],
+            "video_path": results["encode"],
+            "timings": timings
+        }
+
+    def pin_inputs(self, audio_clips: list, diagram_path: str) -> dict:
+        """
+        Hard-link (or copy) a finished render's narration and diagram into a
+        scratch dir of their own, so a rerender() queued behind other jobs
+        doesn't depend on files that audio cleanup or diagram cache eviction
+        may remove first. Returns rerender()'s audio_clips, diagram_path and
+        pinned_dir arguments; rerender() removes the dir.
+        """
+        pinned_dir = self.video_service.new_scratch_dir()
+        try:
+            clips = [
+                {**clip, "audio_path": _pin(clip["audio_path"], pinned_dir)} for clip in audio_clips
+            ]
+            diagram = _pin(diagram_path, pinned_dir) if diagram_path else None
+        except Exception:
+            shutil.rmtree(pinned_dir, ignore_errors=True)
+            raise
+        return {"audio_clips": clips, "diagram_path": diagram, "pinned_dir": pinned_dir}
+
+    def rerender(self, scene_plan: dict, audio_clips: list, diagram_path: str,
+                 profile: str, progress=None, pinned_dir: str = None) -> dict:
+        """
+        Re-encode an already planned and narrated video at another profile —
+        only frames and encode run, so a preview can be followed by the
+        full-quality render without repeating the LLM and TTS calls.
+        `pinned_dir` (from pin_inputs()) is removed once done.
+        """
+        stages = {"plan": scene_plan, "tts": audio_clips, "diagram": diagram_path}
+        graph = StageGraph()
+        scratch_dir = self.video_service.new_scratch_dir()
+        graph.add("frames", lambda r: self._frames(scratch_dir, profile, stages))
+        graph.add("encode", lambda r: self._encode(scratch_dir, profile, {**stages, **r}),
+                  after=("frames",))
+
+        try:
+            results, timings = graph.run(
+                on_event=self._progress_reporter(progress, ("frames", "encode"))
+            )
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+            if pinned_dir:
+                shutil.rmtree(pinned_dir, ignore_errors=True)
+        return {
+            "scene_plan": scene_plan,
+            "audio_clips": audio_clips,
+            "diagram_path": diagram_path,
+            "video_path": results["encode"],
+            "timings": timings
+        }
+
+    def _progress_reporter(self, progress, stages: tuple = None):
+        if progress is None:
+            return None
+        running, finished = [], []
+        lock = threading.Lock()
+        total = sum(self.STAGE_WEIGHTS[n] for n in (stages or self.STAGE_WEIGHTS))
+
+        def on_event(event: str, name: str):
+            with lock:
+                if event == "start":
+                    running.append(name)
+                else:
+                    running.remove(name)
+                    finished.append(name)
+                percent = 100 * sum(self.STAGE_WEIGHTS.get(n, 0) for n in finished) / total
+                stage = "+".join(running) or name
+            progress(stage, percent)
+
+        return on_event
+
+    # ── Stages ──────────────────────────────────────────────
+
+    def _explain(self, query: str, context: str, language: str) -> dict:
+        logger.info("📝 Generating explanation...")
+        explanation = self.content_agent.generate_explanation(
+            query=query,
+            context=context,
+            format_type='video',
+            language=language
+        )
+        logger.info(f"✅ Explanation: {len(explanation['text'])} chars")
+        return explanation
+
+    def _plan(self, query: str, language: str, r: dict) -> dict:
+        logger.info("🎞️  Planning video scenes...")
+        scene_plan = self.video_agent.plan_scenes(
+            query=query,
+            explanation=r["explanation"]['text'],
+            language=language,
+            grounded_context=r["retrieval"]   # ← grounded, not hallucinated
+        )
+        logger.info(f"✅ {len(scene_plan['scenes'])} scenes planned")
+        for scene in scene_plan['scenes']:
+            logger.info(f"   Scene {scene['id']}: {scene['type']} (~{scene.get('duration', 0):.0f}s)")
+        return scene_plan
+
+    def _diagram(self, r: dict) -> str:
+        logger.info("📊 Rendering diagram...")
+        diagram_path = self.diagram_service.mermaid_to_png(r["plan"]['mermaid_diagram'])
+        logger.info("✅ Diagram rendered")
+        return diagram_path
+
+    def _tts(self, language: str, r: dict) -> list:
+        logger.info("🎤 Generating scene audio...")
+        audio_clips = self.tts_service.generate_audio_batch(
+            scenes=r["plan"]['scenes'],
+            language=language
+        )
+        if not audio_clips:
+            raise Exception("Audio generation failed for all scenes")
+        total = sum(clip['duration'] for clip in audio_clips)
+        logger.info(f"✅ {len(audio_clips)} audio clips ({total:.1f}s total)")
+        return audio_clips
+
+    def _frames(self, scratch_dir: str, profile: str, r: dict) -> dict:
+        return self.video_service.render_frames(r["plan"]['scenes'], r["diagram"], scratch_dir, profile)
+
+    def _encode(self, scratch_dir: str, profile: str, r: dict) -> str:
+        logger.info("🎬 Composing video...")
+        return self.video_service.create_video(
+            scenes=r["plan"]['scenes'],
+            audio_clips=r["tts"],
+            diagram_path=r["diagram"],
+            frames=r["frames"],
+            scratch_dir=scratch_dir,
+            profile=profile
+        )
+
+
+def _pin(path: str, directory: str) -> str:
+    target = os.path.join(directory, Path(path).name)
+    try:
+        os.link(path, target)
+    except OSError:
+        # Different filesystem (e.g. scratch on /dev/shm) — copy instead
+        shutil.copyfile(path, target)
+    return target
@@ -1,272 +1,412 @@
+import logging
 
+import os
 import time
-import numpy as np
+import uuid
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from PIL import Image, ImageDraw, ImageFont
-from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips, concatenate_audioclips
-
-WIDTH, HEIGHT = 1280, 720
-FPS = 24
-
-COLORS = {
-    'bg_dark':    '#0f172a',
-    'bg_card':    '#1e293b',
-    'accent':     '#3b82f6',
-    'text_white': '#f8fafc',
-    'text_gray':  '#94a3b8',
+from PIL import Image
+from services.ffmpeg_encoder import encode_segment, encode_mp3, assemble
+from services.mp3_info import probe_mp3
+from services.file_cache import FileCache
+from services.scene_renderer import SceneRenderer
+from tracing import bind, span, stage
+from lanes import RENDER_NICE
+
+logger = logging.getLogger("explainbot.video")
+
+# Named render profiles, selectable per request. Scene layout is drawn on a
+# 1280x720 canvas and scaled to the profile's resolution.
+RENDER_PROFILES = {
+    "preview":  {"width": 640,  "height": 360,  "fps": 12, "bitrate": "600k",  "preset": "ultrafast"},
+    "standard": {"width": 1280, "height": 720,  "fps": 24, "bitrate": "3000k", "preset": "ultrafast"},
+    "high":     {"width": 1920, "height": 1080, "fps": 30, "bitrate": "6000k", "preset": "veryfast"},
 }
-
-# Font paths — Liberation Sans ships with fonts-liberation on Debian/Ubuntu
-# Falls back through options until one works
-FONT_CANDIDATES = [
-    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-    "/usr/share/fonts/truetype/liberation2/LiberationSans-Regular.ttf",
-    "/usr/share/fonts/liberation/LiberationSans-Regular.ttf",
-    "arial.ttf",  # Windows fallback
-]
-FONT_BOLD_CANDIDATES = [
-    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-    "/usr/share/fonts/truetype/liberation2/LiberationSans-Bold.ttf",
-    "/usr/share/fonts/liberation/LiberationSans-Bold.ttf",
-    "arialbd.ttf",
-]
-
-def _find_font(candidates: list, size: int) -> ImageFont.ImageFont:
-    for path in candidates:
+DEFAULT_PROFILE = "standard"
+
+# Bump when the segment filter graph changes; the profile's settings and
+# the segment's frame and duration make up the rest of the cache key
+SEGMENT_VERSION = "2"
+
+
+def get_profile(name: str = None) -> dict:
+    name = name or DEFAULT_PROFILE
+    if name not in RENDER_PROFILES:
+        raise ValueError(f"Unknown render profile '{name}'. Use one of: {', '.join(RENDER_PROFILES)}")
+    return {"name": name, **RENDER_PROFILES[name]}
+
+
+# ── Render process pool ──────────────────────────────────────────────────────
+#
+# Encodes run in worker processes so they neither hold the GIL of the API
+# process nor share temp files: every job gets its own scratch directory under
+# RENDER_SCRATCH_DIR (point it at tmpfs, e.g. /dev/shm, to keep frames in RAM).
+
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", "0")) or os.cpu_count() or 1
+RENDER_THREADS = int(os.getenv("RENDER_THREADS", "0"))   # 0 = let ffmpeg decide
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def render_pool() -> ProcessPoolExecutor:
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn, not fork — the API process runs threads (ledger flusher, job workers).
+            # Workers (and the ffmpeg they start) run niced, behind interactive requests
+            _render_pool = ProcessPoolExecutor(
+                max_workers=RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_lower_worker_priority
+            )
+        return _render_pool
+
+
+def run_in_render_pool(fn, *args, timeout: float = None):
+    """
+    Run fn(*args) on a render worker and wait for the result. A worker that
+    dies (OOM kill, segfault in the encoder) breaks the whole pool, so the
+    pool is rebuilt and the job retried once.
+    """
+    global _render_pool
+    for attempt in (1, 2):
+        pool = render_pool()
         try:
-            return ImageFont.truetype(path, size)
-        except:
-            continue
-    return ImageFont.load_default()
-
-def get_font(size: int, bold: bool = False) -> ImageFont.ImageFont:
-    return _find_font(FONT_BOLD_CANDIDATES if bold else FONT_CANDIDATES, size)
+            return pool.submit(fn, *args).result(timeout=timeout)
+        except BrokenProcessPool:
+            if attempt == 2:
+                raise
+            logger.warning("⚠️ Render pool broke, restarting it and retrying once")
+            with _render_pool_lock:
+                # Another waiter may have rebuilt it already
+                if _render_pool is pool:
+                    _render_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _lower_worker_priority():
+    # Absolute, not os.nice(): the pool may be started from an already niced video lane thread
+    if RENDER_NICE and hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, RENDER_NICE)
+        except OSError:
+            pass
+
+
+def encode_scene(item: dict, output_path: str, profile: dict) -> str:
+    """Runs in a render worker: one scene picture → one cacheable H.264 segment."""
+    encode_segment(
+        item["frame"], item["duration"], output_path,
+        fps=profile["fps"], bitrate=profile["bitrate"], preset=profile["preset"],
+        threads=RENDER_THREADS
+    )
+    return output_path
+
+
+def encode_timeline(timeline: list, output_path: str, scratch_dir: str, profile: dict) -> str:
+    """Runs in a render worker: whole-timeline MoviePy encode (no segment cache)."""
+    _encode_moviepy(timeline, output_path, scratch_dir, profile)
+    return output_path
+
+
+def _encode_moviepy(timeline: list, output_path: str, scratch_dir: str, profile: dict):
+    # MoviePy (and the IPython stack it pulls in) is only needed by this
+    # fallback, so neither the API process nor the render workers import it
+    # until a render actually takes this path
+    import numpy as np
+    from moviepy.editor import ImageClip, AudioFileClip, concatenate_videoclips, concatenate_audioclips
+
+    video_clips = []
+    audio_parts = []
+    for item in timeline:
+        with Image.open(item["frame"]) as frame:
+            clip = ImageClip(np.array(frame.convert('RGB'))).set_duration(item["duration"])
+        clip = clip.fadein(0.3).fadeout(0.3)
+        video_clips.append(clip)
+        if item["audio"]:
+            audio_parts.append(AudioFileClip(item["audio"]))
+
+    logger.info(f"   Combining {len(video_clips)} scenes...")
+    final_video = concatenate_videoclips(video_clips, method="compose")
+
+    if audio_parts:
+        logger.info(f"   Combining {len(audio_parts)} audio clips...")
+        combined_audio = concatenate_audioclips(audio_parts)
+
+        if abs(final_video.duration - combined_audio.duration) > 0.1:
+            logger.info(f"   Adjusting sync: video={final_video.duration:.1f}s, audio={combined_audio.duration:.1f}s")
+            final_video = final_video.set_duration(combined_audio.duration)
+
+        final_video = final_video.set_audio(combined_audio)
+
+    logger.info("   Exporting MP4...")
+    final_video.write_videofile(
+        output_path,
+        fps=profile["fps"],
+        codec='libx264',
+        audio_codec='aac',
+        bitrate=profile["bitrate"],
+        preset=profile["preset"],
+        verbose=False,
+        logger=None,
+        threads=RENDER_THREADS or None,
+        ffmpeg_params=["-movflags", "+faststart"],
+        temp_audiofile=str(Path(scratch_dir) / "temp_audio.m4a"),
+        remove_temp=True
+    )
 
 
 class VideoService:
     def __init__(self):
         self.output_dir = Path("outputs/video")
         self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.temp_dir = Path("outputs/video/temp")
-        self.temp_dir.mkdir(exist_ok=True)
-
-    def create_video(self, scenes: list, audio_clips: list, diagram_path: str) -> str:
-        print("🎬 Creating synced video...")
-
-        audio_map = {clip['scene_id']: clip for clip in audio_clips}
-        video_clips = []
-        audio_parts = []
-
-        for i, scene in enumerate(scenes):
-            scene_id = scene['id']
-            print(f"   Scene {i+1}/{len(scenes)}: {scene['type']}")
-
-            scene_audio = audio_map.get(scene_id)
-
-            if scene_audio:
-                scene_duration = scene_audio['duration']
-                print(f"      Audio: {scene_duration:.1f}s")
-            else:
-                scene_duration = scene.get('duration', 5)
-                print(f"      ⚠️ No audio, using planned {scene_duration:.1f}s")
-
-            scene['duration'] = scene_duration
-
-            if scene['type'] == 'title':
-                clip = self._make_title_scene(scene)
-            elif scene['type'] == 'diagram':
-                clip = self._make_diagram_scene(scene, diagram_path)
-            elif scene['type'] == 'text':
-                clip = self._make_text_scene(scene)
-            elif scene['type'] == 'summary':
-                clip = self._make_summary_scene(scene)
-            else:
-                clip = self._make_title_scene(scene)
-
-            clip = clip.fadein(0.3).fadeout(0.3)
-            video_clips.append(clip)
-
-            if scene_audio:
-                audio_parts.append(AudioFileClip(scene_audio['audio_path']))
-
-        print(f"   Combining {len(video_clips)} scenes...")
-        final_video = concatenate_videoclips(video_clips, method="compose")
-
-        if audio_parts:
-            print(f"   Combining {len(audio_parts)} audio clips...")
-            combined_audio = concatenate_audioclips(audio_parts)
-
-            if abs(final_video.duration - combined_audio.duration) > 0.1:
-                print(f"   Adjusting sync: video={final_video.duration:.1f}s, audio={combined_audio.duration:.1f}s")
-                final_video = final_video.set_duration(combined_audio.duration)
-
-            final_video = final_video.set_audio(combined_audio)
-
-        timestamp = int(time.time())
-        output_path = self.output_dir / f"video_{timestamp}.mp4"
-
-        print("   Exporting MP4...")
-        final_video.write_videofile(
-            str(output_path),
-            fps=FPS,
-            codec='libx264',
-            audio_codec='aac',
-            bitrate='3000k',
-            preset='ultrafast',
-            verbose=False,
-            logger=None,
-            threads=4,
-            temp_audiofile=str(self.temp_dir / "temp_audio.m4a"),
-            remove_temp=True
+        self.temp_dir = Path(os.getenv("RENDER_SCRATCH_DIR", "outputs/video/temp"))
+        self.temp_dir.mkdir(parents=True, exist_ok=True)
+        # "ffmpeg" hands stills straight to ffmpeg; "moviepy" composites in Python
+        self.encoder = os.getenv("VIDEO_ENCODER", "ffmpeg").lower()
+        # Encoded scenes, keyed by what went into them; unchanged scenes are reused
+        self.segments = FileCache(
+            self.output_dir / "segments", prefix="segment_", suffix=".mp4",
+            max_entries=int(os.getenv("SEGMENT_CACHE_MAX", "500"))
         )
+        # One renderer per profile; fonts and static scene chrome are
+        # rasterised once per resolution, on first use
+        self.renderers: dict[str, SceneRenderer] = {}
+        self._stats = {name: {"renders": 0, "frames_seconds": 0.0,
+                              "encode_seconds": 0.0, "video_seconds": 0.0}
+                       for name in RENDER_PROFILES}
+        self._stats_lock = threading.Lock()
+
+    def new_scratch_dir(self) -> str:
+        """Private working directory for one render job; caller removes it."""
+        return tempfile.mkdtemp(prefix="job_", dir=self.temp_dir)
+
+    def renderer(self, profile_name: str = None) -> SceneRenderer:
+        profile = get_profile(profile_name)
+        renderer = self.renderers.get(profile["name"])
+        if renderer is None:
+            renderer = SceneRenderer(profile["width"], profile["height"])
+            self.renderers[profile["name"]] = renderer
+        return renderer
+
+    def load_renderers(self) -> str:
+        """Build every profile's renderer now — fonts and scene templates."""
+        for name in RENDER_PROFILES:
+            self.renderer(name)
+        return f"{len(RENDER_PROFILES)} profiles"
+
+    def test_render(self) -> str:
+        """
+        Encode one half-second preview segment through the render pool, so
+        the first real render doesn't pay for worker start-up or the
+        encoder's first run. Nothing is cached or counted in render_stats.
+        """
+        scratch_dir = self.new_scratch_dir()
+        try:
+            frame = self._save_frame(
+                self.renderer("preview").render({"id": 0, "type": "title", "text": "Warm-up"}),
+                scratch_dir, 0
+            )
+            output_path = str(Path(scratch_dir) / "warm_up.mp4")
+            run_in_render_pool(
+                encode_scene, {"frame": frame, "duration": 0.5}, output_path, get_profile("preview"),
+                timeout=120
+            )
+            return f"{Path(output_path).stat().st_size} byte test segment"
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    def render_stats(self) -> dict:
+        """Average frame and encode time per profile, and output seconds per render second."""
+        with self._stats_lock:
+            report = {}
+            for name, s in self._stats.items():
+                n = s["renders"]
+                busy = s["frames_seconds"] + s["encode_seconds"]
+                report[name] = {
+                    **RENDER_PROFILES[name],
+                    "renders": n,
+                    "avg_frames_seconds": round(s["frames_seconds"] / n, 3) if n else None,
+                    "avg_encode_seconds": round(s["encode_seconds"] / n, 3) if n else None,
+                    "realtime_factor": round(s["video_seconds"] / busy, 1) if busy else None
+                }
+            return report
+
+    def _record(self, profile_name: str, **seconds):
+        with self._stats_lock:
+            for key, value in seconds.items():
+                self._stats[profile_name][key] += value
+
+    def render_frames(self, scenes: list, diagram_path: str, scratch_dir: str = None,
+                      profile: str = None) -> dict:
+        """Rasterise every scene to a still frame, keyed by scene id.
+
+        Frames depend only on the scene plan (and the diagram), so this can
+        run while narration audio is still being generated. With
+        `scratch_dir` the frames are written there as PNGs and their paths
+        returned, ready to hand to a render worker.
+        """
+        name = get_profile(profile)["name"]
+        start = time.perf_counter()
+        with stage("frames", profile=name, scenes=len(scenes)):
+            renderer = self.renderer(profile)
+            frames = {}
+            for scene in scenes:
+                img = renderer.render(scene, diagram_path)
+                frames[scene['id']] = self._save_frame(img, scratch_dir, scene['id']) if scratch_dir else img
+        self._record(name, frames_seconds=time.perf_counter() - start)
+        return frames
+
+    def create_video(self, scenes: list, audio_clips: list, diagram_path: str,
+                     frames: dict = None, scratch_dir: str = None, profile: str = None) -> str:
+        settings = get_profile(profile)
+        logger.info(f"🎬 Creating synced video ({settings['name']}: "
+                    f"{settings['width']}x{settings['height']} @ {settings['fps']}fps)...")
+
+        own_scratch = scratch_dir is None
+        if own_scratch:
+            scratch_dir = self.new_scratch_dir()
 
-        print(f"✅ Synced video: {output_path.name}")
+        try:
+            if frames is None:
+                frames = self.render_frames(scenes, diagram_path, scratch_dir, profile)
+
+            audio_map = {clip['scene_id']: clip for clip in audio_clips}
+            timeline = []
+
+            for i, scene in enumerate(scenes):
+                scene_id = scene['id']
+                logger.info(f"   Scene {i+1}/{len(scenes)}: {scene['type']}")
+
+                scene_audio = audio_map.get(scene_id)
+
+                if scene_audio:
+                    scene_duration = scene_audio['duration']
+                    logger.info(f"      Audio: {scene_duration:.1f}s")
+                else:
+                    scene_duration = scene.get('duration', 5)
+                    logger.warning(f"      ⚠️ No audio, using planned {scene_duration:.1f}s")
+
+                scene['duration'] = scene_duration
+
+                frame = frames[scene_id]
+                if isinstance(frame, Image.Image):
+                    frame = self._save_frame(frame, scratch_dir, scene_id)
+                timeline.append({
+                    "frame": frame,
+                    "duration": scene_duration,
+                    "audio": scene_audio['audio_path'] if scene_audio else None
+                })
+
+            timestamp = int(time.time())
+            output_path = self.output_dir / f"video_{timestamp}_{uuid.uuid4().hex[:8]}.mp4"
+
+            start = time.perf_counter()
+            with stage("encode", profile=settings['name'], scenes=len(timeline)) as s:
+                encoded = False
+                if self.encoder == "ffmpeg":
+                    try:
+                        self._encode_segments(timeline, str(output_path), scratch_dir, settings)
+                        encoded = True
+                    except Exception as e:
+                        logger.warning(f"⚠️ Segment encode failed: {e}, falling back to MoviePy")
+                if not encoded:
+                    run_in_render_pool(
+                        encode_timeline, timeline, str(output_path), scratch_dir, settings
+                    )
+                s.set(encoder="ffmpeg" if encoded else "moviepy")
+            self._record(settings['name'], renders=1, encode_seconds=time.perf_counter() - start,
+                         video_seconds=sum(item["duration"] for item in timeline))
+        finally:
+            if own_scratch:
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+
+        logger.info(f"✅ Synced video: {output_path.name}")
         return str(output_path)
 
-    # ── Scene Creators ───────────────────────────────────────
-
-    def _make_title_scene(self, scene: dict) -> ImageClip:
-        img = Image.new('RGB', (WIDTH, HEIGHT), self._hex(COLORS['bg_dark']))
-        draw = ImageDraw.Draw(img)
-
-        draw.rectangle([(0, 0), (WIDTH, 10)], fill=self._hex(COLORS['accent']))
-
-        title = scene.get('text', 'Explanation')
-        lines = self._wrap_text(title, max_chars=35)
-
-        y_start = HEIGHT // 2 - (len(lines) * 40)
-        for i, line in enumerate(lines[:3]):
-            self._draw_centered_text(draw, line, y_start + (i * 75),
-                                     size=52, color=COLORS['text_white'], bold=True)
-
-        self._draw_centered_text(draw, "AI Generated Explanation",
-                                 HEIGHT // 2 + 130, size=28, color=COLORS['text_gray'])
-
-        draw.rectangle([(0, HEIGHT-10), (WIDTH, HEIGHT)], fill=self._hex(COLORS['accent']))
-
-        cx = WIDTH // 2
-        cy = HEIGHT // 2 + 185
-        draw.ellipse([(cx-15, cy-15), (cx+15, cy+15)], fill=self._hex(COLORS['accent']))
-
-        return self._img_to_clip(img, scene['duration'])
-
-    def _make_diagram_scene(self, scene: dict, diagram_path: str) -> ImageClip:
-        img = Image.new('RGB', (WIDTH, HEIGHT), self._hex(COLORS['bg_dark']))
-        draw = ImageDraw.Draw(img)
-
-        draw.rectangle([(0, 0), (WIDTH, 90)], fill=self._hex(COLORS['bg_card']))
-        draw.rectangle([(0, 88), (WIDTH, 90)], fill=self._hex(COLORS['accent']))
-        self._draw_centered_text(draw, "System Architecture", 28,
-                                 size=38, color=COLORS['accent'], bold=True)
+    def _encode_segments(self, timeline: list, output_path: str, scratch_dir: str, profile: dict):
+        """
+        Encode only the scene pictures not already in the segment cache,
+        then join them with the narration MP3s by stream copy.
+        """
+        audio_paths, durations = self._narration(timeline, scratch_dir)
+
+        # Cut scene boundaries on the cumulative audio clock, rounded to
+        # whole video frames, so picture and sound never drift apart
+        fps = profile["fps"]
+        segments, elapsed = [], 0.0
+        for item, duration in zip(timeline, durations):
+            frames = round((elapsed + duration) * fps) - round(elapsed * fps)
+            elapsed += duration
+            segments.append({"frame": item["frame"], "duration": frames / fps})
+
+        keys = [self._segment_key(seg, profile) for seg in segments]
+        missing = {}
+        for key, seg in zip(keys, segments):
+            if key not in missing and self.segments.get(key) is None:
+                missing[key] = seg
+        logger.info(f"   Segments: {len(segments) - len(missing)} cached, {len(missing)} to encode")
+
+        def encode(entry):
+            key, seg = entry
+            with span("segment.encode", seconds=round(seg["duration"], 2)):
+                self.segments.put(
+                    key, lambda tmp: run_in_render_pool(encode_scene, seg, tmp, profile)
+                )
+
+        if missing:
+            # One thread per segment just waits on its render worker; the
+            # process pool decides how many encodes really run at once
+            with ThreadPoolExecutor(max_workers=len(missing)) as waiters:
+                list(waiters.map(bind(encode), missing.items()))
+
+        assemble(
+            [str(self.segments.path_for(key)) for key in keys],
+            audio_paths, output_path, scratch_dir
+        )
 
-        try:
-            diagram = Image.open(diagram_path)
-            max_size = (WIDTH - 80, HEIGHT - 220)
-            diagram.thumbnail(max_size, Image.Resampling.LANCZOS)
-            x = (WIDTH - diagram.width) // 2
-            img.paste(diagram, (x, 100))
-        except Exception as e:
-            print(f"⚠️ Diagram error: {e}")
-            self._draw_centered_text(draw, "[ Process Diagram ]", HEIGHT // 2,
-                                     size=48, color=COLORS['text_gray'])
-
-        caption = scene.get('caption', 'Flow Overview')
-        caption_lines = self._wrap_text(caption, max_chars=70)
-        draw.rectangle([(0, HEIGHT-100), (WIDTH, HEIGHT)], fill=self._hex(COLORS['bg_card']))
-        draw.rectangle([(0, HEIGHT-102), (WIDTH, HEIGHT-100)], fill=self._hex(COLORS['accent']))
-        self._draw_centered_text(draw, caption_lines[0], HEIGHT-70, size=28, color=COLORS['text_white'])
-
-        return self._img_to_clip(img, scene['duration'])
-
-    def _make_text_scene(self, scene: dict) -> ImageClip:
-        img = Image.new('RGB', (WIDTH, HEIGHT), self._hex(COLORS['bg_dark']))
-        draw = ImageDraw.Draw(img)
-
-        heading = scene.get('heading', 'Key Points')
-        draw.rectangle([(0, 0), (WIDTH, 110)], fill=self._hex(COLORS['bg_card']))
-        draw.rectangle([(0, 108), (WIDTH, 110)], fill=self._hex(COLORS['accent']))
-        self._draw_centered_text(draw, heading, 32, size=44, color=COLORS['accent'], bold=True)
-
-        points = scene.get('points', [])[:3]
-        y_start = 160
-        point_spacing = 155
-
-        for i, point in enumerate(points):
-            y = y_start + (i * point_spacing)
-
-            bx, by = 80, y
-            draw.ellipse([(bx, by), (bx+55, by+55)], fill=self._hex(COLORS['accent']))
-
-            num_font = get_font(32, bold=True)
-            num = str(i+1)
-            bbox = draw.textbbox((0, 0), num, font=num_font)
-            draw.text((bx + 27 - (bbox[2]-bbox[0])//2, by + 10), num,
-                      fill=self._hex(COLORS['text_white']), font=num_font)
-
-            lines = self._wrap_text(point, max_chars=52)
-            tf = get_font(28)
-            for j, line in enumerate(lines[:2]):
-                draw.text((155, y + 5 + j * 35), line,
-                          fill=self._hex(COLORS['text_white']), font=tf)
-
-        return self._img_to_clip(img, scene['duration'])
-
-    def _make_summary_scene(self, scene: dict) -> ImageClip:
-        img = Image.new('RGB', (WIDTH, HEIGHT), self._hex(COLORS['bg_dark']))
-        draw = ImageDraw.Draw(img)
-
-        draw.rectangle([(0, 0), (WIDTH, 10)], fill=self._hex(COLORS['accent']))
-        draw.rectangle([(0, HEIGHT-10), (WIDTH, HEIGHT)], fill=self._hex(COLORS['accent']))
-
-        padding = 100
-        draw.rectangle(
-            [(padding, HEIGHT//2-130), (WIDTH-padding, HEIGHT//2+100)],
-            fill=self._hex(COLORS['bg_card']),
-            outline=self._hex(COLORS['accent']),
-            width=3
+    def _narration(self, timeline: list, scratch_dir: str) -> tuple[list, list]:
+        """
+        One MP3 per scene, all in the same format, and their durations read
+        from the frame headers. Narration is used as-is; only files whose
+        sample rate or channel count differs from the majority (e.g. a scene
+        that fell back to another TTS provider) are re-encoded, and scenes
+        without audio get generated silence.
+        """
+        probes = {i: probe_mp3(item["audio"]) for i, item in enumerate(timeline) if item["audio"]}
+
+        formats = Counter()
+        for info in probes.values():
+            formats[(info["sample_rate"], info["channels"])] += info["duration"]
+        sample_rate, channels = formats.most_common(1)[0][0] if formats else (44100, 2)
+
+        paths, durations = [], []
+        for i, item in enumerate(timeline):
+            info = probes.get(i)
+            path = item["audio"]
+            if info is None or (info["sample_rate"], info["channels"]) != (sample_rate, channels):
+                path = str(Path(scratch_dir) / f"narration_{i}.mp3")
+                encode_mp3(path, item["duration"], sample_rate, channels, source=item["audio"])
+                info = probe_mp3(path)
+            paths.append(path)
+            durations.append(info["duration"])
+        return paths, durations
+
+    def _segment_key(self, segment: dict, profile: dict) -> str:
+        return FileCache.make_key(
+            SEGMENT_VERSION, profile["fps"], profile["bitrate"], profile["preset"],
+            Path(segment["frame"]).read_bytes(),
+            f"{segment['duration']:.4f}"
         )
 
-        text = scene.get('text', 'Summary')
-        lines = self._wrap_text(text, max_chars=45)
-        y_start = HEIGHT//2 - (len(lines) * 25)
-        for i, line in enumerate(lines[:3]):
-            self._draw_centered_text(draw, line, y_start + i * 52,
-                                     size=36, color=COLORS['text_white'])
-
-        draw.rectangle([(0, HEIGHT-75), (WIDTH, HEIGHT)], fill=self._hex(COLORS['bg_card']))
-        self._draw_centered_text(draw, "ExplainBot AI • Powered by Groq + ElevenLabs",
-                                 HEIGHT-48, size=22, color=COLORS['text_gray'])
-
-        return self._img_to_clip(img, scene['duration'])
-
-    # ── Helpers ──────────────────────────────────────────────
-
-    def _wrap_text(self, text: str, max_chars: int = 40) -> list:
-        if len(text) <= max_chars:
-            return [text]
-        words = text.split()
-        lines, current = [], []
-        for word in words:
-            current.append(word)
-            if len(' '.join(current)) > max_chars:
-                if len(current) > 1:
-                    current.pop()
-                    lines.append(' '.join(current))
-                    current = [word]
-        if current:
-            lines.append(' '.join(current))
-        return lines
-
-    def _hex(self, hex_color: str):
-        h = hex_color.lstrip('#')
-        return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-
-    def _draw_centered_text(self, draw, text: str, y: int, size: int, color: str, bold: bool = False):
-        font = get_font(size, bold)
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        x = max(20, (WIDTH - text_width) // 2)
-        draw.text((x, y), text, fill=self._hex(color), font=font)
-
-    def _img_to_clip(self, img: Image.Image, duration: float) -> ImageClip:
-        return ImageClip(np.array(img)).set_duration(duration)
+    def _save_frame(self, img: Image.Image, scratch_dir: str, scene_id) -> str:
+        path = Path(scratch_dir) / f"scene_{scene_id}.png"
+        img.save(path, compress_level=1)
+        return str(path)
@@ -0,0 +1,295 @@
+import os
+import logging
+import json
+import time
+import sqlite3
+import threading
+
+logger = logging.getLogger("explainbot.state")
+
+# ── Shared application state ─────────────────────────────────────────────────
+#
+# Everything that must look the same from every worker — uploaded documents,
+# daily usage counters, the TTS quota and render job records — goes through
+# one of the backends below instead of module globals.
+#
+#   STATE_BACKEND=memory   single process (default; `uvicorn main:app`)
+#   STATE_BACKEND=sqlite   one SQLite file shared by every worker process,
+#                          e.g. `uvicorn main:app --workers 4`. Single
+#                          host only: WAL mode needs the file on a local
+#                          disk, never on a network filesystem.
+#
+# Both expose the same three groups of operations: documents, atomic
+# counters and JSON records.
+
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_DB = os.getenv("STATE_DB", "outputs/state.db")
+
+
+class MemoryState:
+    """Per-process state behind a lock."""
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: dict[str, str] = {}
+        self._languages: dict[str, str] = {}
+        self._counters: dict[str, int] = {}
+        self._records: dict[str, dict[str, dict]] = {}
+
+    # ── Documents ───────────────────────────────────────────
+
+    def put_document(self, name: str, text: str, language: str = None):
+        with self._lock:
+            self._documents[name] = text
+            self._languages[name] = language
+            self._counters["documents:version"] = self._counters.get("documents:version", 0) + 1
+
+    def remove_document(self, name: str) -> bool:
+        with self._lock:
+            if self._documents.pop(name, None) is None:
+                return False
+            self._languages.pop(name, None)
+            self._counters["documents:version"] = self._counters.get("documents:version", 0) + 1
+            return True
+
+    def documents(self) -> dict[str, str]:
+        """Name → text, in upload order."""
+        with self._lock:
+            return dict(self._documents)
+
+    def document_names(self) -> list[str]:
+        """Names in upload order, without loading any text."""
+        with self._lock:
+            return list(self._documents)
+
+    def document_languages(self) -> dict[str, str]:
+        """Name → language detected at upload (None if unknown)."""
+        with self._lock:
+            return {name: self._languages.get(name) for name in self._documents}
+
+    def documents_version(self) -> int:
+        """Bumped on every change, so callers can cache derived views."""
+        with self._lock:
+            return self._counters.get("documents:version", 0)
+
+    # ── Counters ────────────────────────────────────────────
+
+    def add(self, key: str, delta: int = 1, limit: int = None) -> tuple[bool, int]:
+        """
+        Add `delta` to a counter unless that would take it past `limit`.
+        Returns (applied, value_after).
+        """
+        with self._lock:
+            value = self._counters.get(key, 0)
+            if limit is not None and value + delta > limit:
+                return False, value
+            self._counters[key] = value + delta
+            return True, value + delta
+
+    def value(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    # ── Records ─────────────────────────────────────────────
+
+    def put_record(self, kind: str, record_id: str, data: dict):
+        with self._lock:
+            self._records.setdefault(kind, {})[record_id] = dict(data)
+
+    def put_record_bounded(self, kind: str, record_id: str, data: dict,
+                           counts, limit: int) -> tuple[bool, int]:
+        """
+        Store the record unless `limit` records of `kind` already satisfy
+        `counts(record)`; checked and stored atomically.
+        Returns (stored, matching records before this one).
+        """
+        with self._lock:
+            bucket = self._records.setdefault(kind, {})
+            matching = sum(1 for r in bucket.values() if counts(r))
+            if matching >= limit:
+                return False, matching
+            bucket[record_id] = dict(data)
+            return True, matching
+
+    def get_record(self, kind: str, record_id: str) -> dict | None:
+        with self._lock:
+            data = self._records.get(kind, {}).get(record_id)
+            return dict(data) if data is not None else None
+
+    def records(self, kind: str) -> list[dict]:
+        with self._lock:
+            return [dict(d) for d in self._records.get(kind, {}).values()]
+
+    def delete_records(self, kind: str, record_ids):
+        with self._lock:
+            bucket = self._records.get(kind, {})
+            for record_id in record_ids:
+                bucket.pop(record_id, None)
+
+
+class SqliteState:
+    """
+    State in a SQLite file (WAL mode), shared by every process that opens
+    it. Counter updates run inside BEGIN IMMEDIATE, so check-and-increment
+    is atomic across workers.
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "name TEXT PRIMARY KEY, text TEXT NOT NULL, added REAL NOT NULL, language TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS counters ("
+            "key TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "kind TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (kind, id))"
+        )
+        self._write(self._migrate)
+
+    @staticmethod
+    def _migrate(conn):
+        # Files created before documents had a language column; inside the
+        # write transaction so workers starting together don't both add it
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+        if "language" not in columns:
+            conn.execute("ALTER TABLE documents ADD COLUMN language TEXT")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    @staticmethod
+    def _bump(conn, key: str, delta: int):
+        conn.execute(
+            "INSERT INTO counters VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+            (key, delta)
+        )
+
+    # ── Documents ───────────────────────────────────────────
+
+    def put_document(self, name: str, text: str, language: str = None):
+        def write(conn):
+            # A re-upload keeps the document's original position
+            conn.execute(
+                "INSERT INTO documents (name, text, added, language) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET text = excluded.text, language = excluded.language",
+                (name, text, time.time(), language)
+            )
+            self._bump(conn, "documents:version", 1)
+        self._write(write)
+
+    def remove_document(self, name: str) -> bool:
+        def write(conn):
+            removed = conn.execute("DELETE FROM documents WHERE name = ?", (name,)).rowcount
+            if removed:
+                self._bump(conn, "documents:version", 1)
+            return removed > 0
+        return self._write(write)
+
+    def documents(self) -> dict[str, str]:
+        rows = self._conn().execute("SELECT name, text FROM documents ORDER BY added, name")
+        return dict(rows.fetchall())
+
+    def document_names(self) -> list[str]:
+        rows = self._conn().execute("SELECT name FROM documents ORDER BY added, name")
+        return [name for (name,) in rows.fetchall()]
+
+    def document_languages(self) -> dict[str, str]:
+        rows = self._conn().execute("SELECT name, language FROM documents ORDER BY added, name")
+        return dict(rows.fetchall())
+
+    def documents_version(self) -> int:
+        return self.value("documents:version")
+
+    # ── Counters ────────────────────────────────────────────
+
+    def add(self, key: str, delta: int = 1, limit: int = None) -> tuple[bool, int]:
+        def write(conn):
+            row = conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+            value = row[0] if row else 0
+            if limit is not None and value + delta > limit:
+                return False, value
+            self._bump(conn, key, delta)
+            return True, value + delta
+        return self._write(write)
+
+    def value(self, key: str) -> int:
+        row = self._conn().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    # ── Records ─────────────────────────────────────────────
+
+    def put_record(self, kind: str, record_id: str, data: dict):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO records VALUES (?, ?, ?)",
+            (kind, record_id, json.dumps(data))
+        )
+
+    def put_record_bounded(self, kind: str, record_id: str, data: dict,
+                           counts, limit: int) -> tuple[bool, int]:
+        def write(conn):
+            rows = conn.execute("SELECT data FROM records WHERE kind = ?", (kind,))
+            matching = sum(1 for (raw,) in rows.fetchall() if counts(json.loads(raw)))
+            if matching >= limit:
+                return False, matching
+            conn.execute(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?)",
+                (kind, record_id, json.dumps(data))
+            )
+            return True, matching
+        return self._write(write)
+
+    def get_record(self, kind: str, record_id: str) -> dict | None:
+        row = self._conn().execute(
+            "SELECT data FROM records WHERE kind = ? AND id = ?", (kind, record_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self, kind: str) -> list[dict]:
+        rows = self._conn().execute("SELECT data FROM records WHERE kind = ?", (kind,))
+        return [json.loads(data) for (data,) in rows.fetchall()]
+
+    def delete_records(self, kind: str, record_ids):
+        ids = [(kind, record_id) for record_id in record_ids]
+        if ids:
+            self._write(lambda conn: conn.executemany(
+                "DELETE FROM records WHERE kind = ? AND id = ?", ids
+            ))
+
+
+def make_state(backend: str = STATE_BACKEND):
+    if backend == "sqlite":
+        logger.info(f"🗄️ Shared state: {STATE_DB}")
+        return SqliteState(STATE_DB)
+    if backend != "memory":
+        raise ValueError(f"Unknown STATE_BACKEND '{backend}' (expected memory or sqlite)")
+    return MemoryState()
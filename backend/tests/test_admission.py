@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+import admission
+import lanes
+
+
+@pytest.fixture
+def busy():
+    """Fill lanes with tasks that block until the test ends."""
+    release = threading.Event()
+    lanes_used, futures = [], []
+
+    def fill(lane: lanes.Lane, tasks: int, service_seconds: float):
+        lane._service_seconds = service_seconds
+        futures.extend(lane.submit(release.wait) for _ in range(tasks))
+        lanes_used.append(lane)
+
+    yield fill
+    release.set()
+    for future in futures:
+        future.result()
+    for lane in lanes_used:
+        lane._service_seconds = None
+
+
+def test_expected_wait():
+    lane = lanes.Lane("t", workers=2)
+    assert lane.expected_wait(10) == 0
+    release = threading.Event()
+    for _ in range(5):
+        lane.submit(release.wait)
+    # 2 running + 3 waiting: a new task is 4th in line for 2 workers
+    assert lane.expected_wait(10) == 4 * 10 / 2
+    release.set()
+
+
+def test_idle_server_admits_everything():
+    for lane in lanes.LANES:
+        assert admission.assess(lane) == (True, 0)
+    decision = {"format": "video", "requires_diagram": True}
+    assert admission.degrade(decision) == {"format": "video", "requires_diagram": True,
+                                           "degraded_for_load": False}
+
+
+def test_over_budget_lane_sheds_with_retry_after(busy, monkeypatch):
+    monkeypatch.setitem(admission.MAX_WAIT, "upload", 1)
+    busy(lanes.UPLOAD, tasks=6, service_seconds=2)       # 5 ahead × 2 s ÷ 2 workers = 5 s
+    ok, retry_after = admission.assess("upload")
+    assert not ok and retry_after == 4
+    with pytest.raises(admission.Overloaded) as e:
+        admission.admit("upload")
+    assert (e.value.lane, e.value.retry_after) == ("upload", 4)
+
+
+def test_video_degrades_to_audio_then_text(busy, monkeypatch):
+    monkeypatch.setitem(admission.MAX_WAIT, "video", 1)
+    busy(lanes.VIDEO, tasks=lanes.VIDEO.workers + 1, service_seconds=30)
+    decision = admission.degrade({"format": "video", "requires_diagram": True})
+    assert decision["format"] == "audio"
+    assert decision["original_format"] == "video"
+    assert decision["degraded_for_load"] and decision["retry_after"] > 0
+    assert decision["requires_diagram"] is False
+
+    monkeypatch.setitem(admission.MAX_WAIT, "audio", 1)
+    busy(lanes.AUDIO, tasks=lanes.AUDIO.workers + 1, service_seconds=30)
+    decision = admission.degrade({"format": "video", "requires_diagram": True})
+    assert (decision["format"], decision["original_format"]) == ("text", "video")
+
+
+def test_disabled(busy, monkeypatch):
+    monkeypatch.setattr(admission, "ADMISSION_CONTROL", False)
+    monkeypatch.setitem(admission.MAX_WAIT, "upload", 0)
+    busy(lanes.UPLOAD, tasks=4, service_seconds=10)
+    assert admission.assess("upload") == (True, 0)
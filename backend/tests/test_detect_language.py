@@ -0,0 +1,54 @@
+import pytest
+
+import language_detect
+import main
+from state import MemoryState
+
+
+@pytest.fixture
+def state(monkeypatch):
+    fresh = MemoryState()
+    monkeypatch.setattr(main, "state", fresh)
+    return fresh
+
+
+def test_confident_query_keeps_its_language(state):
+    state.put_document("notes.txt", "text", "de")
+    query = "¿Qué es la recuperación aumentada y por qué la usamos en este documento?"
+    assert language_detect.detect_query(query) == ("es", True)
+    assert main.detect_language(query) == "es"
+
+
+def test_unsure_query_follows_the_documents(state):
+    state.put_document("a.txt", "text", "de")
+    state.put_document("b.txt", "text", "de")
+    state.put_document("c.txt", "text", "fr")
+    state.put_document("d.txt", "text")           # language unknown
+    assert not language_detect.detect_query("Explain RAG")[1]
+    assert main.detect_language("Explain RAG") == "de"
+
+
+def test_unsure_query_without_document_languages_uses_default(state):
+    state.put_document("a.txt", "text")
+    assert language_detect.detect_query("Explain RAG") == ("fr", False)
+    assert main.detect_language("Explain RAG") == language_detect.DEFAULT_LANGUAGE
+
+
+@pytest.mark.parametrize("text", [
+    "Retrieval augmented generation combines a retriever with a generator. " * 20,
+    "Retrieval augmented generation (RAG) is a technique that lets a language model "
+    "answer questions using documents retrieved at query time. " * 20,
+])
+def test_repetitive_english_document_gets_a_language(text):
+    assert language_detect.detect(text) == ("en", False)
+    assert language_detect.detect_document(text) == "en"
+
+
+@pytest.mark.parametrize("text", ["Retrieval augmented generation " * 20, "检索增强生成结合了检索器和生成器。" * 20, "1234 5678"])
+def test_document_too_thin_to_tell_has_no_language(text):
+    assert language_detect.detect_document(text) is None
+
+
+def test_confident_document_language():
+    text = "La recuperación aumentada combina un buscador con un generador de texto para responder preguntas."
+    assert language_detect.detect_document(text) == "es"
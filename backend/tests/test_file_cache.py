@@ -0,0 +1,58 @@
+import os
+import time
+from pathlib import Path
+
+from services.file_cache import FileCache
+
+
+def put(cache, key, age=0.0):
+    path = cache.put(key, lambda p: Path(p).write_text(key))
+    if age:
+        then = time.time() - age
+        os.utime(path, (then, then))
+    return path
+
+
+def test_hit_and_miss_counts(tmp_path):
+    cache = FileCache(tmp_path, prefix="t_", suffix=".txt", max_entries=10)
+    assert cache.get("a") is None
+    put(cache, "a")
+    assert cache.get("a") == str(cache.path_for("a"))
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FileCache(tmp_path, prefix="t_", suffix=".txt", max_entries=2)
+    put(cache, "old", age=3000)
+    put(cache, "older", age=4000)
+    put(cache, "new")
+    assert not cache.path_for("older").exists()
+    assert cache.path_for("old").exists()
+    assert cache.path_for("new").exists()
+
+
+def test_recently_used_entries_survive_eviction(tmp_path):
+    cache = FileCache(tmp_path, prefix="t_", suffix=".txt", max_entries=1)
+    put(cache, "a", age=3000)
+    cache.get("a")                    # about to be opened by the caller
+    put(cache, "b")
+    assert cache.path_for("a").exists()
+    assert cache.path_for("b").exists()
+
+
+def test_hits_do_not_touch_the_file(tmp_path):
+    cache = FileCache(tmp_path, prefix="t_", suffix=".txt", max_entries=10)
+    path = put(cache, "a", age=3000)
+    before = os.stat(path).st_mtime_ns
+    cache.get("a")
+    assert os.stat(path).st_mtime_ns == before
+
+
+def test_hit_counts_as_use_for_eviction(tmp_path):
+    cache = FileCache(tmp_path, prefix="t_", suffix=".txt", max_entries=2)
+    put(cache, "hit", age=5000)
+    put(cache, "unused", age=4000)
+    cache.get("hit")
+    put(cache, "new")
+    assert cache.path_for("hit").exists()
+    assert not cache.path_for("unused").exists()
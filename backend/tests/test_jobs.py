@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, QueueFull
+from lanes import Lane
+
+
+def wait_for(queue, job_id, status, timeout=2.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} is {queue.get(job_id)['status']}, not {status}")
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def blocking(release):
+    def render(progress, value):
+        progress("frames", 40)
+        release.wait(2)
+        return {"value": value}
+    return render
+
+
+def test_status_transitions_and_progress(release):
+    queue = JobQueue(lane=Lane("t", workers=1))
+    job = queue.submit(blocking(release), value=7)
+    assert job["status"] in ("queued", "running")
+
+    running = wait_for(queue, job["job_id"], "running")
+    deadline = time.time() + 2
+    while queue.get(job["job_id"])["stage"] != "frames" and time.time() < deadline:
+        time.sleep(0.01)
+    assert (queue.get(job["job_id"])["stage"], queue.get(job["job_id"])["progress"]) == ("frames", 40)
+    assert running["started_at"] is not None
+
+    release.set()
+    done = wait_for(queue, job["job_id"], "done")
+    assert done["progress"] == 100
+    assert done["result"] == {"value": 7}
+    assert done["finished_at"] >= done["started_at"]
+
+
+def test_failed_job_records_the_error():
+    def broken(progress):
+        raise RuntimeError("encoder crashed")
+    queue = JobQueue(lane=Lane("t", workers=1))
+    job = wait_for(queue, queue.submit(broken)["job_id"], "failed")
+    assert job["error"] == "encoder crashed"
+    assert job["result"] is None
+
+
+def test_queue_position_and_max_pending(release):
+    queue = JobQueue(lane=Lane("t", workers=1), max_pending=3)
+    first = queue.submit(blocking(release), value=1)
+    wait_for(queue, first["job_id"], "running")
+    second = queue.submit(blocking(release), value=2)
+    third = queue.submit(blocking(release), value=3)
+    assert queue.get(second["job_id"])["queue_position"] == 1
+    assert queue.get(third["job_id"])["queue_position"] == 2
+
+    with pytest.raises(QueueFull):
+        queue.submit(blocking(release), value=4)
+    assert queue.stats()["running"] == 1 and queue.stats()["queued"] == 2
+
+    release.set()
+    wait_for(queue, third["job_id"], "done")
+    queue.submit(blocking(release), value=5)       # room again
+
+
+def test_finished_jobs_expire_after_ttl():
+    queue = JobQueue(lane=Lane("t", workers=1), ttl_seconds=60)
+    job = wait_for(queue, queue.submit(lambda progress: None)["job_id"], "done")
+
+    record = queue.state.get_record(JobQueue.KIND, job["job_id"])
+    record["finished_at"] -= 120
+    queue.state.put_record(JobQueue.KIND, job["job_id"], record)
+
+    queue.submit(lambda progress: None)          # expiry runs on submit
+    assert queue.get(job["job_id"]) is None
+
+
+def test_jobs_left_by_a_dead_worker_expire(tmp_path):
+    from state import SqliteState
+    path = str(tmp_path / "state.db")
+    crashed = JobQueue(lane=Lane("t", workers=1), max_pending=2, state=SqliteState(path))
+    # What a worker that died mid-render leaves behind
+    for job_id, status in (("a", "queued"), ("b", "running")):
+        crashed.state.put_record(JobQueue.KIND, job_id, {
+            "job_id": job_id, "status": status, "stage": status, "progress": 0,
+            "created_at": time.time() - 600, "owner_pid": 1, "heartbeat_at": time.time() - 300,
+            "started_at": None, "finished_at": None, "result": None, "error": None
+        })
+
+    queue = JobQueue(lane=Lane("t", workers=1), max_pending=2, state=SqliteState(path),
+                     orphan_seconds=60)
+    assert queue.get("b")["status"] == "failed"
+    job = queue.submit(lambda progress: "ok")          # the dead worker's jobs no longer count
+    assert wait_for(queue, job["job_id"], "done")["result"] == "ok"
+    assert queue.get("a")["status"] == "failed"
+
+
+def test_heartbeat_keeps_long_jobs_alive(release, monkeypatch):
+    monkeypatch.setattr(JobQueue, "HEARTBEAT_SECONDS", 0.05)
+    queue = JobQueue(lane=Lane("t", workers=1), orphan_seconds=0.3)
+    job = queue.submit(blocking(release), value=1)
+    record = wait_for(queue, job["job_id"], "running")
+    assert record["owner_pid"] > 0
+    time.sleep(0.6)                                    # well past orphan_seconds
+    assert queue.get(job["job_id"])["status"] == "running"
+    release.set()
+    wait_for(queue, job["job_id"], "done")
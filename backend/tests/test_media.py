@@ -0,0 +1,81 @@
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from media import media_response
+
+BODY = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    media = tmp_path / "clip.mp4"
+    media.write_bytes(BODY)
+    app = FastAPI()
+
+    @app.get("/media")
+    def serve(request: Request):
+        return media_response(request, media, "video/mp4")
+
+    @app.get("/log")
+    def serve_mutable(request: Request):
+        return media_response(request, media, "text/plain", immutable=False)
+
+    return TestClient(app)
+
+
+def test_full_response_has_validators(client):
+    r = client.get("/media")
+    assert r.status_code == 200
+    assert r.content == BODY
+    assert r.headers["etag"]
+    assert r.headers["last-modified"]
+    assert r.headers["accept-ranges"] == "bytes"
+    assert "immutable" in r.headers["cache-control"]
+    assert client.get("/log").headers["cache-control"] == "no-cache"
+
+
+def test_range_request_is_partial(client):
+    r = client.get("/media", headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.content == BODY[100:200]
+    assert r.headers["content-range"] == f"bytes 100-199/{len(BODY)}"
+
+
+def test_if_none_match_gets_304(client):
+    etag = client.get("/media").headers["etag"]
+    r = client.get("/media", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+    assert client.get("/media", headers={"If-None-Match": f'W/{etag}, "other"'}).status_code == 304
+    assert client.get("/media", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_modified_since(client):
+    last_modified = client.get("/media").headers["last-modified"]
+    assert client.get("/media", headers={"If-Modified-Since": last_modified}).status_code == 304
+    old = "Mon, 01 Jan 2001 00:00:00 GMT"
+    assert client.get("/media", headers={"If-Modified-Since": old}).status_code == 200
+    assert client.get("/media", headers={"If-Modified-Since": "garbage"}).status_code == 200
+
+
+def test_export_etag_is_stable_across_downloads(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from services.export_service import ExportService
+    exports = ExportService()
+    filename = exports.register("What is RAG?", "Retrieval **augmented** generation.", "en")
+
+    app = FastAPI()
+
+    @app.get("/export/{name}")
+    def serve(name: str, request: Request):
+        return media_response(request, Path(exports.pdf_path(name)), "application/pdf")
+
+    client = TestClient(app)
+    etags = {client.get(f"/export/{filename}").headers["etag"] for _ in range(3)}
+    assert len(etags) == 1
+    r = client.get(f"/export/{filename}", headers={"If-None-Match": etags.pop()})
+    assert r.status_code == 304
@@ -0,0 +1,76 @@
+import pytest
+
+from services.diagram_service import normalise_mermaid
+from services.mermaid_renderer import (
+    UnsupportedDiagram, _parse_flowchart, _parse_sequence, render_mermaid, split_statements
+)
+
+
+# ── Statement splitting ──────────────────────────────────────────────────────
+
+def test_split_on_top_level_semicolons_only():
+    assert split_statements("graph TD; A --> B ;; B --> C;") == ["graph TD", "A --> B", "B --> C"]
+    assert split_statements('A["Label; with semicolon"] --> B') == ['A["Label; with semicolon"] --> B']
+    assert split_statements("A(x;y) --> B{p;q}; B --> C") == ["A(x;y) --> B{p;q}", "B --> C"]
+    assert split_statements("A -->|yes; no| B; C") == ["A -->|yes; no| B", "C"]
+    assert split_statements('A["nested [x; y]"]; B') == ['A["nested [x; y]"]', "B"]
+
+
+# ── Normaliser (diagram cache key) ───────────────────────────────────────────
+
+def test_normalise_canonical_flowchart():
+    a = "graph TB\n  %% comment\n  B --> C\n\n  A  -->   B\n"
+    b = "flowchart TD; A --> B; B --> C"
+    assert normalise_mermaid(a) == normalise_mermaid(b) == "flowchart TD\nA --> B\nB --> C"
+
+
+def test_normalise_adds_missing_header():
+    assert normalise_mermaid("A --> B") == "flowchart TD\nA --> B"
+    assert normalise_mermaid("  \n%% only a comment\n") == ""
+
+
+def test_normalise_keeps_semicolons_in_labels():
+    code = 'graph LR; A["Label; with semicolon"] --> B'
+    assert normalise_mermaid(code) == 'flowchart LR\nA["Label; with semicolon"] --> B'
+    assert normalise_mermaid(code) != normalise_mermaid('graph LR; A["Label"] --> B')
+
+
+def test_normalise_keeps_sequence_order():
+    code = "sequenceDiagram\nB->>A: second\nA->>B: first"
+    assert normalise_mermaid(code) == code
+
+
+# ── Renderer ─────────────────────────────────────────────────────────────────
+
+def test_parse_flowchart_shapes_labels_and_edges():
+    nodes, edges = _parse_flowchart(split_statements(
+        'A["Label; with semicolon"] --> B{Ok?}; B -->|yes| C((Done)); B -.-> D & E'
+    ))
+    assert nodes["A"] == {"label": "Label; with semicolon", "shape": "rect"}
+    assert nodes["B"]["shape"] == "diamond"
+    assert nodes["C"] == {"label": "Done", "shape": "circle"}
+    assert set(nodes) == {"A", "B", "C", "D", "E"}
+    assert [(e["src"], e["dst"]) for e in edges] == [("A", "B"), ("B", "C"), ("B", "D"), ("B", "E")]
+    assert edges[1]["label"] == "yes"
+    assert edges[2]["dashed"]
+
+
+def test_parse_sequence():
+    participants, events = _parse_sequence([
+        "participant U as User", "U->>API: upload", "API-->>U: ok", "Note over U,API: done"
+    ])
+    assert participants == {"U": "User", "API": "API"}
+    assert [e["type"] for e in events] == ["message", "message", "note"]
+    assert events[1]["dashed"]
+
+
+def test_render_sizes():
+    img = render_mermaid('graph LR; A["Label; with semicolon"] --> B', width=600, height=300)
+    assert img.size == (600, 300)
+    assert render_mermaid("sequenceDiagram\nA->>B: hi").size[0] > 0
+
+
+@pytest.mark.parametrize("code", ["", "pie\n\"a\": 1", "graph TD\nclassDef x fill:#fff"])
+def test_unsupported(code):
+    with pytest.raises(UnsupportedDiagram):
+        render_mermaid(code)
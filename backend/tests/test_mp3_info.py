@@ -0,0 +1,81 @@
+import re
+import shutil
+import subprocess
+
+import pytest
+
+from services.ffmpeg_encoder import ffmpeg_binary, ffmpeg_version
+from services.mp3_info import probe_mp3
+
+try:
+    ffmpeg_version()
+except Exception:
+    pytest.skip("ffmpeg not available", allow_module_level=True)
+
+SECONDS = 3.0
+# One MPEG frame plus ffmpeg trimming the encoder delay from its own reading
+TOLERANCE = 0.06
+
+ENCODINGS = {
+    "cbr": ["-b:a", "128k"],
+    "cbr-untagged": ["-b:a", "128k", "-write_xing", "0"],
+    "vbr": ["-q:a", "4"],
+    "mpeg2-mono": ["-b:a", "32k", "-ac", "1", "-ar", "22050"],
+}
+
+
+def make_mp3(path, options) -> str:
+    subprocess.run([
+        ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={SECONDS}",
+        "-c:a", "libmp3lame", *options, str(path)
+    ], check=True, capture_output=True, timeout=60)
+    return str(path)
+
+
+def reference_duration(path: str) -> float:
+    """ffprobe's duration, or the decoded length when only ffmpeg is installed."""
+    if shutil.which("ffprobe"):
+        out = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+            check=True, capture_output=True, text=True, timeout=60
+        ).stdout
+        return float(out)
+    err = subprocess.run(
+        [ffmpeg_binary(), "-hide_banner", "-i", path, "-f", "null", "-"],
+        check=True, capture_output=True, text=True, timeout=60
+    ).stderr
+    h, m, s = re.findall(r"time=(\d+):(\d+):([\d.]+)", err)[-1]
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+@pytest.mark.parametrize("name", ENCODINGS)
+def test_duration_matches_ffmpeg(tmp_path, name):
+    path = make_mp3(tmp_path / f"{name}.mp3", ENCODINGS[name])
+    info = probe_mp3(path)
+    assert info["duration"] == pytest.approx(reference_duration(path), abs=TOLERANCE)
+    assert info["duration"] == pytest.approx(SECONDS, abs=TOLERANCE)
+
+
+def test_stream_format(tmp_path):
+    info = probe_mp3(make_mp3(tmp_path / "mono.mp3", ENCODINGS["mpeg2-mono"]))
+    assert (info["sample_rate"], info["channels"]) == (22050, 1)
+    # Encoder delay and padding add a couple of frames
+    assert info["frames"] == pytest.approx(SECONDS * 22050 / 576, abs=3)
+
+
+def test_truncated_file_counts_remaining_frames(tmp_path):
+    path = make_mp3(tmp_path / "cut.mp3", ENCODINGS["cbr-untagged"])
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:len(data) // 2])
+    assert probe_mp3(path)["duration"] == pytest.approx(SECONDS / 2, abs=0.1)
+
+
+@pytest.mark.parametrize("content", [b"", b"not an mp3 at all" * 100, bytes(range(256)) * 40])
+def test_garbage_raises(tmp_path, content):
+    path = tmp_path / "garbage.mp3"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        probe_mp3(str(path))
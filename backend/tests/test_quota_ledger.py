@@ -0,0 +1,89 @@
+from services.quota_ledger import QuotaLedger
+
+
+def ledger(tmp_path, limit=1000):
+    # A long interval so the tests decide when flushes happen
+    return QuotaLedger(tmp_path / "tts_state.json", limit, flush_interval=3600)
+
+
+def test_reserve_commit_refund(tmp_path):
+    l = ledger(tmp_path, limit=100)
+    assert l.reserve(60)
+    assert not l.reserve(50)          # 60 held, 50 more would pass the limit
+    l.refund(60)
+    assert l.reserve(50)
+    l.commit(50)
+    assert l.used == 50
+    assert l.remaining == 50
+    l.close()
+
+
+def test_flush_merges_usage_from_two_workers(tmp_path):
+    a, b = ledger(tmp_path), ledger(tmp_path)
+    for l, chars in ((a, 300), (b, 200)):
+        assert l.reserve(chars)
+        l.commit(chars)
+    a.flush()
+    b.flush()
+    a.flush()
+    assert a.used == b.used == 500
+    a.close()
+    b.close()
+
+
+def test_idle_worker_picks_up_usage_of_others(tmp_path):
+    busy, idle = ledger(tmp_path), ledger(tmp_path)
+    assert busy.reserve(900)
+    busy.commit(900)
+    busy.flush()
+
+    idle.flush()                      # nothing of its own to write
+    assert idle.used == 900
+    assert idle.remaining == 100
+    assert not idle.reserve(200)
+    busy.close()
+    idle.close()
+
+
+def test_exhausted_is_shared(tmp_path):
+    a, b = ledger(tmp_path), ledger(tmp_path)
+    a.mark_exhausted()
+    a.flush()
+    b.flush()
+    assert b.exhausted
+    assert not b.reserve(1)
+    a.close()
+    b.close()
+
+
+def test_concurrent_flushes_merge_usage_once(tmp_path, monkeypatch):
+    import threading
+    import services.quota_ledger as quota_ledger
+
+    l = ledger(tmp_path)
+    assert l.reserve(100)
+    l.commit(100)
+
+    # Hold the first flush inside the file merge while a second one starts
+    entered, proceed = threading.Event(), threading.Event()
+    read_file = QuotaLedger._read_file
+
+    def slow_read(self):
+        entered.set()
+        proceed.wait(1)
+        return read_file(self)
+    monkeypatch.setattr(quota_ledger.QuotaLedger, "_read_file", slow_read)
+
+    first = threading.Thread(target=l.flush)
+    first.start()
+    entered.wait(1)
+    second = threading.Thread(target=l.flush)
+    second.start()
+    proceed.set()
+    first.join()
+    second.join()
+
+    monkeypatch.setattr(quota_ledger.QuotaLedger, "_read_file", read_file)
+    assert read_file(l)["el_chars_used"] == 100
+    assert l.used == 100
+    l.close()
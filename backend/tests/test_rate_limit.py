@@ -0,0 +1,98 @@
+import pytest
+
+import guardrails
+from guardrails import MemoryRateStore, SqliteRateStore, _slide
+
+WINDOW, LIMIT = 100, 10
+
+
+def run(state, now, times=1):
+    results = []
+    for _ in range(times):
+        state, allowed, retry = _slide(state, now, WINDOW, LIMIT)
+        results.append((allowed, retry))
+    return state, results
+
+
+def test_exactly_limit_requests_pass_in_one_window():
+    state, results = run(None, 1000, LIMIT + 1)
+    assert [allowed for allowed, _ in results] == [True] * LIMIT + [False]
+    assert state == (10, LIMIT, 0)
+
+
+def test_full_current_window_waits_for_rollover():
+    state, results = run(None, 1020, LIMIT + 1)
+    assert results[-1] == (False, pytest.approx(80))
+    # Just past the boundary the previous window weighs slightly under the limit
+    _, allowed, _ = _slide(state, 1100.01, WINDOW, LIMIT)
+    assert allowed
+
+
+def test_previous_window_is_weighted_by_overlap():
+    state, _ = run(None, 1000, LIMIT)
+    # 95% of the previous window still overlaps: 9.5 + 1 new request fills it
+    state, results = run(state, 1105, 2)
+    assert results[0] == (True, 0.0)
+    assert results[1] == (False, pytest.approx(5))
+    assert state == (11, 1, LIMIT)
+    # The retry-after is when the weighted count drops back under the limit
+    _, allowed, _ = _slide(state, 1110.01, WINDOW, LIMIT)
+    assert allowed
+
+
+def test_idle_for_two_windows_starts_clean():
+    state, _ = run(None, 1000, LIMIT)
+    state, allowed, retry = _slide(state, 1250, WINDOW, LIMIT)
+    assert (allowed, retry) == (True, 0.0)
+    assert state == (12, 1, 0)
+
+
+def test_retry_after_is_at_least_one_second():
+    state, _ = run(None, 1000, LIMIT)
+    _, allowed, retry = _slide(state, 1100, WINDOW, LIMIT)
+    assert not allowed
+    assert retry == 1.0
+
+
+def test_memory_store_evicts_idle_keys():
+    store = MemoryRateStore()
+    store.hit("a", 0, WINDOW, LIMIT)
+    store.hit("b", 150, WINDOW, LIMIT)
+    assert len(store) == 2
+    store.hit("c", 250, WINDOW, LIMIT)
+    assert len(store) == 2          # "a" idle for two windows
+    assert "a" not in store._state
+
+
+def test_memory_store_caps_tracked_keys():
+    store = MemoryRateStore(max_entries=2)
+    for key in ("a", "b", "c"):
+        store.hit(key, 0, WINDOW, LIMIT)
+    assert list(store._state) == ["b", "c"]
+
+
+def test_sqlite_store_shares_limit_between_workers(tmp_path):
+    path = str(tmp_path / "ratelimit.db")
+    first, second = SqliteRateStore(path), SqliteRateStore(path)
+    results = [(first if i % 2 else second).hit("ip", 1000, WINDOW, LIMIT) for i in range(LIMIT + 1)]
+    assert [allowed for allowed, _ in results] == [True] * LIMIT + [False]
+    assert results[-1][1] == pytest.approx(100)
+    assert second.hit("other", 1000, WINDOW, LIMIT) == (True, 0.0)
+
+
+def test_sqlite_store_purges_idle_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(SqliteRateStore, "PURGE_EVERY", 3)
+    store = SqliteRateStore(str(tmp_path / "ratelimit.db"))
+    store.hit("a", 0, WINDOW, LIMIT)
+    store.hit("b", 250, WINDOW, LIMIT)
+    assert len(store) == 2
+    store.hit("b", 250, WINDOW, LIMIT)
+    assert len(store) == 1
+
+
+def test_check_ip_rate_message(monkeypatch):
+    monkeypatch.setattr(guardrails, "_rate_store", MemoryRateStore())
+    monkeypatch.setattr(guardrails, "MAX_REQUESTS_PER_IP", 1)
+    assert guardrails.check_ip_rate("1.2.3.4") == (True, "")
+    allowed, reason = guardrails.check_ip_rate("1.2.3.4")
+    assert not allowed and "minute" in reason
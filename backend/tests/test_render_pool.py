@@ -0,0 +1,41 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services import video_service
+
+
+def crash_once(marker: str) -> int:
+    # The first call kills its worker, which breaks the whole pool
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return os.getpid()
+
+
+def always_crash() -> None:
+    os._exit(1)
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool(monkeypatch):
+    monkeypatch.setattr(video_service, "RENDER_PROCESSES", 1)
+    monkeypatch.setattr(video_service, "_render_pool", None)
+    yield
+    if video_service._render_pool is not None:
+        video_service._render_pool.shutdown(wait=True)
+
+
+def test_broken_pool_is_rebuilt_and_job_retried(tmp_path):
+    broken = video_service.render_pool()
+    pid = video_service.run_in_render_pool(crash_once, str(tmp_path / "crashed"), timeout=60)
+    assert pid != os.getpid()
+    assert video_service._render_pool is not broken
+    # The rebuilt pool keeps serving later jobs
+    assert video_service.run_in_render_pool(crash_once, str(tmp_path / "crashed"), timeout=60) > 0
+
+
+def test_second_break_is_raised():
+    with pytest.raises(BrokenProcessPool):
+        video_service.run_in_render_pool(always_crash, timeout=60)
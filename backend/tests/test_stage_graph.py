@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from services.video_pipeline import StageGraph
+
+
+def test_stages_run_after_their_dependencies():
+    order, lock = [], threading.Lock()
+
+    def stage(name, seconds=0.0, value=None):
+        def fn(results):
+            time.sleep(seconds)
+            with lock:
+                order.append(name)
+            return value if value is not None else name
+        return fn
+
+    graph = (StageGraph()
+             .add("plan", stage("plan", value={"scenes": 3}))
+             .add("tts", lambda r: r["plan"]["scenes"] * 2, after=("plan",))
+             .add("frames", stage("frames", 0.05), after=("plan",))
+             .add("encode", lambda r: (r["tts"], r["frames"]), after=("tts", "frames")))
+    events = []
+    results, timings = graph.run(on_event=lambda event, name: events.append((event, name)))
+
+    assert results["encode"] == (6, "frames")
+    assert order == ["plan", "frames"]
+    assert set(timings["stages"]) == {"plan", "tts", "frames", "encode"}
+    # encode waited on frames, the slower branch
+    assert timings["critical_path"] == ["plan", "frames", "encode"]
+    for name in ("plan", "tts", "frames", "encode"):
+        assert events.index(("start", name)) < events.index(("done", name))
+    assert events.index(("done", "plan")) < events.index(("start", "tts"))
+
+
+def test_independent_stages_overlap():
+    graph = (StageGraph()
+             .add("a", lambda r: time.sleep(0.2))
+             .add("b", lambda r: time.sleep(0.2)))
+    start = time.perf_counter()
+    graph.run()
+    assert time.perf_counter() - start < 0.35
+
+
+def test_unknown_dependency():
+    with pytest.raises(ValueError, match="unknown stage 'plan'"):
+        StageGraph().add("tts", lambda r: None, after=("plan",))
+
+
+def test_failure_propagates_after_siblings_finish():
+    sibling_started, sibling_done = threading.Event(), threading.Event()
+    downstream_ran = threading.Event()
+
+    def boom(results):
+        sibling_started.wait(1)
+        raise RuntimeError("diagram failed")
+
+    def slow_sibling(results):
+        sibling_started.set()
+        time.sleep(0.2)
+        sibling_done.set()
+
+    graph = (StageGraph()
+             .add("diagram", boom)
+             .add("tts", slow_sibling)
+             .add("frames", lambda r: downstream_ran.set(), after=("diagram",)))
+    with pytest.raises(RuntimeError, match="diagram failed"):
+        graph.run()
+    # A stage already running is waited for, not abandoned mid-write
+    assert sibling_done.is_set()
+    assert not downstream_ran.is_set()
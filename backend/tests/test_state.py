@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+from state import MemoryState, SqliteState
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def state(request, tmp_path):
+    if request.param == "memory":
+        return MemoryState()
+    return SqliteState(str(tmp_path / "state.db"))
+
+
+def test_documents_keep_upload_order_and_language(state):
+    state.put_document("b.txt", "bee", "en")
+    state.put_document("a.txt", "ay")
+    assert list(state.documents()) == ["b.txt", "a.txt"]
+    assert state.document_languages() == {"b.txt": "en", "a.txt": None}
+
+    version = state.documents_version()
+    state.put_document("b.txt", "bee again", "de")      # re-upload keeps its place
+    assert list(state.documents()) == ["b.txt", "a.txt"]
+    assert state.document_languages()["b.txt"] == "de"
+    assert state.documents_version() > version
+
+    assert state.remove_document("b.txt")
+    assert not state.remove_document("b.txt")
+    assert list(state.documents()) == ["a.txt"]
+
+
+def test_document_names_match_documents(state):
+    assert state.document_names() == []
+    state.put_document("b.txt", "bee")
+    state.put_document("a.txt", "ay")
+    state.put_document("b.txt", "bee again")
+    assert state.document_names() == list(state.documents()) == ["b.txt", "a.txt"]
+
+
+def test_counter_limit(state):
+    assert state.add("usage:video", 1, limit=2) == (True, 1)
+    assert state.add("usage:video", 1, limit=2) == (True, 2)
+    assert state.add("usage:video", 1, limit=2) == (False, 2)
+    state.add("usage:video", -1)
+    assert state.value("usage:video") == 1
+
+
+def test_records(state):
+    state.put_record("job", "1", {"status": "queued"})
+    state.put_record("job", "1", {"status": "done"})
+    assert state.get_record("job", "1") == {"status": "done"}
+    assert state.records("job") == [{"status": "done"}]
+    state.delete_records("job", ["1"])
+    assert state.get_record("job", "1") is None
+
+
+def test_sqlite_file_shared_between_instances(tmp_path):
+    path = str(tmp_path / "state.db")
+    one, two = SqliteState(path), SqliteState(path)
+    one.put_document("a.txt", "ay", "en")
+    one.add("usage:audio", 3)
+    assert two.document_languages() == {"a.txt": "en"}
+    assert two.value("usage:audio") == 3
+
+
+def test_sqlite_upgrades_a_database_without_languages(tmp_path):
+    path = str(tmp_path / "state.db")
+    # The documents table as it was before languages were stored
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE documents (name TEXT PRIMARY KEY, text TEXT NOT NULL, added REAL NOT NULL)")
+    conn.execute("INSERT INTO documents VALUES ('old.txt', 'kept', 1.0)")
+    conn.commit()
+    conn.close()
+
+    state = SqliteState(path)
+    assert state.documents() == {"old.txt": "kept"}
+    assert state.document_languages() == {"old.txt": None}
+    state.put_document("new.txt", "fresh", "es")
+    assert state.document_languages() == {"old.txt": None, "new.txt": "es"}
+    SqliteState(path)                 # opening it again is a no-op
+
+
+def test_bounded_insert(state):
+    pending = lambda r: r["status"] == "queued"
+    assert state.put_record_bounded("job", "1", {"status": "queued"}, pending, limit=2) == (True, 0)
+    assert state.put_record_bounded("job", "2", {"status": "done"}, pending, limit=2) == (True, 1)
+    assert state.put_record_bounded("job", "3", {"status": "queued"}, pending, limit=2) == (True, 1)
+    assert state.put_record_bounded("job", "4", {"status": "queued"}, pending, limit=2) == (False, 2)
+    assert state.get_record("job", "4") is None
+
+
+def test_bounded_insert_is_atomic_across_connections(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    path = str(tmp_path / "state.db")
+    SqliteState(path)
+    # Separate instances, as separate worker processes would have
+    workers = [SqliteState(path) for _ in range(8)]
+    pending = lambda r: True
+    with ThreadPoolExecutor(8) as pool:
+        stored = list(pool.map(
+            lambda i: workers[i % 8].put_record_bounded("job", str(i), {}, pending, limit=5)[0],
+            range(40)
+        ))
+    assert sum(stored) == 5
+    assert len(workers[0].records("job")) == 5
@@ -0,0 +1,37 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import tracing
+
+
+def client():
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        with tracing.span("work"):
+            return {"request_id": tracing.request_id()}
+
+    app.add_middleware(tracing.TraceMiddleware)
+    return TestClient(app)
+
+
+def test_caller_id_never_keys_a_trace():
+    c = client()
+    first = c.get("/work", headers={"X-Request-ID": "shared-id"})
+    second = c.get("/work", headers={"X-Request-ID": "shared-id"})
+
+    ids = {first.headers["x-request-id"], second.headers["x-request-id"]}
+    assert len(ids) == 2 and "shared-id" not in ids
+    for r in (first, second):
+        rid = r.headers["x-request-id"]
+        assert r.json()["request_id"] == rid
+        trace = tracing.get_trace(rid)
+        assert trace["client_request_id"] == "shared-id"
+        assert [s["name"] for s in trace["spans"]] == ["work"]
+    assert tracing.get_trace("shared-id") is None
+
+
+def test_malformed_caller_id_is_dropped():
+    r = client().get("/work", headers={"X-Request-ID": "not ok!"})
+    assert tracing.get_trace(r.headers["x-request-id"])["client_request_id"] is None
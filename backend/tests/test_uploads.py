@@ -0,0 +1,107 @@
+import hashlib
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from uploads import MULTIPART_OVERHEAD, UploadRejected, UploadTooLarge, spool_upload
+
+LIMIT = 1024
+BOUNDARY = "testboundary"
+
+
+@pytest.fixture
+def spool_dir(tmp_path):
+    return tmp_path
+
+
+@pytest.fixture
+def client(spool_dir):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        try:
+            result = await spool_upload(request, max_bytes=LIMIT, directory=spool_dir,
+                                        suffixes=(".pdf", ".txt"))
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except UploadRejected as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        with open(result["path"], "rb") as f:
+            result["content"] = f.read().decode()
+        return result
+
+    return TestClient(app)
+
+
+def multipart(parts) -> bytes:
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename is not None:
+            disposition += f'; filename="{filename}"'
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def post(client, body, chunked=False):
+    content = iter([body[i:i + 256] for i in range(0, len(body), 256)]) if chunked else body
+    return client.post("/upload", content=content,
+                       headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"})
+
+
+def leftovers(spool_dir):
+    return list(spool_dir.glob(".upload_*"))
+
+
+def test_file_part_is_spooled_and_hashed(client, spool_dir):
+    r = post(client, multipart([("note", None, b"ignored"), ("file", "notes.txt", b"hello world")]))
+    assert r.status_code == 200
+    data = r.json()
+    assert data["filename"] == "notes.txt"
+    assert data["content"] == "hello world"
+    assert data["size"] == 11
+    assert data["sha256"] == hashlib.sha256(b"hello world").hexdigest()
+
+
+def test_declared_length_over_limit_is_refused_up_front(client, spool_dir):
+    body = multipart([("file", "big.txt", b"x" * (LIMIT + MULTIPART_OVERHEAD + 1))])
+    assert post(client, body).status_code == 413
+    assert leftovers(spool_dir) == []
+
+
+def test_streamed_upload_aborts_past_limit(client, spool_dir):
+    r = post(client, multipart([("file", "big.txt", b"x" * (LIMIT * 4))]), chunked=True)
+    assert r.status_code == 413
+    assert leftovers(spool_dir) == []
+
+
+def test_unsupported_type_is_rejected(client, spool_dir):
+    r = post(client, multipart([("file", "script.sh", b"echo hi")]))
+    assert r.status_code == 400
+    assert "PDF and TXT" in r.json()["detail"]
+    assert leftovers(spool_dir) == []
+
+
+def test_non_multipart_body_is_rejected(client, spool_dir):
+    r = client.post("/upload", content=b"plain", headers={"content-type": "text/plain"})
+    assert r.status_code == 400
+    assert leftovers(spool_dir) == []
+
+
+def test_missing_file_part_is_rejected(client, spool_dir):
+    r = post(client, multipart([("note", None, b"no file here")]))
+    assert r.status_code == 400
+    assert r.json()["detail"] == "No file uploaded."
+    assert leftovers(spool_dir) == []
+
+
+@pytest.mark.parametrize("body", [
+    b"--wrongboundary\r\nContent-Disposition: form-data\r\n\r\nx\r\n",
+    f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.txt\"\r\n\r\npartial".encode(),
+    f"--{BOUNDARY}\r\nno-colon-header\r\n\r\nx\r\n--{BOUNDARY}--\r\n".encode(),
+])
+def test_malformed_body_is_rejected_and_cleaned_up(client, spool_dir, body):
+    assert post(client, body).status_code == 400
+    assert leftovers(spool_dir) == []
@@ -0,0 +1,271 @@
+import os
+import re
+import sys
+import time
+import uuid
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+import logging.handlers
+from collections import OrderedDict
+from contextlib import contextmanager
+from metrics import STAGE_SECONDS
+import profiling
+
+# ── Request tracing ──────────────────────────────────────────────────────────
+#
+# Each HTTP request gets a server-generated request ID and a Trace. A sane
+# X-Request-ID from the caller is kept alongside it, in the trace and on
+# every log line, but never used as a key: callers can't collide with or
+# overwrite each other's traces and profiles by reusing an ID.
+#
+# `span(name, **attrs)` records a timed, nested span on the current trace;
+# `stage(name)` does the same and also feeds the
+# explainbot_stage_seconds histogram. The ID and the active span travel in
+# contextvars, so concurrent requests never mix — work handed to a thread
+# pool keeps them if the callable is wrapped with `bind()`.
+#
+# Log records carry the request ID and go through a QueueHandler: the
+# request thread only enqueues, and a listener thread formats and writes.
+
+TRACE_KEEP = int(os.getenv("TRACE_KEEP", "200"))       # recent traces held for the debug endpoint
+TRACE_DEBUG = os.getenv("TRACE_DEBUG", "0") == "1"     # enables /api/debug/traces
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+LOG_FORMAT = "%(asctime)s %(levelname)-7s [%(request_tag)s] %(message)s"
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+_trace = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("parent_span", default=None)
+
+_recent: "OrderedDict[str, Trace]" = OrderedDict()
+_recent_lock = threading.Lock()
+_listener = None
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "attrs", "start", "duration")
+
+    def __init__(self, span_id: int, parent, name: str, attrs: dict, start: float):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = start
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Trace:
+    def __init__(self, request_id: str, method: str = "", path: str = "",
+                 client_request_id: str = None):
+        self.request_id = request_id
+        self.client_request_id = client_request_id
+        self.log_tag = f"{request_id} caller={client_request_id}" if client_request_id else request_id
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started_at = time.time()
+        self.origin = time.perf_counter()
+        self.duration = None
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def open(self, name: str, attrs: dict, parent) -> Span:
+        with self._lock:
+            span = Span(len(self.spans), parent, name, attrs, time.perf_counter() - self.origin)
+            self.spans.append(span)
+        return span
+
+    def top_level(self) -> dict:
+        """Total seconds per span name among spans with no parent."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                if span.parent is None and span.duration is not None:
+                    totals[span.name] = totals.get(span.name, 0.0) + span.duration
+        return totals
+
+    def summary(self) -> dict:
+        with self._lock:
+            nodes = {
+                s.id: {"name": s.name, "start_ms": round(s.start * 1000, 2),
+                       "duration_ms": round(s.duration * 1000, 2) if s.duration is not None else None,
+                       "attrs": dict(s.attrs), "children": []}
+                for s in self.spans
+            }
+            roots = []
+            for s in self.spans:
+                (nodes[s.parent]["children"] if s.parent is not None else roots).append(nodes[s.id])
+        return {
+            "request_id": self.request_id,
+            "client_request_id": self.client_request_id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "spans": roots
+        }
+
+
+def request_id() -> str:
+    trace = _trace.get()
+    return trace.request_id if trace else "-"
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Timed span on the current trace; yields it so attributes can be added."""
+    trace = _trace.get()
+    if trace is None:
+        # Outside a request (startup, benchmarks) — nothing to attach to
+        yield Span(-1, None, name, attrs, 0.0)
+        return
+
+    current = trace.open(name, attrs, _parent.get())
+    token = _parent.set(current.id)
+    start = time.perf_counter()
+    try:
+        yield current
+    except Exception as e:
+        current.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - start
+        _parent.reset(token)
+
+
+@contextmanager
+def stage(name: str, **attrs):
+    """span() that also records explainbot_stage_seconds{stage=name}."""
+    start = time.perf_counter()
+    try:
+        with span(name, **attrs) as current:
+            yield current
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def bind(fn):
+    """
+    Wrap `fn` to run in a copy of the caller's context, so spans, log
+    lines and profiler samples from a pool thread still belong to the
+    request that queued it.
+    """
+    context = contextvars.copy_context()
+
+    def enrolled(*args, **kwargs):
+        with profiling.enrolled():
+            return fn(*args, **kwargs)
+
+    def run(*args, **kwargs):
+        return context.copy().run(enrolled, *args, **kwargs)
+    return run
+
+
+def get_trace(request_id: str) -> dict | None:
+    with _recent_lock:
+        trace = _recent.get(request_id)
+    return trace.summary() if trace else None
+
+
+def recent_traces() -> list[dict]:
+    with _recent_lock:
+        traces = list(_recent.values())
+    return [{
+        "request_id": t.request_id, "method": t.method, "path": t.path,
+        "status": t.status, "started_at": t.started_at,
+        "duration_ms": round(t.duration * 1000, 2) if t.duration is not None else None,
+        "spans": len(t.spans)
+    } for t in reversed(traces)]
+
+
+# ── Logging ──────────────────────────────────────────────────────────────────
+
+class _RequestIdFilter(logging.Filter):
+    # Runs on the QueueHandler, in the thread that logged — where the contextvars are set
+    def filter(self, record):
+        trace = _trace.get()
+        record.request_id = trace.request_id if trace else "-"
+        record.request_tag = trace.log_tag if trace else "-"
+        return True
+
+
+def setup_logging():
+    """Route the `explainbot` loggers through a queue to a stdout writer thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(_RequestIdFilter())
+
+    logger = logging.getLogger("explainbot")
+    logger.setLevel(LOG_LEVEL)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+# ── ASGI middleware ──────────────────────────────────────────────────────────
+
+class TraceMiddleware:
+    """
+    Opens a Trace per HTTP request and answers with X-Request-ID and a
+    Server-Timing header summarising the top-level spans.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.log = logging.getLogger("explainbot.http")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        rid = uuid.uuid4().hex[:16]
+        trace = Trace(rid, scope["method"], scope["path"],
+                      client_request_id=incoming if _REQUEST_ID.fullmatch(incoming) else None)
+        scope.setdefault("state", {})["request_id"] = rid
+        with _recent_lock:
+            _recent[rid] = trace
+            while len(_recent) > TRACE_KEEP:
+                _recent.popitem(last=False)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status = message["status"]
+                timing = ", ".join(
+                    f"{name};dur={seconds * 1000:.1f}" for name, seconds in trace.top_level().items()
+                )
+                total = f"total;dur={(time.perf_counter() - trace.origin) * 1000:.1f}"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", rid.encode()),
+                    (b"server-timing", (f"{timing}, {total}" if timing else total).encode()),
+                ]
+            await send(message)
+
+        token = _trace.set(trace)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            trace.duration = time.perf_counter() - trace.origin
+            if trace.spans:
+                # Only requests that did traced work — not status polls or static files
+                self.log.info(f"{trace.method} {trace.path} → {trace.status} "
+                              f"in {trace.duration * 1000:.0f} ms ({len(trace.spans)} spans)")
+            _trace.reset(token)
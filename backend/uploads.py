@@ -0,0 +1,127 @@
+import os
+import hashlib
+import tempfile
+from pathlib import Path
+from fastapi import Request
+from python_multipart import MultipartParser
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+
+# Multipart boundaries and part headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, size: int):
+        super().__init__(f"Upload exceeds limit ({size} bytes so far)")
+        self.size = size
+
+
+class UploadRejected(ValueError):
+    pass
+
+
+async def spool_upload(request: Request, max_bytes: int, directory: Path,
+                       field: str = "file", suffixes: tuple = None) -> dict:
+    """
+    Stream a multipart upload's `field` part straight to a spool file.
+
+    The body is parsed chunk by chunk as it arrives — only one network
+    buffer is in memory at a time — while the file's bytes are counted and
+    hashed. A declared Content-Length over the limit is refused before any
+    body is read; otherwise the upload is aborted the moment it passes
+    `max_bytes`. The spool file is removed on any failure.
+
+    Returns {"filename", "path", "size", "sha256"}; the caller owns `path`.
+    Raises UploadTooLarge, or UploadRejected for malformed / unsupported
+    uploads.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_OVERHEAD:
+        raise UploadTooLarge(int(declared))
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadRejected("Expected a multipart/form-data upload.")
+
+    fd, spool_path = tempfile.mkstemp(prefix=".upload_", dir=directory)
+    spool = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    state = {"headers": {}, "field": b"", "value": b"",
+             "in_file": False, "filename": None, "size": 0, "complete": False}
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["field"].lower()] = state["value"]
+        state["field"] = state["value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        name = disposition.get(b"name", b"").decode("utf-8", "replace")
+        filename = disposition.get(b"filename")
+        state["in_file"] = name == field and filename is not None and state["filename"] is None
+        if state["in_file"]:
+            state["filename"] = filename.decode("utf-8", "replace")
+            if suffixes and not state["filename"].lower().endswith(suffixes):
+                raise UploadRejected(f"Only {' and '.join(s.lstrip('.').upper() for s in suffixes)} files accepted.")
+
+    def on_part_data(data, start, end):
+        if not state["in_file"]:
+            return
+        chunk = data[start:end]
+        state["size"] += len(chunk)
+        if state["size"] > max_bytes:
+            raise UploadTooLarge(state["size"])
+        digest.update(chunk)
+        spool.write(chunk)
+
+    def on_part_end():
+        state["in_file"] = False
+
+    def on_end():
+        state["complete"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_end": on_end,
+    })
+
+    try:
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+            parser.finalize()
+        except MultipartParseError as e:
+            raise UploadRejected(f"Malformed upload: {e}")
+        # finalize() doesn't check the body reached its closing boundary
+        if not state["complete"]:
+            raise UploadRejected("Malformed upload: body ended before the closing boundary.")
+        spool.close()
+        if state["filename"] is None:
+            raise UploadRejected("No file uploaded.")
+    except BaseException:
+        spool.close()
+        os.unlink(spool_path)
+        raise
+
+    return {
+        "filename": state["filename"],
+        "path": spool_path,
+        "size": state["size"],
+        "sha256": digest.hexdigest()
+    }
@@ -0,0 +1,89 @@
+import os
+import time
+import logging
+import threading
+
+logger = logging.getLogger("explainbot.warmup")
+
+# ── Warm-up and readiness ────────────────────────────────────────────────────
+#
+# Fonts, language profiles, the render pool, ffmpeg and provider connections
+# are all set up on first use, so without a warm-up the first user after a
+# deploy pays for them. The app registers its warm-up steps here and runs
+# them on a background thread once it is serving; /api/health answers 503
+# until they have finished, so a load balancer holds traffic back meanwhile.
+#
+# A step marked `required` must succeed for the instance to become ready.
+# The others (network, synthetic render) are best effort: their outcome is
+# reported, but a provider outage shouldn't take every instance out of
+# rotation.
+
+WARM_UP = os.getenv("WARM_UP", "1") == "1"   # 0 = ready at once, set up on first use
+
+
+class WarmUp:
+    def __init__(self, enabled: bool = WARM_UP):
+        self.enabled = enabled
+        self.state = "starting" if enabled else "ready"
+        self.started_at = None
+        self.seconds = None
+        self.steps: list[tuple[str, object, bool]] = []
+        self.results: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def step(self, name: str, required: bool = False):
+        """Decorator registering `fn()` as a warm-up step; steps run in order."""
+        def register(fn):
+            self.steps.append((name, fn, required))
+            return fn
+        return register
+
+    def start(self):
+        """Run the steps on a background thread (no-op when warm-up is disabled)."""
+        if self.enabled:
+            threading.Thread(target=self.run, name="warm-up", daemon=True).start()
+
+    def run(self):
+        with self._lock:
+            if self.state != "starting":
+                return
+            self.state = "warming_up"
+        self.started_at = time.time()
+        start = time.perf_counter()
+        failed = False
+
+        for name, fn, required in self.steps:
+            step_start = time.perf_counter()
+            try:
+                detail = fn()
+            except Exception as e:
+                failed = failed or required
+                result = {"ok": False, "error": str(e)}
+                log = logger.error if required else logger.warning
+                log(f"{'❌' if required else '⚠️'} Warm-up {name} failed: {e}")
+            else:
+                result = {"ok": True}
+                if detail is not None:
+                    result["detail"] = detail
+            result["ms"] = round((time.perf_counter() - step_start) * 1000, 1)
+            result["required"] = required
+            self.results[name] = result
+
+        self.seconds = round(time.perf_counter() - start, 2)
+        self.state = "failed" if failed else "ready"
+        if failed:
+            logger.error(f"❌ Warm-up failed after {self.seconds}s — not ready")
+        else:
+            logger.info(f"🔥 Warm-up done in {self.seconds}s — ready")
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "steps": dict(self.results)
+        }
@@ -286,31 +286,53 @@ async function generateVideo(query, language) {
     formData.append('language', language);
 
     const steps = ['step1','step2','step3','step4'];
-    let stepIndex = 0;
-    setStep(steps[stepIndex], 'active');
-
-    const stepTimings = [0, 4000, 9000, 16000];
-    stepTimings.forEach((delay, i) => {
-        setTimeout(() => {
-            if (i > 0) setStep(steps[i-1], 'done');
-            if (i < steps.length) setStep(steps[i], 'active');
-        }, delay);
-    });
+    setStep(steps[0], 'active');
 
     const response = await fetch(`${API_BASE}/api/generate-video`, { method: 'POST', body: formData });
-    const data = await response.json();
+    // A 500 may not carry a JSON body
+    const job = await response.json().catch(() => ({}));
+
+    if (response.status === 429) { hideLoading(); alert(job.detail); fetchUsage(); return; }
+    if (!response.ok) {
+        hideLoading();
+        alert(typeof job.detail === 'string' ? job.detail : `Video request failed (HTTP ${response.status})`);
+        return;
+    }
+    fetchUsage();
+
+    // Render runs in the background — poll the job until it finishes
+    let status;
+    while (true) {
+        await sleep(1500);
+        const res = await fetch(`${API_BASE}${job.status_url}`);
+        status = await res.json();
+        if (!res.ok) { hideLoading(); alert(status.detail); return; }
+
+        const current = videoStepIndex(status.stage);
+        steps.forEach((s, i) => setStep(s, i < current ? 'done' : i === current ? 'active' : null));
+
+        if (status.status === 'done' || status.status === 'failed') break;
+    }
 
     steps.forEach(s => setStep(s, 'done'));
     await sleep(400);
 
     hideLoading();
-    if (response.status === 429) { alert(data.detail); fetchUsage(); return; }
-    if (response.status === 400) { alert(data.detail); return; }
+    if (status.status === 'failed') { alert('Video generation failed: ' + status.error); return; }
+    const data = status.result;
     displayVideoResults(data);
-    fetchUsage();
     addToHistory(query, data.detected_language, 'video', 'video', data);
 }
 
+// Map pipeline stage names onto the four loading steps
+function videoStepIndex(stage) {
+    if (!stage) return 0;
+    if (stage.includes('encode') || stage === 'done') return 3;
+    if (stage.includes('tts')) return 2;
+    if (stage.includes('diagram') || stage.includes('frames')) return 1;
+    return 0;
+}
+
 function setStep(id, state) {
     const el = document.getElementById(id);
     if (!el) return;
@@ -341,7 +363,10 @@ function displayResults(data) {
         </div>
         <div style="padding:10px 14px;border-radius:6px;background:#12121f;border:1px solid #22223a;font-size:0.7rem;font-family:monospace;color:#6b7099;">
             AI: ${decision.reasoning}
-        </div>`;
+        </div>${decision.degraded_for_load ? `
+        <div style="margin-top:8px;padding:10px 14px;border-radius:6px;background:#1f1a12;border:1px solid #3a3022;font-size:0.7rem;font-family:monospace;color:#fbbf24;">
+            Server is busy — answered as ${decision.format} instead of ${decision.original_format}. Try again in about ${decision.retry_after}s for the full version.
+        </div>` : ''}`;
 
     let html = `<div style="margin-top:20px;color:#c4c8e0;line-height:1.8;">
         <p style="color:#c4c8e0;">${parseMarkdown(data.explanation.text)}</p>